@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+
+from groq import AsyncGroq
+from telegram.error import BadRequest, RetryAfter
+
+import config
+from llm_scheduler import GroqScheduler
+
+logger = logging.getLogger(__name__)
+
+# تعليمات النظام لكل نوع من طلبات المعلم
+TASKS = {
+    "explain": "أنت معلم لغة صينية للناطقين بالعربية. اشرح الكلمة أو العبارة التالية: المعنى، البينيين، ومثالين قصيرين مع الترجمة.",
+    "correct": "أنت معلم لغة صينية للناطقين بالعربية. صحح الجملة الصينية التالية واشرح الأخطاء باختصار بالعربية.",
+    "translate": "ترجم النص التالي بين العربية والصينية، وأضف البينيين للنص الصيني.",
+}
+
+# حد طول رسالة تيليجرام
+MAX_MESSAGE_LENGTH = 4096
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_prompt(text):
+    """توحيد النص قبل استخدامه كمفتاح للذاكرة المؤقتة (المسافات وحالة الأحرف وأشكال يونيكود)"""
+    return _SPACES.sub(" ", unicodedata.normalize("NFKC", text)).strip().casefold()
+
+
+class TTLCache:
+    """ذاكرة مؤقتة LRU بحجم أقصى ومدة صلاحية لكل عنصر"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self.items.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self.items[key]
+            self.misses += 1
+            return None
+        self.items.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key, value):
+        self.items[key] = (time.monotonic() + self.ttl, value)
+        self.items.move_to_end(key)
+        while len(self.items) > self.maxsize:
+            self.items.popitem(last=False)
+
+    def __len__(self):
+        return len(self.items)
+
+
+class _Flight:
+    """طلب جارٍ إلى Groq يتابعه كل من طلب السؤال نفسه في الوقت نفسه"""
+
+    def __init__(self):
+        self.text = ""
+        self.done = False
+        self.error = None
+        self._changed = asyncio.Event()
+
+    def update(self, text=None, done=False, error=None):
+        if text is not None:
+            self.text = text
+        self.done = done
+        self.error = error
+        # إيقاظ المتابعين الحاليين وتجهيز حدث جديد للتحديث التالي
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def follow(self):
+        seen = ""
+        while True:
+            changed = self._changed
+            if self.text != seen:
+                seen = self.text
+                yield seen
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await changed.wait()
+
+
+class AITutor:
+    """معلم ذكي فوق Groq: ذاكرة مؤقتة للإجابات، ودمج الطلبات المتطابقة الجارية، وبث الإجابة بتعديل الرسالة.
+
+    الإجابات الشائعة تُعاد من الذاكرة مباشرة، والطلبات المتطابقة المتزامنة تُرسل إلى Groq مرة واحدة.
+    """
+
+    def __init__(self, client=None, model=None, cache_size=None, cache_ttl=None, edit_interval=None, scheduler=None):
+        self.client = client or AsyncGroq(api_key=config.GROQ_API_KEY, base_url=config.GROQ_BASE_URL)
+        self.scheduler = scheduler or GroqScheduler()
+        self.model = model or config.GROQ_MODEL
+        self.cache = TTLCache(cache_size or config.AI_CACHE_SIZE, cache_ttl or config.AI_CACHE_TTL)
+        self.edit_interval = edit_interval if edit_interval is not None else config.AI_STREAM_EDIT_INTERVAL
+        self._inflight = {}
+        self.stats = {"upstream": 0, "coalesced": 0, "errors": 0}
+
+    def cache_key(self, task, text):
+        return (self.model, task, normalize_prompt(text))
+
+    def estimate_tokens(self, task, text):
+        # تقدير تقريبي (~3 أحرف لكل توكن) مع أقصى طول للإجابة
+        return (len(TASKS[task]) + len(text)) // 3 + config.AI_MAX_TOKENS
+
+    async def stream(self, task, text, user_id=None):
+        """توليد الإجابة تدريجياً (النص المتراكم في كل مرة)؛ ترفع asyncio.QueueFull إن كان الطابور ممتلئاً"""
+        key = self.cache_key(task, text)
+        cached = self.cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+        flight = self._inflight.get(key)
+        if flight is None:
+            # الطلب يعمل على عمال المجدول فلا يلغيه خروج أحد المتابعين
+            flight = _Flight()
+            future = self.scheduler.submit(user_id, self.estimate_tokens(task, text), self._fetch, key, flight, task, text)
+            self._inflight[key] = flight
+            future.add_done_callback(lambda f: self._finish(key, flight, f))
+        else:
+            self.stats["coalesced"] += 1
+
+        async for partial in flight.follow():
+            yield partial
+
+    async def ask(self, task, text, user_id=None):
+        answer = ""
+        async for answer in self.stream(task, text, user_id):
+            pass
+        return answer
+
+    async def _fetch(self, key, flight, task, text):
+        self.stats["upstream"] += 1
+        parts = []
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": TASKS[task]},
+                {"role": "user", "content": text},
+            ],
+            max_tokens=config.AI_MAX_TOKENS,
+            stream=True,
+        )
+        async for chunk in response:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+                flight.update("".join(parts))
+        answer = "".join(parts)
+        if answer:
+            self.cache.set(key, answer)
+
+    def _finish(self, key, flight, future):
+        self._inflight.pop(key, None)
+        error = asyncio.CancelledError() if future.cancelled() else future.exception()
+        if error is not None:
+            self.stats["errors"] += 1
+            logger.warning("Groq request failed: %s", error)
+        flight.update(done=True, error=error)
+
+    async def reply(self, message, task, text, user_id=None):
+        """إرسال الإجابة كرسالة تُعدَّل أثناء البث بمعدل لا يتجاوز edit_interval"""
+        ahead = self.scheduler.queued
+        sent = await message.reply_text(f"⏳ طلبك في الانتظار ({ahead} قبلك)..." if ahead else "⏳ ...")
+        shown = None
+        last_edit = 0.0
+        answer = ""
+        try:
+            async for answer in self.stream(task, text, user_id):
+                if time.monotonic() - last_edit >= self.edit_interval:
+                    shown = await self._edit(sent, answer, shown)
+                    last_edit = time.monotonic()
+        except asyncio.QueueFull:
+            await self._edit(sent, "🤖 المعلم مشغول الآن، أعد المحاولة بعد قليل.", shown, final=True)
+            return None
+        except Exception:
+            await self._edit(sent, "⚠️ تعذر الحصول على إجابة الآن، حاول لاحقاً.", shown, final=True)
+            return None
+        await self._edit(sent, answer or "لا توجد إجابة.", shown, final=True)
+        return answer
+
+    async def _edit(self, sent, text, shown, final=False):
+        text = text[:MAX_MESSAGE_LENGTH]
+        while text != shown:
+            try:
+                await sent.edit_text(text)
+                return text
+            except RetryAfter as e:
+                # تعديل وسيط: نتخطاه، أما التعديل النهائي فينتظر حتى يُعرض النص الكامل
+                if not final:
+                    return shown
+                delay = e.retry_after
+                await asyncio.sleep(delay.total_seconds() if hasattr(delay, "total_seconds") else delay)
+            except BadRequest as e:
+                if "not modified" not in str(e).lower():
+                    raise
+                return text
+        return shown
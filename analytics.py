@@ -0,0 +1,230 @@
+import base64
+import hashlib
+import math
+from datetime import date, timedelta
+
+import config
+
+
+def _today():
+    return date.today().isoformat()
+
+
+def _shift(day, days):
+    return (date.fromisoformat(day) + timedelta(days=days)).isoformat()
+
+
+class HyperLogLog:
+    """عدّ تقريبي للعناصر المختلفة بذاكرة ثابتة (2^p بايت)، الخطأ المعياري ≈ 1.04/√(2^p).
+
+    يُدمج اتحاد عدة أيام بأخذ القيمة الأكبر لكل سجل، فعدد المستخدمين المختلفين في أسبوع
+    أو شهر يُحسب من سجلات الأيام دون الرجوع إلى المستخدمين.
+    """
+
+    def __init__(self, precision=None, registers=None):
+        self.precision = precision or config.ANALYTICS_HLL_PRECISION
+        self.m = 1 << self.precision
+        self.registers = bytearray(registers) if registers else bytearray(self.m)
+
+    def add(self, value):
+        """إضافة عنصر؛ يعيد True إذا تغير أحد السجلات"""
+        h = int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), "big")
+        bits = 64 - self.precision
+        index = h >> bits
+        rank = bits - (h & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+            return True
+        return False
+
+    def merge(self, other):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        m = self.m
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # تصحيح الأعداد الصغيرة (linear counting)
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+    def encode(self):
+        return base64.b64encode(bytes(self.registers)).decode("ascii")
+
+    @classmethod
+    def decode(cls, text, precision=None):
+        return cls(precision, base64.b64decode(text))
+
+
+class Analytics:
+    """إحصائيات النمو والنشاط تُحدث تدريجياً مع كل مستخدم جديد أو أول نشاط له في اليوم.
+
+    data["daily"][يوم]: عدادات اليوم (new_users, active, removed, total_users) وسجلات HLL
+    للمستخدمين النشطين فيه. data["cohorts"][يوم الانضمام]: حجم الدفعة وعدد من عاد منها
+    بعد N يوم. الاستعلامات تمر على الأيام المطلوبة فقط ولا تكتب شيئاً.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.daily = data.setdefault("daily", {})
+        self.cohorts = data.setdefault("cohorts", {})
+        self._hll = {}
+        self.migrated = self._migrate()
+
+    def _migrate(self):
+        """تحويل user_growth القديم إلى عدادات يومية"""
+        growth = self.data.pop("user_growth", None)
+        stale = self.data.pop("active_today", None)
+        for entry in growth or []:
+            self.daily.setdefault(entry["date"], {
+                "new_users": entry.get("new_users", 0),
+                "active": 0,
+                "removed": 0,
+                "total_users": entry.get("total_users", 0)
+            })
+        return growth is not None or stale is not None
+
+    def _bucket(self, day):
+        bucket = self.daily.get(day)
+        if bucket is None:
+            bucket = self.daily[day] = {
+                "new_users": 0,
+                "active": 0,
+                "removed": 0,
+                "total_users": self.data.get("total_users", 0)
+            }
+            self._prune(day)
+        return bucket
+
+    def _prune(self, day):
+        # يُستدعى مرة عند بداية كل يوم جديد
+        hll_cutoff = _shift(day, -config.ANALYTICS_HLL_DAYS)
+        history_cutoff = _shift(day, -config.ANALYTICS_HISTORY_DAYS)
+        cohort_cutoff = _shift(day, -config.ANALYTICS_COHORT_DAYS)
+        for old_day in [d for d in self.daily if d < history_cutoff]:
+            del self.daily[old_day]
+        for old_day, bucket in self.daily.items():
+            if old_day < hll_cutoff and "hll" in bucket:
+                del bucket["hll"]
+                self._hll.pop(old_day, None)
+        for old_day in [d for d in self.cohorts if d < cohort_cutoff]:
+            del self.cohorts[old_day]
+
+    def _day_hll(self, day):
+        hll = self._hll.get(day)
+        if hll is None:
+            encoded = self.daily.get(day, {}).get("hll")
+            hll = HyperLogLog.decode(encoded) if encoded else HyperLogLog()
+            self._hll[day] = hll
+        return hll
+
+    def record_new_user(self, user_id, day=None):
+        day = day or _today()
+        bucket = self._bucket(day)
+        bucket["new_users"] += 1
+        bucket["total_users"] = self.data["total_users"]
+        self.cohorts.setdefault(day, {"size": 0, "returned": {}})["size"] += 1
+        self.record_active(user_id, day, day)
+
+    def record_active(self, user_id, join_day, day=None):
+        """أول نشاط للمستخدم في اليوم (update_user_activity يعرف ذلك من last_activity)"""
+        day = day or _today()
+        bucket = self._bucket(day)
+        bucket["active"] += 1
+        hll = self._day_hll(day)
+        if hll.add(user_id):
+            bucket["hll"] = hll.encode()
+
+        cohort = self.cohorts.get(join_day)
+        offset = (date.fromisoformat(day) - date.fromisoformat(join_day)).days
+        if cohort is not None and offset > 0:
+            returned = cohort["returned"]
+            returned[str(offset)] = returned.get(str(offset), 0) + 1
+
+    def record_removed(self, count, day=None):
+        bucket = self._bucket(day or _today())
+        bucket["removed"] += count
+        bucket["total_users"] = self.data["total_users"]
+
+    def active_users(self, days=1, day=None):
+        """عدد المستخدمين المختلفين النشطين في آخر days يوم (DAU=1، WAU=7، MAU=30)"""
+        day = day or _today()
+        if days == 1:
+            return self.daily.get(day, {}).get("active", 0)
+        union = HyperLogLog()
+        for i in range(min(days, config.ANALYTICS_HLL_DAYS)):
+            if "hll" in self.daily.get(_shift(day, -i), {}):
+                union.merge(self._day_hll(_shift(day, -i)))
+        return union.count()
+
+    def growth(self, days=30, day=None):
+        day = day or _today()
+        result = []
+        for i in range(days - 1, -1, -1):
+            current = _shift(day, -i)
+            bucket = self.daily.get(current)
+            if bucket is not None:
+                result.append({
+                    "date": current,
+                    "new_users": bucket["new_users"],
+                    "active": bucket["active"],
+                    "total_users": bucket["total_users"]
+                })
+        return result
+
+    def retention(self, offsets=(1, 7, 30), days=30, day=None):
+        """نسبة من عاد من كل دفعة انضمام بعد N يوم (None إن لم يمر N يوم بعد)"""
+        day = day or _today()
+        result = []
+        for i in range(days - 1, -1, -1):
+            cohort_day = _shift(day, -i)
+            cohort = self.cohorts.get(cohort_day)
+            if cohort is None or not cohort["size"]:
+                continue
+            rates = {
+                offset: (round(100 * cohort["returned"].get(str(offset), 0) / cohort["size"], 1) if offset <= i else None)
+                for offset in offsets
+            }
+            result.append({"date": cohort_day, "size": cohort["size"], "retention": rates})
+        return result
+
+    def summary(self, day=None):
+        day = day or _today()
+        today = self.daily.get(day, {})
+        return {
+            "total_users": self.data.get("total_users", 0),
+            "total_lessons": self.data.get("total_lessons", 0),
+            "total_quizzes": self.data.get("total_quizzes", 0),
+            "new_today": today.get("new_users", 0),
+            "dau": self.active_users(1, day),
+            "wau": self.active_users(7, day),
+            "mau": self.active_users(30, day),
+        }
+
+
+def merge_shards(datas):
+    """دمج إحصائيات عدة عمليات تملك كل منها جزءاً منفصلاً من المستخدمين في Analytics واحد للقراءة.
+
+    العدادات تُجمع (المستخدمون لا يتكررون بين العمليات)، وسجلات HLL تُدمج كاتحاد.
+    """
+    merged = {"total_users": 0, "total_lessons": 0, "total_quizzes": 0, "daily": {}, "cohorts": {}}
+    for data in datas:
+        for key in ("total_users", "total_lessons", "total_quizzes"):
+            merged[key] += data.get(key, 0)
+        for day, bucket in data.get("daily", {}).items():
+            target = merged["daily"].setdefault(day, {"new_users": 0, "active": 0, "removed": 0, "total_users": 0})
+            for key in ("new_users", "active", "removed", "total_users"):
+                target[key] += bucket.get(key, 0)
+            if "hll" in bucket:
+                hll = HyperLogLog.decode(bucket["hll"])
+                if "hll" in target:
+                    hll.merge(HyperLogLog.decode(target["hll"]))
+                target["hll"] = hll.encode()
+        for day, cohort in data.get("cohorts", {}).items():
+            target = merged["cohorts"].setdefault(day, {"size": 0, "returned": {}})
+            target["size"] += cohort["size"]
+            for offset, count in cohort["returned"].items():
+                target["returned"][offset] = target["returned"].get(offset, 0) + count
+    return Analytics(merged)
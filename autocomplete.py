@@ -0,0 +1,178 @@
+import bisect
+import heapq
+import json
+import re
+import unicodedata
+
+from search_index import fold
+from storage import atomic_write
+
+INDEX_VERSION = 1
+# من هذا العدد من المفاتيح المعدلة في دفعة واحدة يُعاد بناء المصفوفات بدمج واحد بدل إدراج كل مفتاح
+MERGE_MIN = 256
+
+# علامات النغمات بعد تفكيك NFD ورقم النغمة المقابل
+TONE_MARKS = {"\u0304": "1", "\u0301": "2", "\u030c": "3", "\u0300": "4"}
+SYLLABLE_SPLIT_RE = re.compile(r"[\s'’\-]+")
+ARABIC_WORD_SPLIT_RE = re.compile(r"[\s،,;/]+")
+
+
+def normalize_prefix(text):
+    """توحيد ما يكتبه المستخدم: أحرف صغيرة بدون نغمات أو تشكيل"""
+    return fold(unicodedata.normalize("NFC", text).strip().lower())
+
+
+def numbered_pinyin(pinyin):
+    """nǐ hǎo -> ni3hao3 (لكل مقطع مفصول بمسافة)"""
+    syllables = []
+    for syllable in SYLLABLE_SPLIT_RE.split(pinyin.lower()):
+        if not syllable:
+            continue
+        tone = ""
+        letters = []
+        for ch in unicodedata.normalize("NFD", syllable):
+            if ch in TONE_MARKS:
+                tone = TONE_MARKS[ch]
+            elif unicodedata.category(ch) != "Mn":
+                letters.append(ch)
+        syllables.append("".join(letters) + tone)
+    return "".join(syllables)
+
+
+def index_keys(word, item):
+    """كل المفاتيح التي يمكن أن يبدأ بها المستخدم للوصول إلى الكلمة"""
+    keys = {word}
+    pinyin = item.get("pinyin") or ""
+    if pinyin:
+        toneless = normalize_prefix(pinyin)
+        keys.add(toneless)
+        keys.add(SYLLABLE_SPLIT_RE.sub("", toneless))
+        keys.add(numbered_pinyin(pinyin))
+    translation = item.get("translation") or ""
+    if translation:
+        normalized = normalize_prefix(translation)
+        keys.add(normalized)
+        keys.update(ARABIC_WORD_SPLIT_RE.split(normalized))
+    keys.discard("")
+    return keys
+
+
+class AutocompleteIndex:
+    """فهرس بادئات مرتب (مصفوفات + بحث ثنائي) للهانزي والبينيين والترجمة العربية.
+
+    المفاتيح مرتبة أبجدياً فتكون نتائج البادئة مقطعاً متصلاً، والكلمة الأقصر
+    (المطابقة التامة) تأتي أولاً: البحث O(log n + k).
+    """
+
+    def __init__(self, words=None, keys=None, refs=None):
+        self.words = words or []
+        self.keys = keys or []
+        self.refs = refs or []
+        self._word_ids = {word: i for i, word in enumerate(self.words)}
+
+    @classmethod
+    def build(cls, vocabulary):
+        words = list(vocabulary)
+        entries = sorted(
+            (key, i) for i, word in enumerate(words) for key in index_keys(word, vocabulary[word])
+        )
+        return cls(words, [key for key, _ in entries], [i for _, i in entries])
+
+    def _word_id(self, word):
+        word_id = self._word_ids.get(word)
+        if word_id is None:
+            word_id = len(self.words)
+            self.words.append(word)
+            self._word_ids[word] = word_id
+        return word_id
+
+    def add(self, word, item, old_item=None):
+        self.update({word: item}, {word: old_item})
+
+    def update(self, items, old_items):
+        """إضافة أو تعديل كلمات ({الكلمة: العنصر})؛ old_items[الكلمة] نسختها السابقة (أو None)
+        فتُحذف مفاتيحها التي لم تعد في النسخة الجديدة (ترجمة أو بينيين تغيرا)"""
+        added, removed = [], set()
+        for word, item in items.items():
+            word_id = self._word_id(word)
+            keys = index_keys(word, item)
+            old_item = old_items.get(word)
+            old_keys = index_keys(word, old_item) if old_item is not None else set()
+            added.extend((key, word_id) for key in keys - old_keys)
+            removed.update((key, word_id) for key in old_keys - keys)
+        if len(added) + len(removed) >= MERGE_MIN:
+            self._merge(sorted(added), removed)
+            return
+        for key, word_id in removed:
+            pos = self._find(key, word_id)
+            if pos < len(self.keys) and self.keys[pos] == key and self.refs[pos] == word_id:
+                del self.keys[pos]
+                del self.refs[pos]
+        for key, word_id in added:
+            pos = self._find(key, word_id)
+            if pos == len(self.keys) or self.keys[pos] != key or self.refs[pos] != word_id:
+                self.keys.insert(pos, key)
+                self.refs.insert(pos, word_id)
+
+    def _find(self, key, word_id):
+        """موضع (key, word_id) بترتيب build: المفتاح ثم رقم الكلمة"""
+        pos = bisect.bisect_left(self.keys, key)
+        while pos < len(self.keys) and self.keys[pos] == key and self.refs[pos] < word_id:
+            pos += 1
+        return pos
+
+    def _merge(self, added, removed):
+        keys, refs = [], []
+        last = None
+        for entry in heapq.merge(zip(self.keys, self.refs), added):
+            if entry != last and entry not in removed:
+                keys.append(entry[0])
+                refs.append(entry[1])
+                last = entry
+        self.keys, self.refs = keys, refs
+
+    def complete(self, prefix, limit=8):
+        prefix = normalize_prefix(prefix)
+        if not prefix:
+            return []
+        results, seen = [], set()
+        pos = bisect.bisect_left(self.keys, prefix)
+        while pos < len(self.keys) and len(results) < limit and self.keys[pos].startswith(prefix):
+            word_id = self.refs[pos]
+            if word_id not in seen:
+                seen.add(word_id)
+                results.append(self.words[word_id])
+            pos += 1
+        return results
+
+    def save(self, path, fingerprint):
+        atomic_write(path, json.dumps({
+            "version": INDEX_VERSION,
+            "fingerprint": fingerprint,
+            "words": self.words,
+            "keys": self.keys,
+            "refs": self.refs
+        }, ensure_ascii=False, separators=(',', ':')))
+
+    @classmethod
+    def load(cls, path, fingerprint):
+        """تحميل الفهرس المحفوظ إن كان مطابقاً لنسخة المحتوى الحالية، وإلا None"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                raw = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if raw.get("version") != INDEX_VERSION or raw.get("fingerprint") != fingerprint:
+            return None
+        return cls(raw["words"], raw["keys"], raw["refs"])
+
+    @classmethod
+    def load_or_build(cls, vocabulary, path, fingerprint):
+        index = cls.load(path, fingerprint)
+        if index is None:
+            index = cls.build(vocabulary)
+            try:
+                index.save(path, fingerprint)
+            except OSError:
+                pass
+        return index
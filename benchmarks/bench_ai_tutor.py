@@ -0,0 +1,51 @@
+"""قياس المعلم الذكي مقابل خادم Groq وهمي: طلب بارد، إجابة من الذاكرة، ودمج الطلبات المتطابقة.
+
+الاستخدام: python benchmarks/bench_ai_tutor.py [عدد الطلبات المتزامنة]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from groq import AsyncGroq  # noqa: E402
+
+from ai_tutor import AITutor  # noqa: E402
+from fake_groq_api import FakeGroqAPI  # noqa: E402
+
+
+async def main():
+    concurrent = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    api = await FakeGroqAPI(first_token_delay=0.5, token_delay=0.01).start()
+    tutor = AITutor(client=AsyncGroq(api_key="fake", base_url=api.base_url, max_retries=0))
+
+    start = time.perf_counter()
+    await tutor.ask("explain", "what does 你好 mean")
+    cold = time.perf_counter() - start
+
+    timings = []
+    for _ in range(10000):
+        start = time.perf_counter()
+        await tutor.ask("explain", "  What does 你好   MEAN ")
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+
+    before = api.requests
+    start = time.perf_counter()
+    answers = await asyncio.gather(*(tutor.ask("translate", "我想学习中文") for _ in range(concurrent)))
+    burst = time.perf_counter() - start
+
+    await api.stop()
+
+    print(f"cold request:        {cold * 1000:.0f} ms")
+    print(f"cached p50 / p99:    {statistics.median(timings) * 1e6:.1f} / {timings[int(len(timings) * 0.99)] * 1e6:.1f} us")
+    print(f"{concurrent} identical concurrent: {burst * 1000:.0f} ms, {api.requests - before} upstream call(s), "
+          f"{len(set(answers))} distinct answer(s)")
+    print(f"stats:               {tutor.stats}, cache hits {tutor.cache.hits}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+"""قياس أداء فهرس الإكمال التلقائي على قائمة بحجم HSK 1-6 (~5000 كلمة).
+
+الاستخدام: python benchmarks/bench_autocomplete.py [عدد الكلمات]
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from autocomplete import AutocompleteIndex  # noqa: E402
+
+INITIALS = ["b", "p", "m", "f", "d", "t", "n", "l", "g", "k", "h", "j", "q", "x", "zh", "ch", "sh", "r", "z", "c", "s", ""]
+FINALS = ["a", "o", "e", "ai", "ei", "ao", "ou", "an", "en", "ang", "eng", "ong", "i", "ia", "ie", "iao", "in", "ing", "u", "uo", "ui", "un"]
+TONED = {"a": "āáǎà", "o": "ōóǒò", "e": "ēéěè", "i": "īíǐì", "u": "ūúǔù"}
+ARABIC_WORDS = ["مرحبا", "شكرا", "كتاب", "مدرسة", "طالب", "معلم", "بيت", "ماء", "طعام", "سوق", "سيارة", "أسرة", "صديق", "عمل", "وقت", "يوم"]
+
+
+def syllable(rng):
+    base = rng.choice(INITIALS) + rng.choice(FINALS)
+    tone = rng.randrange(5)
+    if tone == 4:
+        return base
+    for vowel in "aoeiu":
+        if vowel in base:
+            return base.replace(vowel, TONED[vowel][tone], 1)
+    return base
+
+
+def synthetic_hsk(n_words, seed=1):
+    rng = random.Random(seed)
+    vocabulary = {}
+    while len(vocabulary) < n_words:
+        length = rng.choice((1, 2, 2, 2, 3, 4))
+        word = "".join(chr(rng.randrange(0x4E00, 0x9FA5)) for _ in range(length))
+        vocabulary[word] = {
+            "pinyin": " ".join(syllable(rng) for _ in range(length)),
+            "translation": " ".join(rng.sample(ARABIC_WORDS, rng.choice((1, 2))))
+        }
+    return vocabulary
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    n_words = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    vocabulary = synthetic_hsk(n_words)
+
+    index, build_time = timed(AutocompleteIndex.build, vocabulary)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "index.json")
+        _, save_time = timed(index.save, path, "bench")
+        size = os.path.getsize(path)
+        loaded, load_time = timed(AutocompleteIndex.load, path, "bench")
+    assert loaded is not None
+
+    rng = random.Random(2)
+    words = list(vocabulary)
+    queries = []
+    for _ in range(2000):
+        word = rng.choice(words)
+        item = vocabulary[word]
+        queries.append(rng.choice([
+            word[:1],
+            item["pinyin"].split()[0],
+            item["pinyin"].replace(" ", "")[:3],
+            item["translation"][:2],
+        ]))
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        loaded.complete(query, 8)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    latencies.sort()
+
+    print(f"words:        {n_words}")
+    print(f"index keys:   {len(index.keys)}")
+    print(f"build:        {build_time * 1000:.1f} ms")
+    print(f"save:         {save_time * 1000:.1f} ms ({size / 1024:.0f} KiB)")
+    print(f"load:         {load_time * 1000:.1f} ms")
+    print(f"query p50:    {statistics.median(latencies):.1f} us")
+    print(f"query p99:    {latencies[int(len(latencies) * 0.99)]:.1f} us")
+
+
+if __name__ == '__main__':
+    main()
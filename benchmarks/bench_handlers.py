@@ -0,0 +1,416 @@
+"""اختبار حمل للمعالجات دون توكن أو شبكة: تحديثات تيليجرام اصطناعية تمر عبر Application.process_update.
+
+كل تركيبة (عدد المستخدمين × حجم المحتوى) تعمل في عملية منفصلة داخل مجلد مؤقت: تُولَّد البيانات
+أولاً ثم يُستورد bot.py فيحمّلها كما عند الإقلاع. Bot يستخدم RecordingRequest بدل الشبكة، وأزرار
+آخر رسالة أُرسلت إلى المستخدم تُضغط كما يفعل المستخدم (تصفح، اختبار، بطاقات، محادثات المشرف).
+
+لكل سيناريو: p50/p99 لزمن التحديث، التحديثات في الثانية، البايتات المكتوبة لكل تحديث (بعد flush)،
+واستدعاءات Bot API لكل تحديث؛ ولكل تركيبة: أقصى ذاكرة مقيمة.
+
+    python benchmarks/bench_handlers.py --users 1000,10000,100000 --content 1000,10000 --save base.json
+    python benchmarks/bench_handlers.py --users 1000,10000,100000 --content 1000,10000 --compare base.json
+
+مع --compare يخرج بالرمز 1 إذا ساء أي مقياس أكثر من --threshold (نسبة) مقارنة بالملف المحفوظ.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+from telegram import Update
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import config  # noqa: E402
+from quiz_engine import encode_start  # noqa: E402
+
+SCENARIOS = ("start", "menus", "browse", "quiz", "flashcards", "dictionary", "search", "admin")
+# المقاييس التي يسوء فيها الأداء بالزيادة، والتي يسوء بالنقصان
+HIGHER_IS_WORSE = ("p50_ms", "p99_ms", "bytes_per_update")
+LOWER_IS_WORSE = ("updates_per_s",)
+
+FIRST_USER_ID = 10 ** 6
+QUIZZES = 20
+QUESTIONS_PER_QUIZ = 5
+HANZI = "的一是不了人我在有他这中大来上国个到说们为子和地出道也时年得就那要下以生会自着去之过家学对可里后小么心多天而能好都然没日于起还发成事只作当想看文无开手十用主行方又如前所本见经头面公同三已老从动两长知民样现分将外但身些与高意进把法此实回二理美点月明其种声全工己话儿者向情部正名定女问力机给等几很业最间新什打便位因重被走电四第门相次东政海口使教西再平真听世气信北少关并内加化由却代军产入先山五太水万市眼体别处总才场师书比住员九笑性通目华报立马命张活难神数件安表原车白应路期叫死常提感金何更反合放做系它"
+SYLLABLES = ("de", "yi1", "shi4", "bu4", "le", "ren2", "wo3", "zai4", "you3", "ta1", "zhe4", "zhong1", "da4", "lai2", "shang4", "guo2")
+TRANSLATIONS = ("كتاب", "ماء", "بيت", "مدرسة", "صديق", "طعام", "سوق", "مدينة", "قلب", "سماء", "طريق", "عمل", "وقت", "لغة", "باب", "نهر")
+
+
+def word_at(index):
+    """كلمة صينية فريدة لكل رقم (أرقام بأساس len(HANZI))، من حرفين على الأقل"""
+    chars = []
+    while True:
+        index, digit = divmod(index, len(HANZI))
+        chars.append(HANZI[digit])
+        if not index and len(chars) > 1:
+            return "".join(chars)
+
+
+def pinyin_of(word):
+    return "".join(SYLLABLES[HANZI.index(char) % len(SYLLABLES)] for char in word)
+
+
+def populate(n_users, n_content, seed):
+    """توليد المحتوى والمستخدمين على القرص بالواجهات العادية، ثم إغلاقها قبل تشغيل البوت"""
+    from content_manager import ContentManager
+    from user_manager import UserManager
+
+    rng = random.Random(seed)
+    content = ContentManager()
+    content.import_items("vocabulary", {
+        word_at(i): {"pinyin": pinyin_of(word_at(i)), "translation": f"{TRANSLATIONS[i % len(TRANSLATIONS)]} {i}", "level": 1 + i % 6}
+        for i in range(n_content)
+    })
+    content.import_items("lessons", {
+        f"lesson{i}": {"title": f"الدرس {i}", "description": TRANSLATIONS[i % len(TRANSLATIONS)],
+                       "content": " ".join(TRANSLATIONS) * 4, "quiz_id": None, "level": 1 + i % 6}
+        for i in range(max(1, n_content // 10))
+    })
+    content.import_items("phrases", {
+        f"phrase{i}": {"text": word_at(i) + word_at(i + 1), "translation": " ".join(rng.sample(TRANSLATIONS, 4))}
+        for i in range(max(1, n_content // 10))
+    })
+    content.import_items("quizzes", {
+        f"quiz{q}": {"title": f"اختبار {q}", "questions": [
+            {"question": f"ما معنى {word_at(q * QUESTIONS_PER_QUIZ + i)}؟", "options": list(TRANSLATIONS[:4]), "answer_index": i % 4}
+            for i in range(QUESTIONS_PER_QUIZ)
+        ]}
+        for q in range(QUIZZES)
+    })
+    content.close()
+
+    users = UserManager(write_behind=False)
+    with users.batch():
+        for i in range(n_users):
+            user_id = FIRST_USER_ID + i
+            users.create_user(user_id, f"user{user_id}", f"u{i}")
+            if i % 10 == 0:
+                users.add_xp(user_id, rng.randrange(1, 500))
+    users.close()
+
+
+def written_bytes():
+    """البايتات التي كتبتها العملية حتى الآن (wchar: كل write، بما فيها ما لم يصل القرص بعد)"""
+    with open("/proc/self/io") as f:
+        for line in f:
+            if line.startswith("wchar:"):
+                return int(line.split()[1])
+    return 0
+
+
+class Harness:
+    """بناء التحديثات وتمريرها إلى Application كما يصل من تيليجرام"""
+
+    def __init__(self, bot, application, request, n_users, rng):
+        self.bot = bot
+        self.application = application
+        self.request = request
+        self.n_users = n_users
+        self.rng = rng
+        self.update_id = 0
+        self.new_users = 0
+
+    def user(self):
+        return FIRST_USER_ID + self.rng.randrange(self.n_users)
+
+    def _sender(self, user_id):
+        return {"id": user_id, "is_bot": False, "first_name": f"u{user_id}", "username": f"user{user_id}"}
+
+    def _message(self, user_id, **fields):
+        self.update_id += 1
+        return {"update_id": self.update_id, "message": {
+            "message_id": self.update_id, "date": int(time.time()), "chat": {"id": user_id, "type": "private"},
+            "from": self._sender(user_id), **fields
+        }}
+
+    def command(self, user_id, command):
+        return self._message(user_id, text=command, entities=[{"type": "bot_command", "offset": 0, "length": len(command)}])
+
+    def text(self, user_id, text):
+        return self._message(user_id, text=text)
+
+    def document(self, user_id, file_name, data=b"data"):
+        file_id = f"file{self.update_id}"
+        self.request.files[file_id] = data
+        return self._message(user_id, document={
+            "file_id": file_id, "file_unique_id": file_id, "file_name": file_name, "file_size": len(data)
+        })
+
+    def press(self, user_id, data):
+        self.update_id += 1
+        return {"update_id": self.update_id, "callback_query": {
+            "id": str(self.update_id), "from": self._sender(user_id), "chat_instance": str(user_id), "data": data,
+            "message": {"message_id": 1, "date": int(time.time()), "chat": {"id": user_id, "type": "private"},
+                        "from": {"id": 1, "is_bot": True, "first_name": "Fake"}, "text": "menu"}
+        }}
+
+    def buttons(self, user_id, prefix=""):
+        return [data for data in self.request.keyboards.get(str(user_id), ()) if data.startswith(prefix)]
+
+    def press_shown(self, user_id, prefix, fallback):
+        """ضغط زر عشوائي يبدأ بـ prefix من آخر رسالة، أو fallback إن لم يوجد"""
+        shown = self.buttons(user_id, prefix)
+        return self.press(user_id, self.rng.choice(shown) if shown else fallback)
+
+    async def process(self, update):
+        await self.application.process_update(Update.de_json(update, self.application.bot))
+        # معالج النصوص غير حاجب (block=False): انتظار مهامه حتى يكتمل زمن التحديث
+        current = asyncio.current_task()
+        pending = [task for task in asyncio.all_tasks() if task is not current and not task.done()]
+        while pending:
+            await asyncio.gather(*pending)
+            pending = [task for task in asyncio.all_tasks() if task is not current and not task.done()]
+
+    # السيناريوهات: مولدات تحديثات؛ كل تحديث يُبنى بعد معالجة السابق فيرى لوحته
+
+    def scenario_start(self, ops):
+        for i in range(ops):
+            if i % 10 == 0:
+                # مستخدم جديد يسجل
+                self.new_users += 1
+                yield self.command(FIRST_USER_ID + self.n_users + self.new_users, "/start")
+            else:
+                yield self.command(self.user(), "/start")
+
+    def scenario_menus(self, ops):
+        choices = ("MENU_HSK", "MENU_Quizzes", "MENU_Admin", "MENU_AITutor", "SEC_HSK1", "SEC_HSK4", "BACK")
+        for _ in range(ops):
+            yield self.press(self.user(), self.rng.choice(choices))
+
+    def scenario_browse(self, ops):
+        user_id = self.user()
+        for i in range(ops):
+            if i % 10 == 0:
+                user_id = self.user()
+                yield self.press(user_id, f"SEC_HSK{self.rng.randrange(1, 7)}")
+            else:
+                yield self.press_shown(user_id, "PG" if i % 3 else "", "BACK")
+
+    def scenario_quiz(self, ops):
+        user_id = None
+        for _ in range(ops):
+            if user_id is None or not self.buttons(user_id, "QZ"):
+                user_id = self.user()
+                yield self.press(user_id, encode_start(self.rng.randrange(QUIZZES)))
+            else:
+                yield self.press_shown(user_id, "QZ", "BACK")
+
+    def scenario_flashcards(self, ops):
+        user_id = self.user()
+        for i in range(ops):
+            if i % 12 == 0:
+                user_id = self.user()
+                yield self.press(user_id, "MENU_Flashcards")
+            elif self.buttons(user_id, "FCS"):
+                yield self.press_shown(user_id, "FCS", "MENU_Flashcards")
+            else:
+                yield self.press_shown(user_id, "FCR", "MENU_Flashcards")
+
+    def scenario_dictionary(self, ops):
+        user_id = self.user()
+        for i in range(ops):
+            if i % 10 == 0:
+                user_id = self.user()
+                yield self.press(user_id, "MENU_Dictionary")
+            else:
+                word = word_at(self.rng.randrange(len(HANZI) ** 2))
+                query = self.rng.choice((word[:1], pinyin_of(word)[:3], self.rng.choice(TRANSLATIONS)))
+                yield self.text(user_id, query)
+
+    def scenario_search(self, ops):
+        manager = self.bot.content_manager
+        for _ in range(ops):
+            yield lambda: manager.search_content(self.rng.choice(TRANSLATIONS))
+
+    def scenario_admin(self, ops):
+        admin = config.ADMIN_IDS[0]
+        rows = "\n".join(json.dumps({"word": f"新{i}", "pinyin": f"xin{i}", "translation": f"جديد {i}", "level": 2},
+                                    ensure_ascii=False) for i in range(50))
+        flows = (
+            lambda n: [self.press(admin, "ADM_ADD"), self.text(admin, f"عنوان {n}"), self.text(admin, "محتوى " * 50)],
+            lambda n: [self.press(admin, "ADM_UP"), self.press(admin, "UPSEC_HSK"), self.document(admin, f"file{n}.pdf")],
+            lambda n: [self.press(admin, "ADM_IMPORT"), self.press(admin, "IMPTYPE_vocabulary"),
+                       self.document(admin, f"import{n}.jsonl", rows.replace("新", f"新{n}_").encode())],
+        )
+        done = flow = 0
+        while done < ops:
+            for update in flows[flow % len(flows)](flow):
+                yield update
+                done += 1
+            flow += 1
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+async def run_scenarios(bot, request, n_users, ops, names, rng):
+    application = bot.build_application(request=request)
+    await application.initialize()
+    harness = Harness(bot, application, request, n_users, rng)
+    results = {}
+    for name in names:
+        latencies = []
+        calls_before = sum(request.api.calls.values())
+        written_before = written_bytes()
+        start = time.perf_counter()
+        for update in getattr(harness, f"scenario_{name}")(ops):
+            began = time.perf_counter_ns()
+            if callable(update):
+                update()
+            else:
+                await harness.process(update)
+            latencies.append(time.perf_counter_ns() - began)
+        # الكتابة المؤجلة جزء من تكلفة السيناريو
+        bot.user_manager.flush()
+        elapsed = time.perf_counter() - start
+        latencies.sort()
+        results[name] = {
+            "updates": len(latencies),
+            "p50_ms": round(percentile(latencies, 0.5) / 1e6, 3),
+            "p99_ms": round(percentile(latencies, 0.99) / 1e6, 3),
+            "updates_per_s": round(len(latencies) / elapsed, 1),
+            "bytes_per_update": round((written_bytes() - written_before) / len(latencies), 1),
+            "api_calls_per_update": round((sum(request.api.calls.values()) - calls_before) / len(latencies), 2),
+        }
+    await application.shutdown()
+    return results
+
+
+def child(n_users, n_content, ops, names, seed):
+    rng = random.Random(seed)
+    directory = tempfile.mkdtemp(prefix="bench_handlers_")
+    os.chdir(directory)
+    start = time.perf_counter()
+    # التوليد في عملية منفصلة حتى لا تدخل ذاكرته في أقصى ذاكرة البوت
+    process = multiprocessing.get_context("spawn").Process(target=populate, args=(n_users, n_content, seed))
+    process.start()
+    process.join()
+    if process.exitcode:
+        raise RuntimeError(f"populate failed (exit code {process.exitcode})")
+    setup = time.perf_counter() - start
+
+    import logging
+    from telegram.warnings import PTBUserWarning
+    from fake_bot_api import RecordingRequest
+    # Application لا يعمل (لا start)، فمهام المعالجات غير الحاجبة تُنتظر يدوياً في Harness.process
+    warnings.filterwarnings("ignore", category=PTBUserWarning)
+    start = time.perf_counter()
+    import bot
+    logging.getLogger().setLevel(logging.WARNING)
+    load = time.perf_counter() - start
+
+    results = asyncio.run(run_scenarios(bot, RecordingRequest(), n_users, ops, names, rng))
+    bot.close_managers()
+    os.chdir(ROOT)
+    shutil.rmtree(directory)
+    return {
+        "users": n_users, "content": n_content, "setup_s": round(setup, 2), "load_s": round(load, 2),
+        # ru_maxrss بالكيلوبايت على لينكس
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "scenarios": results,
+    }
+
+
+def run_child(n_users, n_content, args):
+    env = {**os.environ, "BOT_TOKEN": "123:fake", "STORAGE_BACKEND": args.backend, "TELEGRAM_BASE_URL": ""}
+    env.pop("GROQ_API_KEY", None)
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", "--users", str(n_users), "--content", str(n_content),
+         "--ops", str(args.ops), "--scenarios", ",".join(args.scenarios), "--seed", str(args.seed)],
+        env=env, stdout=subprocess.PIPE, check=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def flatten(runs):
+    """{"users/content/scenario": مقاييس} و{"users/content": peak_rss_mb} للمقارنة"""
+    metrics = {}
+    for run in runs:
+        key = f"{run['users']}/{run['content']}"
+        metrics[key] = {"peak_rss_mb": run["peak_rss_mb"]}
+        for name, values in run["scenarios"].items():
+            metrics[f"{key}/{name}"] = values
+    return metrics
+
+
+def compare(runs, baseline_path, threshold):
+    """قائمة المقاييس التي ساءت أكثر من threshold مقارنة بالملف المحفوظ"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = flatten(json.load(f)["runs"])
+    regressions = []
+    for key, values in flatten(runs).items():
+        for metric, value in values.items():
+            old = baseline.get(key, {}).get(metric)
+            if not old:
+                continue
+            change = value / old - 1
+            if (metric in HIGHER_IS_WORSE or metric == "peak_rss_mb") and change > threshold or \
+                    metric in LOWER_IS_WORSE and -change > threshold:
+                regressions.append(f"{key} {metric}: {old} -> {value} ({change:+.0%})")
+    return regressions
+
+
+def print_run(run):
+    print(f"\nusers: {run['users']}  content: {run['content']}  peak RSS: {run['peak_rss_mb']} MiB  "
+          f"(setup {run['setup_s']}s, bot import {run['load_s']}s)")
+    print(f"  {'scenario':<11}{'p50 ms':>9}{'p99 ms':>9}{'upd/s':>9}{'B/upd':>9}{'API/upd':>9}")
+    for name, values in run["scenarios"].items():
+        print(f"  {name:<11}{values['p50_ms']:>9.2f}{values['p99_ms']:>9.2f}{values['updates_per_s']:>9.0f}"
+              f"{values['bytes_per_update']:>9.0f}{values['api_calls_per_update']:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", default="1000,10000,100000", help="أعداد المستخدمين مفصولة بفواصل")
+    parser.add_argument("--content", default="1000,10000", help="أعداد المفردات مفصولة بفواصل")
+    parser.add_argument("--ops", type=int, default=500, help="تحديثات لكل سيناريو")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--backend", default="json", choices=("json", "sqlite"))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", help="حفظ النتائج في ملف JSON")
+    parser.add_argument("--compare", help="ملف نتائج سابق للمقارنة")
+    parser.add_argument("--threshold", type=float, default=0.25, help="أقصى نسبة تراجع مسموحة")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.scenarios = [name for name in args.scenarios.split(",") if name]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    if args.child:
+        result = child(int(args.users), int(args.content), args.ops, args.scenarios, args.seed)
+        print(json.dumps(result))
+        return
+
+    runs = []
+    for n_users in map(int, args.users.split(",")):
+        for n_content in map(int, args.content.split(",")):
+            runs.append(run_child(n_users, n_content, args))
+            print_run(runs[-1])
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"backend": args.backend, "ops": args.ops, "runs": runs}, f, indent=2)
+    if args.compare:
+        regressions = compare(runs, args.compare, args.threshold)
+        print(f"\nregressions over {args.threshold:.0%}: {len(regressions)}")
+        for line in regressions:
+            print(f"  {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
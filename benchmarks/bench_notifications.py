@@ -0,0 +1,56 @@
+"""قياس إرسال الإشعارات عبر NotificationDispatcher مقابل خادم Bot API وهمي.
+
+الاستخدام: python benchmarks/bench_notifications.py [عدد المستخدمين] [معدل الخادم/ثانية]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import Bot  # noqa: E402
+
+from fake_bot_api import FakeBotAPI  # noqa: E402
+from notification_delivery import NotificationDispatcher  # noqa: E402
+from storage import JSONStorage  # noqa: E402
+from user_manager import UserManager  # noqa: E402
+
+
+async def main():
+    n_users = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    server_rate = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = JSONStorage(os.path.join(tmp, "data.json"), os.path.join(tmp, "notifications.json"))
+        users = UserManager(storage=storage, write_behind=True)
+        for user_id in range(1, n_users + 1):
+            users.create_user(user_id).last_activity = datetime(2000, 1, 1).timestamp()
+        queued = users.queue_daily_reminders()
+        users.queue_daily_reminders()
+
+        api = await FakeBotAPI(global_rate=server_rate).start()
+        bot = Bot("123:fake", base_url=api.base_url)
+        dispatcher = NotificationDispatcher(users, rate=server_rate * 0.9, batch_size=1000)
+
+        async with bot:
+            start = time.perf_counter()
+            while await dispatcher.deliver_batch(bot):
+                pass
+            elapsed = time.perf_counter() - start
+
+        await api.stop()
+        users.close()
+
+    print(f"users:          {n_users}")
+    print(f"queued:         {queued} reminders (x2, coalesced per chat)")
+    print(f"sent messages:  {dispatcher.stats['sent']}")
+    print(f"failed:         {dispatcher.stats['failed']}")
+    print(f"429 responses:  {api.flood_errors}")
+    print(f"elapsed:        {elapsed:.1f} s ({dispatcher.stats['sent'] / elapsed:.1f} msg/s)")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
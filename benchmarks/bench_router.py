@@ -0,0 +1,74 @@
+"""قياس سرعة توجيه الأزرار: سلسلة startswith القديمة مقابل جدول CallbackRouter، وسرعة ترميز callback_data.
+
+الاستخدام: python benchmarks/bench_router.py [عدد التكرارات]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from router import CallbackRouter, encode, unpack  # noqa: E402
+
+PREFIXES = ["BACK", "MENU", "SEC", "FCS", "FCR", "AI", "QZS", "QZL", "QZ", "SKIP", "quiz"]
+
+
+async def handler(query, context, payload):
+    return payload
+
+
+def legacy_dispatch(data):
+    # نسخة من سلسلة elif القديمة في button_handler
+    if data == "BACK":
+        return handler
+    elif data.startswith("MENU_"):
+        return handler
+    elif data.startswith("SEC_"):
+        return handler
+    elif data.startswith("FC_"):
+        return handler
+    elif data.startswith("AI_"):
+        return handler
+    elif data.startswith("QZS_"):
+        return handler
+    elif data.startswith("QZ"):
+        return handler
+    elif data.startswith("SKIP_"):
+        return handler
+    elif data.startswith("quiz_answer_"):
+        return handler
+    return None
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    router = CallbackRouter()
+    for prefix in PREFIXES:
+        router.route(prefix)(handler)
+
+    new_data = ["BACK", "MENU_HSK", "SEC_HSK3", encode("FCS", 1234), encode("FCR", 1234, 4), "AI_explain",
+                encode("QZS", 1), encode("QZ", 0xABCDEF, 3, 2), "SKIP_Content", "quiz_answer_1_2"]
+    old_data = ["BACK", "MENU_HSK", "SEC_HSK3", "FC_SHOW_1234", "FC_RATE_1234_4", "AI_explain",
+                "QZS_quiz1", "QZabcdef.3.2", "SKIP_Content", "quiz_answer_1_2"]
+
+    def run_legacy():
+        for data in old_data:
+            legacy_dispatch(data)
+
+    def run_router():
+        for data in new_data:
+            router.resolve(data)
+
+    for name, fn in (("startswith chain", run_legacy), ("router table", run_router)):
+        seconds = min(timeit.repeat(fn, number=number // len(new_data), repeat=5))
+        print(f"{name:18s} {number / seconds / 1e6:6.2f} M dispatch/s")
+
+    # ترميز القسم + رقم العنصر + الصفحة
+    payload = encode("PG", 5, 123456, 42)
+    seconds = min(timeit.repeat(lambda: unpack(encode("PG", 5, 123456, 42)[3:]), number=number, repeat=3))
+    print(f"codec round trip   {number / seconds / 1e6:6.2f} M/s, e.g. {payload!r} ({len(payload)} bytes)")
+    print(f"worst case (3 x 2^32-1): {len(encode('PG', 2**32 - 1, 2**32 - 1, 2**32 - 1))} bytes (limit 64)")
+
+
+if __name__ == '__main__':
+    main()
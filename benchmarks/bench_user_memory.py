@@ -0,0 +1,113 @@
+"""قياس الذاكرة المقيمة لسجلات المستخدمين: القواميس المتداخلة القديمة مقابل UserRecord.
+
+كل مستخدم يُحمّل من JSON كما يحدث عند الإقلاع (النصوص غير مشتركة بين المستخدمين).
+
+الاستخدام: python benchmarks/bench_user_memory.py [عدد المستخدمين]
+"""
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from user_record import UserRecord  # noqa: E402
+
+
+def legacy_user(rng, now):
+    """سجل بالشكل الذي كان create_user ينشئه"""
+    joined = now - timedelta(days=rng.randrange(365))
+    return {
+        "info": {
+            "username": f"user{rng.randrange(10 ** 8)}",
+            "first_name": rng.choice(["أحمد", "محمد", "Li", "Sara", "فاطمة"]),
+            "last_name": "",
+            "join_date": joined.isoformat(),
+            "language": "ar",
+            "is_premium": False
+        },
+        "learning": {
+            "level": "مبتدئ",
+            "current_streak": rng.randrange(30),
+            "longest_streak": rng.randrange(30, 90),
+            "total_xp": rng.randrange(5000),
+            "daily_goal": 3,
+            "lessons_today": rng.randrange(5),
+            "last_activity": (now - timedelta(seconds=rng.randrange(86400 * 7))).isoformat()
+        },
+        "progress": {
+            "completed_lessons": [],
+            "completed_quizzes": [f"quiz{i}" for i in range(rng.randrange(3))],
+            "weak_areas": ["المفردات", "القواعد"],
+            "strong_areas": [],
+            "achievements": []
+        },
+        "stats": {
+            "total_days": rng.randrange(1, 200),
+            "total_lessons": rng.randrange(100),
+            "total_quizzes": rng.randrange(50),
+            "total_correct": rng.randrange(500),
+            "total_wrong": rng.randrange(200),
+            "accuracy": rng.randrange(101)
+        },
+        "notifications": {
+            "daily_reminder": True,
+            "streak_warning": True,
+            "goal_achievement": True,
+            "weekly_report": True,
+            "last_notification": None
+        },
+        "temporary": {
+            "current_lesson": None,
+            "current_quiz": None,
+            "quiz_answers": [],
+            "waiting_for": None
+        }
+    }
+
+
+def measure(build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size, elapsed
+
+
+def main():
+    n_users = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = random.Random(1)
+    now = datetime.now()
+    encoded = json.dumps({str(i): legacy_user(rng, now) for i in range(n_users)}, ensure_ascii=False)
+
+    legacy, legacy_size, legacy_time = measure(lambda: json.loads(encoded))
+
+    del legacy
+
+    def load_records():
+        # القواميس المؤقتة تُحرر بعد التحويل، ويبقى فقط ما يشير إليه السجل
+        return {user_id: UserRecord.from_dict(user)[0] for user_id, user in json.loads(encoded).items()}
+
+    records, record_size, record_time = measure(load_records)
+
+    print(f"users: {n_users}")
+    print(f"nested dicts: {legacy_size / 2 ** 20:7.1f} MiB  {legacy_size / n_users:6.0f} B/user  (json.loads {legacy_time:.2f}s)")
+    print(f"UserRecord:   {record_size / 2 ** 20:7.1f} MiB  {record_size / n_users:6.0f} B/user  (json.loads + from_dict {record_time:.2f}s)")
+    print(f"ratio: {legacy_size / record_size:.1f}x")
+
+    # مسار التسجيل الساخن: بدون setdefault، مجرد وصول لخانات
+    record = next(iter(records.values()))
+    start = time.perf_counter()
+    for _ in range(1_000_000):
+        record.total_xp += 1
+        record.lessons_today += 1
+    print(f"hot counter update: {(time.perf_counter() - start) * 1000:.0f} ns/op (2 fields)")
+
+
+if __name__ == '__main__':
+    main()
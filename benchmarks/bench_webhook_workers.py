@@ -0,0 +1,103 @@
+"""قياس معالجة التحديثات بعدة عمليات خلف موزع webhook.py.
+
+كل عملية تُشغّل البوت الحقيقي (bot.build_worker) على قاعدة SQLite مشتركة، وردودها تذهب إلى خادم
+Bot API وهمي في عملية منفصلة (بدون حدود إرسال). التحديثات الاصطناعية (/start وضغط زر الرجوع)
+تُمرر إلى Dispatcher.route كما يفعل خادم HTTP.
+
+الاستخدام: python benchmarks/bench_webhook_workers.py [عدد التحديثات] [عدد العمليات...]
+"""
+import asyncio
+import json
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ["STORAGE_BACKEND"] = "sqlite"
+os.environ.setdefault("BOT_TOKEN", "123:fake")
+
+from fake_bot_api import FakeBotAPI  # noqa: E402
+from webhook import Dispatcher  # noqa: E402
+
+USERS = 500
+
+
+def synthetic_updates(count):
+    updates = []
+    now = int(time.time())
+    for update_id in range(count):
+        user_id = 1000 + update_id % USERS
+        user = {"id": user_id, "is_bot": False, "first_name": f"u{user_id}", "username": f"user{user_id}"}
+        chat = {"id": user_id, "type": "private"}
+        message = {"message_id": update_id, "date": now, "chat": chat, "from": user}
+        if update_id < USERS or update_id % 2:
+            update = {"update_id": update_id, "message": {
+                **message, "text": "/start", "entities": [{"type": "bot_command", "offset": 0, "length": 6}]
+            }}
+        else:
+            update = {"update_id": update_id, "callback_query": {
+                "id": str(update_id), "from": user, "chat_instance": str(user_id), "data": "BACK",
+                "message": {**message, "from": {"id": 1, "is_bot": True, "first_name": "Fake"}, "text": "menu"}
+            }}
+        updates.append(json.dumps(update).encode())
+    return updates
+
+
+def _fake_api(port, stop, results):
+    async def serve():
+        api = await FakeBotAPI(port=port, global_rate=10 ** 9, per_chat_interval=0).start()
+        results.put(api.port)
+        await asyncio.get_running_loop().run_in_executor(None, stop.wait)
+        results.put(sum(api.calls.values()))
+        await api.stop()
+    asyncio.run(serve())
+
+
+def run(workers, bodies, tmp):
+    context = multiprocessing.get_context("spawn")
+    stop, results = context.Event(), context.Queue()
+    api = context.Process(target=_fake_api, args=(0, stop, results))
+    api.start()
+    os.environ["TELEGRAM_BASE_URL"] = f"http://127.0.0.1:{results.get()}/bot"
+
+    directory = tempfile.mkdtemp(dir=tmp)
+    os.chdir(directory)
+    dispatcher = Dispatcher(workers, factory="bot:build_worker")
+    start = time.perf_counter()
+    for body in bodies:
+        while not dispatcher.route(body):
+            # طابور العملية ممتلئ: انتظار قصير كما يعيد تيليجرام الإرسال
+            time.sleep(0.001)
+    dispatcher.close()
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    api_calls = results.get()
+    api.join()
+    with sqlite3.connect(os.path.join(directory, "data.db")) as conn:
+        users = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+    os.chdir(ROOT)
+    return elapsed, api_calls, users
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    worker_counts = [int(arg) for arg in sys.argv[2:]] or sorted({1, 2, 4, os.cpu_count() or 1})
+    bodies = synthetic_updates(count)
+    print(f"cpus: {os.cpu_count()}  updates: {count}  users: {USERS}")
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in worker_counts:
+            elapsed, api_calls, users = run(workers, bodies, tmp)
+            rate = count / elapsed
+            baseline = baseline or rate
+            print(f"workers: {workers:2d}  {rate:8.0f} updates/s  x{rate / baseline:.2f}  "
+                  f"(Bot API calls: {api_calls}, users stored: {users})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""خادم Bot API وهمي محلي لاختبار الإرسال دون توكن حقيقي.
+
+يحاكي حدود تيليجرام (عام ولكل محادثة) ويرد بخطأ 429 مع retry_after عند تجاوزها،
+ويسجل كل الاستدعاءات. الاستخدام مع البوت:
+
+    python benchmarks/fake_bot_api.py 8081
+    TELEGRAM_BASE_URL=http://127.0.0.1:8081/bot BOT_TOKEN=123:fake python bot.py
+
+RecordingRequest يعطي الردود نفسها داخل العملية دون شبكة (Application.builder().request(...)).
+"""
+import asyncio
+import json
+import sys
+import time
+from collections import Counter, deque
+from urllib.parse import parse_qs
+
+from telegram.request import BaseRequest
+
+
+class FakeBotAPI:
+    def __init__(self, host="127.0.0.1", port=0, global_rate=30, per_chat_interval=1.0, latency=0.0):
+        self.host = host
+        self.port = port
+        self.global_rate = global_rate
+        self.per_chat_interval = per_chat_interval
+        self.latency = latency
+        self.calls = Counter()
+        self.messages = []
+        self.flood_errors = 0
+        self._recent = deque()
+        self._chat_last = {}
+        self._message_id = 0
+        self._server = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}/bot"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                _, path, _ = request_line.decode().split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                status, payload = await self._dispatch(path.rsplit("/", 1)[-1], headers, body)
+                raw = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Too Many Requests'}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(raw)}\r\n\r\n".encode() + raw
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    def _params(self, headers, body):
+        if not body:
+            return {}
+        if headers.get("content-type", "").startswith("application/json"):
+            return json.loads(body)
+        return {k: v[0] for k, v in parse_qs(body.decode()).items()}
+
+    def _flood_check(self, chat_id):
+        now = time.monotonic()
+        while self._recent and now - self._recent[0] > 1:
+            self._recent.popleft()
+        if len(self._recent) >= self.global_rate:
+            return 1
+        last = self._chat_last.get(chat_id)
+        if last is not None and now - last < self.per_chat_interval:
+            return 1
+        self._recent.append(now)
+        self._chat_last[chat_id] = now
+        return 0
+
+    async def _dispatch(self, method, headers, body):
+        params = self._params(headers, body)
+        self.calls[method] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if method == "getMe":
+            return 200, {"ok": True, "result": {
+                "id": 1, "is_bot": True, "first_name": "Fake", "username": "fake_bot",
+                "can_join_groups": True, "can_read_all_group_messages": False, "supports_inline_queries": False
+            }}
+        if method in ("sendMessage", "editMessageText", "sendPhoto", "sendDocument", "sendMediaGroup"):
+            chat_id = str(params.get("chat_id"))
+            retry_after = self._flood_check(chat_id)
+            if retry_after:
+                self.flood_errors += 1
+                return 429, {"ok": False, "error_code": 429, "description": f"Too Many Requests: retry after {retry_after}",
+                             "parameters": {"retry_after": retry_after}}
+            self._message_id += 1
+            self.messages.append((method, chat_id, params.get("text")))
+            return 200, {"ok": True, "result": {
+                "message_id": self._message_id, "date": int(time.time()),
+                "chat": {"id": int(chat_id), "type": "private"}, "text": params.get("text", "")
+            }}
+        # باقي الطرق (answerCallbackQuery، deleteWebhook...) تنجح دائماً
+        return 200, {"ok": True, "result": True}
+
+
+class RecordingRequest(BaseRequest):
+    """طبقة نقل وهمية لـ Bot داخل العملية: كل استدعاء يُرد عليه كما يرد FakeBotAPI ويُسجل.
+
+    keyboards[chat_id] أزرار آخر رسالة أُرسلت إلى المحادثة (callback_data) لمحاكاة ضغطها،
+    وfiles[file_id] محتوى الملفات التي يعيدها getFile والتنزيل.
+    """
+
+    def __init__(self, api=None):
+        self.api = api or FakeBotAPI(global_rate=float("inf"), per_chat_interval=0)
+        self.keyboards = {}
+        self.files = {}
+
+    @property
+    def read_timeout(self):
+        return None
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None, write_timeout=None,
+                         connect_timeout=None, pool_timeout=None):
+        if method == "GET":
+            # تنزيل ملف: الرابط ينتهي بـ file_path الذي أعاده getFile
+            return 200, self.files[url.rsplit("/", 1)[-1]]
+        endpoint = url.rsplit("/", 1)[-1]
+        params = request_data.parameters if request_data else {}
+        if endpoint == "getFile":
+            self.api.calls[endpoint] += 1
+            file_id = params["file_id"]
+            return 200, json.dumps({"ok": True, "result": {
+                "file_id": file_id, "file_unique_id": file_id, "file_size": len(self.files[file_id]), "file_path": file_id
+            }}).encode()
+        markup = params.get("reply_markup")
+        if markup and "chat_id" in params:
+            self.keyboards[str(params["chat_id"])] = [
+                button["callback_data"] for row in markup.get("inline_keyboard", ()) for button in row if "callback_data" in button
+            ]
+        body = request_data.json_payload if request_data else b""
+        status, payload = await self.api._dispatch(endpoint, {"content-type": "application/json"}, body)
+        return status, json.dumps(payload).encode()
+
+
+async def _serve(port):
+    api = await FakeBotAPI(port=port).start()
+    print(f"Fake Bot API listening on {api.base_url}")
+    await asyncio.Event().wait()
+
+
+if __name__ == '__main__':
+    asyncio.run(_serve(int(sys.argv[1]) if len(sys.argv) > 1 else 8081))
@@ -0,0 +1,120 @@
+"""خادم Groq وهمي محلي (واجهة chat completions المتوافقة مع OpenAI) لاختبار المعلم الذكي دون مفتاح.
+
+يبث إجابة ثابتة كلمة كلمة مع تأخير قابل للضبط (وتذبذب عشوائي اختياري)،
+ويعد الطلبات الواصلة إليه وأقصى عدد منها في نفس الوقت. الاستخدام مع البوت:
+
+    python benchmarks/fake_groq_api.py 8082
+    GROQ_BASE_URL=http://127.0.0.1:8082 GROQ_API_KEY=fake python bot.py
+"""
+import asyncio
+import json
+import random
+import sys
+import time
+
+
+class FakeGroqAPI:
+    def __init__(self, host="127.0.0.1", port=0, first_token_delay=0.5, token_delay=0.02, tokens=40, jitter=0.0):
+        self.host = host
+        self.port = port
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.tokens = tokens
+        self.jitter = jitter
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._server = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    def answer_tokens(self, prompt):
+        return [f"({prompt})"] + [f" token{i}" for i in range(self.tokens - 1)]
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+                try:
+                    await self._completion(writer, json.loads(body) if body else {})
+                finally:
+                    self.in_flight -= 1
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    def _chunk(self, model, delta, finish_reason=None):
+        return {
+            "id": f"chatcmpl-{self.requests}", "object": "chat.completion.chunk", "created": int(time.time()),
+            "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        }
+
+    async def _completion(self, writer, params):
+        self.requests += 1
+        model = params.get("model", "fake")
+        prompt = params.get("messages", [{}])[-1].get("content", "")
+        tokens = self.answer_tokens(prompt)
+        await asyncio.sleep(self.first_token_delay + random.uniform(0, self.jitter))
+
+        if not params.get("stream"):
+            raw = json.dumps({
+                "id": f"chatcmpl-{self.requests}", "object": "chat.completion", "created": int(time.time()),
+                "model": model, "choices": [{"index": 0, "finish_reason": "stop",
+                                             "message": {"role": "assistant", "content": "".join(tokens)}}],
+                "usage": {"prompt_tokens": 1, "completion_tokens": len(tokens), "total_tokens": len(tokens) + 1}
+            }).encode()
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                         + f"Content-Length: {len(raw)}\r\n\r\n".encode() + raw)
+            await writer.drain()
+            return
+
+        # بث SSE بترميز chunked
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nTransfer-Encoding: chunked\r\n\r\n")
+        events = [self._chunk(model, {"role": "assistant", "content": token}) for token in tokens]
+        events.append(self._chunk(model, {}, "stop"))
+        for i, event in enumerate(events):
+            if i:
+                await asyncio.sleep(self.token_delay)
+            self._write_chunk(writer, f"data: {json.dumps(event)}\n\n".encode())
+            await writer.drain()
+        self._write_chunk(writer, b"data: [DONE]\n\n")
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    @staticmethod
+    def _write_chunk(writer, data):
+        writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+
+async def _serve(port):
+    api = await FakeGroqAPI(port=port).start()
+    print(f"Fake Groq API listening on {api.base_url}")
+    await asyncio.Event().wait()
+
+
+if __name__ == '__main__':
+    asyncio.run(_serve(int(sys.argv[1]) if len(sys.argv) > 1 else 8082))
@@ -0,0 +1,55 @@
+"""محاكاة ضغط على المعلم الذكي: مستخدم يغرق البوت بطلبات طويلة بينما يرسل مستخدمون آخرون طلبات قصيرة.
+
+تعمل مقابل خادم Groq وهمي بتأخير مُحقن، وتتحقق من حد التزامن وتطبع زمن الانتظار لكل فئة ومقاييس المجدول.
+الاستخدام: python benchmarks/sim_groq_scheduler.py [طلبات المستخدم المُغرِق] [عدد المستخدمين الآخرين]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from groq import AsyncGroq  # noqa: E402
+
+from ai_tutor import AITutor  # noqa: E402
+from fake_groq_api import FakeGroqAPI  # noqa: E402
+from llm_scheduler import GroqScheduler  # noqa: E402
+
+
+async def timed(tutor, user_id, text):
+    start = time.perf_counter()
+    await tutor.ask("translate", text, user_id)
+    return time.perf_counter() - start
+
+
+async def main():
+    heavy_requests = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    light_users = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    concurrency = 4
+
+    api = await FakeGroqAPI(first_token_delay=0.3, jitter=0.2, token_delay=0.005, tokens=20).start()
+    scheduler = GroqScheduler(concurrency=concurrency, tokens_per_minute=10 ** 6, max_queue=500,
+                              max_per_user=heavy_requests)
+    tutor = AITutor(client=AsyncGroq(api_key="fake", base_url=api.base_url, max_retries=0), scheduler=scheduler)
+
+    heavy = [asyncio.create_task(timed(tutor, "heavy", f"{i} " + "长句子" * 300)) for i in range(heavy_requests)]
+    await asyncio.sleep(0.05)
+    light = [asyncio.create_task(timed(tutor, f"user{i}", f"你好 {i}")) for i in range(light_users)]
+
+    light_waits = await asyncio.gather(*light)
+    heavy_waits = await asyncio.gather(*heavy)
+    metrics = scheduler.metrics()
+    await scheduler.close()
+    await api.stop()
+
+    assert api.max_in_flight <= concurrency, api.max_in_flight
+    print(f"upstream max in flight: {api.max_in_flight} (limit {concurrency})")
+    print(f"light users  p50 / max: {statistics.median(light_waits):.2f} / {max(light_waits):.2f} s")
+    print(f"heavy user   p50 / max: {statistics.median(heavy_waits):.2f} / {max(heavy_waits):.2f} s")
+    print(f"scheduler: {metrics}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
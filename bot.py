@@ -1,14 +1,20 @@
-
 import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters, ConversationHandler
 from user_manager import UserManager
 from content_manager import ContentManager
-from config import BOT_TOKEN, ADMIN_IDS, GROQ_API_KEY, groq_client, DATA_FILE, CONTENT_FILE
-import asyncio
-import os
-import json
-from datetime import datetime, timedelta
+from notification_delivery import NotificationDispatcher
+from flashcards import FlashcardScheduler, MIN_RATING, MAX_RATING
+from ai_tutor import AITutor, TASKS as AI_TASKS
+from content_import import import_bytes, format_report
+from file_registry import send_files
+from content_browser import ContentBrowser, PAGE_PREFIX, ITEM_PREFIX, HSK_LEVELS, section_code
+from menus import BACK_BUTTON, MenuRegistry
+from router import CallbackRouter, encode, unpack_exact
+from quiz_engine import QuizEngine, ANSWER_PREFIX, START_PREFIX, LIST_PREFIX, encode_answer, decode_answer
+from config import BOT_TOKEN, ADMIN_IDS, GROQ_API_KEY, TELEGRAM_BASE_URL, SECTION_FILES_MAX, CONCURRENT_UPDATES
+from config import WEBHOOK_URL, WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_SECRET
+from webhook import ApplicationWorker, ChatOrderedUpdateProcessor
 
 # إعداد التسجيل
 logging.basicConfig(
@@ -17,53 +23,36 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# تهيئة المديرين
+# تهيئة المديرين. قراءة المحتوى في المعالجات تمر عبر content_manager.run: خيط المحتوى نفسه الذي
+# يطبق التعديلات، فلا تتوقف حلقة الأحداث على تحميل ملف أو بناء فهرس ولا يتغير قاموس أثناء المرور عليه
 user_manager = UserManager()
 content_manager = ContentManager()
+notification_dispatcher = NotificationDispatcher(user_manager)
+flashcard_scheduler = FlashcardScheduler(user_manager)
+quiz_engine = QuizEngine(user_manager, content_manager)
+content_browser = ContentBrowser(content_manager)
+ai_tutor = AITutor() if GROQ_API_KEY else None
 
 # حالات المحادثة للمشرفين
-ADMIN_SECTION, ADMIN_TITLE, ADMIN_CONTENT, UPLOAD_FILE_SECTION, UPLOAD_FILE_RECEIVE = range(5)
+ADMIN_SECTION, ADMIN_TITLE, ADMIN_CONTENT, UPLOAD_FILE_SECTION, UPLOAD_FILE_RECEIVE, IMPORT_TYPE, IMPORT_FILE = range(7)
+
+# لوحات المفاتيح تُبنى مرة واحدة عند التشغيل
+menus = MenuRegistry(content_manager)
+# توجيه الأزرار حسب البادئة؛ المعالجات تُسجل بـ @router.route
+router = CallbackRouter()
 
-# دالة مساعدة للعودة إلى القائمة الرئيسية
 def back_to_main_keyboard():
-    keyboard = [[InlineKeyboardButton("◀️ رجوع", callback_data='BACK')]]
-    return InlineKeyboardMarkup(keyboard)
+    return menus.get("back")
 
-# لوحة المفاتيح الرئيسية
 def main_menu_keyboard(user_id):
-    items = [
-        ("📚 HSK", "MENU_HSK"),
-        ("🕌 القرآن", "MENU_Quran"),
-        ("🗂️ القاموس", "MENU_Dictionary"),
-        ("📖 القصص", "MENU_Stories"),
-        ("🔤 قواعد", "MENU_GrammarLessons"),
-        ("📑 مراجعة", "MENU_GrammarReview"),
-        ("💬 محادثات", "MENU_Dialogues"),
-        ("🃏 Flashcards", "MENU_Flashcards"),
-        ("❓ كويزات", "MENU_Quizzes"),
-        ("📷 معجم صور", "MENU_PictureDictionary"),
-        ("📱 التطبيقات", "MENU_Apps"),
-    ]
-    if user_manager.is_admin(user_id):
-        items.append(("⚙️ Admin", "MENU_Admin"))
-
-    kb, row = [], []
-    for i, (t, c) in enumerate(items, 1):
-        row.append(InlineKeyboardButton(t, callback_data=c))
-        if i % 3 == 0:
-            kb.append(row)
-            row = []
-    if row:
-        kb.append(row)
-    return InlineKeyboardMarkup(kb)
+    return menus.main(user_manager.is_admin(user_id))
 
 # دالة بدء البوت
 async def start(update: Update, context):
     user_id = update.effective_user.id
     first_name = update.effective_user.first_name or ""
 
-    user_manager.create_user(user_id, update.effective_user.username, first_name, update.effective_user.last_name)
-    user_manager.update_user_activity(user_id)
+    await user_manager.register(user_id, update.effective_user.username, first_name, update.effective_user.last_name)
 
     await update.message.reply_text(
         f"مرحباً بك يا {first_name}! اختر قسمًا:",
@@ -74,63 +63,277 @@ async def start(update: Update, context):
 async def button_handler(update: Update, context):
     query = update.callback_query
     user_id = query.from_user.id
-    user_manager.update_user_activity(user_id)
+    await user_manager.touch(user_id)
 
     await query.answer()
 
-    data = query.data
+    await router.dispatch(query, context)
 
-    if data == 'BACK':
-        await query.edit_message_text(
-            "مرحبًا! اختر قسمًا:",
-            reply_markup=main_menu_keyboard(user_id)
-        )
-    elif data.startswith("MENU_"):
-        await handle_menu(query, context)
-    elif data.startswith("SEC_"):
-        await handle_section(query, context)
-    elif data.startswith("SKIP_"):
-        sec = data.split("_", 1)[1]
-        await query.edit_message_text(f"قسم {sec}: قريبًا🔥", reply_markup=back_to_main_keyboard())
-    
-    # Fallback for old quiz buttons
-    elif data.startswith('quiz_answer_'):
-        await query.edit_message_text("وظيفة الاختبار غير مفعلة حاليًا في هذه الواجهة.", reply_markup=back_to_main_keyboard())
+@router.route("BACK")
+async def go_back(query, context, payload):
+    context.user_data.pop("mode", None)
+    await query.edit_message_text(
+        "مرحبًا! اختر قسمًا:",
+        reply_markup=main_menu_keyboard(query.from_user.id)
+    )
 
-async def handle_menu(query, context):
-    data = query.data
-    user_id = query.from_user.id
+@router.route("SKIP")
+async def coming_soon(query, context, payload):
+    await query.edit_message_text(f"قسم {payload}: قريبًا🔥", reply_markup=back_to_main_keyboard())
 
-    if data == "MENU_Admin":
-        if not user_manager.is_admin(user_id):
-            return await query.edit_message_text("⛔ للمشرفين فقط.", reply_markup=back_to_main_keyboard())
-        kb = [
-            [InlineKeyboardButton("➕ إضافة محتوى", callback_data="ADM_ADD")],
-            [InlineKeyboardButton("📁 رفع ملف", callback_data="ADM_UP")],
-            [InlineKeyboardButton("◀️ رجوع", callback_data="BACK")]
-        ]
-        return await query.edit_message_text("لوحة المشرف:", reply_markup=InlineKeyboardMarkup(kb))
-    elif data == "MENU_HSK":
-        kb, row = [], []
-        for i in range(1, 7):
-            row.append(InlineKeyboardButton(f"HSK{i}", callback_data=f"SEC_HSK{i}"))
-            if len(row) == 3:
-                kb.append(row)
-                row = []
-        if row:
-            kb.append(row)
-        kb.append([InlineKeyboardButton("◀️ رجوع", callback_data="BACK")])
-        return await query.edit_message_text("اختر مستوى HSK:", reply_markup=InlineKeyboardMarkup(kb))
-    else:
-        sec = data.split("_",1)[1]
-        return await query.edit_message_text(f"قسم {sec}: قريبًا🔥", reply_markup=back_to_main_keyboard())
+async def unavailable(query, what="هذا الزر"):
+    # callback_data تالفة (زر مزور أو من نسخة قديمة): لا تُرفع استثناءات من المعالج
+    return await query.edit_message_text(f"{what} غير متوفر.", reply_markup=back_to_main_keyboard())
+
+# Fallback for old quiz buttons (quiz_answer_...)
+@router.route("quiz")
+async def legacy_quiz_answer(query, context, payload):
+    await query.edit_message_text("وظيفة الاختبار غير مفعلة حاليًا في هذه الواجهة.", reply_markup=back_to_main_keyboard())
+
+async def menu_admin(query, context):
+    if not user_manager.is_admin(query.from_user.id):
+        return await query.edit_message_text("⛔ للمشرفين فقط.", reply_markup=back_to_main_keyboard())
+    return await query.edit_message_text("لوحة المشرف:", reply_markup=menus.get("admin"))
+
+async def menu_hsk(query, context):
+    return await query.edit_message_text("اختر مستوى HSK:", reply_markup=menus.get("hsk"))
+
+async def menu_quizzes(query, context):
+    return await show_quiz_list(query, 0)
+
+async def show_quiz_list(query, page):
+    return await query.edit_message_text("❓ اختر اختباراً:", reply_markup=await content_manager.run(menus.quizzes, page))
+
+async def menu_flashcards(query, context):
+    return await show_next_flashcard(query)
+
+async def menu_ai_tutor(query, context):
+    if ai_tutor is None:
+        return await query.edit_message_text("🤖 المعلم الذكي غير متاح حالياً.", reply_markup=back_to_main_keyboard())
+    return await query.edit_message_text("🤖 ماذا تريد من المعلم الذكي؟", reply_markup=menus.get("ai_tutor"))
 
-async def handle_section(query, context):
-    sec = query.data.split("_",1)[1]
-    kb = [[InlineKeyboardButton(f"محتوى تجريبي لـ {sec}", callback_data="SKIP_Content")]]
-    kb.append([InlineKeyboardButton("◀️ رجوع", callback_data="BACK")])
+async def menu_dictionary(query, context):
+    context.user_data["mode"] = "dictionary"
+    return await query.edit_message_text(
+        "🗂️ اكتب بداية الكلمة بالصينية أو البينيين (nihao / ni3hao3) أو بالعربية:",
+        reply_markup=back_to_main_keyboard()
+    )
+
+MENU_HANDLERS = {
+    "Admin": menu_admin,
+    "HSK": menu_hsk,
+    "Quizzes": menu_quizzes,
+    "Flashcards": menu_flashcards,
+    "AITutor": menu_ai_tutor,
+    "Dictionary": menu_dictionary,
+}
+
+# ملفات القسم تُرسل بإعادة استخدام file_id المحفوظ (بدون إعادة رفع)
+async def show_section_files(query, context, section):
+    records = await content_manager.run(content_manager.get_section_files, section)
+    if not records:
+        return await coming_soon(query, context, section)
+    shown = records[:SECTION_FILES_MAX]
+    await query.edit_message_text(f"📂 {section}: {len(shown)}/{len(records)} ملف", reply_markup=back_to_main_keyboard())
+    await send_files(context.bot, query.message.chat_id, shown)
+
+@router.route("MENU")
+async def handle_menu(query, context, payload):
+    handler = MENU_HANDLERS.get(payload)
+    if handler is not None:
+        return await handler(query, context)
+    return await show_section_files(query, context, payload)
+
+@router.route("SEC")
+async def handle_section(query, context, sec):
+    if not sec.startswith("HSK"):
+        return await coming_soon(query, context, sec)
+    level = sec[3:]
+    if not (level.isascii() and level.isdigit()) or int(level) not in HSK_LEVELS:
+        return await unavailable(query, "هذا القسم")
+    level = int(level)
+    lessons, vocabulary = await content_manager.run(content_browser.counts, level)
+    kb = [
+        [InlineKeyboardButton(
+            f"📘 الدروس ({lessons})",
+            callback_data=encode(PAGE_PREFIX, *section_code("lessons", level), 0)
+        )],
+        [InlineKeyboardButton(
+            f"📝 المفردات ({vocabulary})",
+            callback_data=encode(PAGE_PREFIX, *section_code("vocabulary", level), 0)
+        )],
+        [InlineKeyboardButton("◀️ رجوع", callback_data="MENU_HSK")]
+    ]
     return await query.edit_message_text(f"قسم {sec}:", reply_markup=InlineKeyboardMarkup(kb))
 
+# تصفح المحتوى صفحة صفحة
+@router.route(PAGE_PREFIX)
+async def browse_page(query, context, payload):
+    numbers = unpack_exact(payload, 3)
+    shown = None if numbers is None else await content_manager.run(content_browser.page, *numbers)
+    if shown is None:
+        return await unavailable(query, "هذا القسم")
+    text, markup = shown
+    return await query.edit_message_text(text, reply_markup=markup)
+
+@router.route(ITEM_PREFIX)
+async def browse_item(query, context, payload):
+    numbers = unpack_exact(payload, 3)
+    shown = None if numbers is None else await content_manager.run(content_browser.item, *numbers)
+    if shown is None:
+        return await query.edit_message_text("هذا الدرس غير متوفر.", reply_markup=back_to_main_keyboard())
+    text, markup = shown
+    return await query.edit_message_text(text, reply_markup=markup)
+
+# الاختبارات: الجلسة في الذاكرة والنتيجة تُحفظ مرة واحدة في النهاية
+def quiz_question_markup(session, question):
+    kb = [
+        [InlineKeyboardButton(option, callback_data=encode_answer(session.token, session.index, i))]
+        for i, option in enumerate(question["options"])
+    ]
+    kb.append([BACK_BUTTON])
+    return InlineKeyboardMarkup(kb)
+
+@router.route(LIST_PREFIX)
+async def quiz_list_page(query, context, payload):
+    page = unpack_exact(payload, 1)
+    if page is None:
+        return await unavailable(query)
+    return await show_quiz_list(query, *page)
+
+@router.route(START_PREFIX)
+async def start_quiz(query, context, payload):
+    number = unpack_exact(payload, 1)
+    session = None if number is None else await content_manager.run(quiz_engine.start, query.from_user.id, *number)
+    if session is None:
+        return await query.edit_message_text("هذا الاختبار غير متوفر.", reply_markup=back_to_main_keyboard())
+    question = await content_manager.run(quiz_engine.current_question, session)
+    return await query.edit_message_text(
+        f"❓ السؤال 1: {question['question']}",
+        reply_markup=quiz_question_markup(session, question)
+    )
+
+@router.route(ANSWER_PREFIX)
+async def handle_quiz_answer(query, context, payload):
+    user_id = query.from_user.id
+    answer = decode_answer(payload)
+    if answer is None:
+        return await unavailable(query)
+    result = await content_manager.run(quiz_engine.answer, user_id, *answer)
+    if result is None:
+        return await query.edit_message_text("⌛ انتهت صلاحية هذا الاختبار.", reply_markup=back_to_main_keyboard())
+
+    session, correct, finished = result
+    feedback = "✅ إجابة صحيحة!" if correct else "❌ إجابة خاطئة."
+    if finished:
+        xp = await user_manager.run(quiz_engine.commit, user_id, session)
+        total = session.correct + session.wrong
+        return await query.edit_message_text(
+            f"{feedback}\n\n🏁 انتهى الاختبار! النتيجة: {session.correct}/{total}\n⭐ +{xp} XP",
+            reply_markup=back_to_main_keyboard()
+        )
+
+    question = await content_manager.run(quiz_engine.current_question, session)
+    return await query.edit_message_text(
+        f"{feedback}\n\n❓ السؤال {session.index + 1}: {question['question']}",
+        reply_markup=quiz_question_markup(session, question)
+    )
+
+# البطاقات التعليمية (تكرار متباعد): حالة البطاقات على خيوط التخزين، والمفردات على خيط المحتوى
+async def show_next_flashcard(query):
+    vocabulary_size = await content_manager.run(content_manager.vocabulary_count)
+    card_id = await user_manager.run(flashcard_scheduler.next_card, query.from_user.id, vocabulary_size)
+    word = None
+    if card_id is not None:
+        word, _ = await content_manager.run(content_manager.vocabulary_card, card_id)
+    if word is None:
+        return await query.edit_message_text("🎉 لا توجد بطاقات للمراجعة الآن، عد لاحقاً!", reply_markup=back_to_main_keyboard())
+    kb = [
+        [InlineKeyboardButton("👀 إظهار الإجابة", callback_data=encode("FCS", card_id))],
+        [BACK_BUTTON]
+    ]
+    return await query.edit_message_text(f"🃏 {word}", reply_markup=InlineKeyboardMarkup(kb))
+
+@router.route("FCS")
+async def show_flashcard_answer(query, context, payload):
+    card = unpack_exact(payload, 1)
+    word, item = (None, None) if card is None else await content_manager.run(content_manager.vocabulary_card, *card)
+    if word is None:
+        return await query.edit_message_text("هذه البطاقة غير متوفرة.", reply_markup=back_to_main_keyboard())
+    card_id, = card
+    kb = [
+        [
+            InlineKeyboardButton("❌ نسيت", callback_data=encode("FCR", card_id, 1)),
+            InlineKeyboardButton("😐 صعبة", callback_data=encode("FCR", card_id, 3)),
+        ],
+        [
+            InlineKeyboardButton("🙂 جيدة", callback_data=encode("FCR", card_id, 4)),
+            InlineKeyboardButton("😎 سهلة", callback_data=encode("FCR", card_id, 5)),
+        ],
+        [BACK_BUTTON]
+    ]
+    return await query.edit_message_text(
+        f"🃏 {word}\n\n{item.get('pinyin', '')}\n{item.get('translation', '')}",
+        reply_markup=InlineKeyboardMarkup(kb)
+    )
+
+@router.route("FCR")
+async def rate_flashcard(query, context, payload):
+    card = unpack_exact(payload, 2)
+    if card is None or not MIN_RATING <= card[1] <= MAX_RATING:
+        return await query.edit_message_text("تقييم غير صالح.", reply_markup=back_to_main_keyboard())
+    await user_manager.run(flashcard_scheduler.review, query.from_user.id, *card)
+    return await show_next_flashcard(query)
+
+# المعلم الذكي: الإجابة تُبث في رسالة واحدة تُعدَّل تدريجياً
+@router.route("AI")
+async def select_ai_task(query, context, task):
+    if ai_tutor is None or task not in AI_TASKS:
+        return await query.edit_message_text("🤖 المعلم الذكي غير متاح حالياً.", reply_markup=back_to_main_keyboard())
+    context.user_data["mode"] = f"ai_{task}"
+    return await query.edit_message_text("✍️ أرسل النص الآن:", reply_markup=back_to_main_keyboard())
+
+async def ai_tutor_message(update: Update, context):
+    task = context.user_data["mode"][len("ai_"):]
+    await ai_tutor.reply(update.message, task, update.message.text, update.effective_user.id)
+
+async def ai_stats(update: Update, context):
+    if not user_manager.is_admin(update.effective_user.id) or ai_tutor is None:
+        return
+    metrics = ai_tutor.scheduler.metrics()
+    lines = [f"{name}: {value:.2f}" if isinstance(value, float) else f"{name}: {value}" for name, value in metrics.items()]
+    lines.append(f"cache: {len(ai_tutor.cache)} (hits {ai_tutor.cache.hits}, misses {ai_tutor.cache.misses})")
+    await update.message.reply_text("🤖 Groq\n" + "\n".join(lines))
+
+async def analytics_stats(update: Update, context):
+    if not user_manager.is_admin(update.effective_user.id):
+        return
+    summary, retention = await user_manager.analytics_summary()
+    lines = [f"{name}: {value}" for name, value in summary.items()]
+    lines.append("")
+    lines.append("الاحتفاظ (D1 / D7 / D30):")
+    for cohort in retention:
+        rates = " / ".join("-" if rate is None else f"{rate}%" for rate in cohort["retention"].values())
+        lines.append(f"{cohort['date']} ({cohort['size']}): {rates}")
+    await update.message.reply_text("📊 الإحصائيات\n" + "\n".join(lines))
+
+# توجيه الرسائل النصية حسب الوضع الحالي للمستخدم
+async def handle_text(update: Update, context):
+    mode = context.user_data.get("mode")
+    if mode == "dictionary":
+        await dictionary_lookup(update, context)
+    elif mode and mode.startswith("ai_") and ai_tutor is not None:
+        await ai_tutor_message(update, context)
+
+# البحث في القاموس أثناء الكتابة
+async def dictionary_lookup(update: Update, context):
+    matches = await content_manager.run(content_manager.autocomplete_vocabulary, update.message.text, limit=8)
+    if not matches:
+        return await update.message.reply_text("لا توجد نتائج، جرّب بداية أخرى.", reply_markup=back_to_main_keyboard())
+
+    lines = [f"• {word} ({item.get('pinyin', '')}) — {item.get('translation', '')}" for word, item in matches]
+    await update.message.reply_text("\n".join(lines), reply_markup=back_to_main_keyboard())
+
 # ----------------- Admin Handlers -----------------
 
 async def cancel(update: Update, context) -> int:
@@ -155,8 +358,7 @@ async def adm_add_content(update: Update, context):
     title = context.user_data["title"]
     content = update.message.text.strip()
     
-    lesson_id = f"lesson{len(content_manager.get_all_lessons()) + 1}"
-    content_manager.add_lesson(lesson_id, title, "", content)
+    await content_manager.run(content_manager.add_new_lesson, title, "", content)
     
     await update.message.reply_text(f"✅ أضيف إلى {section}: {title}", reply_markup=main_menu_keyboard(update.effective_user.id))
     return ConversationHandler.END
@@ -166,20 +368,7 @@ async def adm_up_start(update: Update, context):
     query = update.callback_query
     await query.answer()
     
-    # Get all available sections from content_manager (simplified to main menu items for now)
-    sections = [
-        ("HSK", "HSK"), ("القرآن", "Quran"), ("القاموس", "Dictionary"), 
-        ("القصص", "Stories"), ("قواعد", "GrammarLessons"), ("مراجعة", "GrammarReview"),
-        ("محادثات", "Dialogues"), ("Flashcards", "Flashcards"), ("كويزات", "Quizzes"), 
-        ("صور", "PictureDictionary"), ("تطبيقات", "Apps")
-    ]
-    
-    kb = []
-    for name, key in sections:
-        kb.append([InlineKeyboardButton(name, callback_data=f"UPSEC_{key}")])
-    kb.append([InlineKeyboardButton("◀️ إلغاء", callback_data="cancel_upload")])
-
-    await query.edit_message_text("اختر القسم الذي تريد رفع الملف إليه:", reply_markup=InlineKeyboardMarkup(kb))
+    await query.edit_message_text("اختر القسم الذي تريد رفع الملف إليه:", reply_markup=menus.get("upload_sections"))
     return UPLOAD_FILE_SECTION
 
 async def select_upload_section(update: Update, context):
@@ -227,17 +416,20 @@ async def receive_file_and_store(update: Update, context):
         file_name = message.audio.file_name
     
     if file_data:
-        # Store file data with the section key
-        content_manager.add_file_data(
+        # السجل مفهرس بـ file_unique_id فإعادة رفع الملف نفسه لا تكرره
+        _, created = await content_manager.run(
+            content_manager.add_file_data,
             file_id=file_data.file_id,
             file_type=file_type,
             file_name=file_name,
             user_id=user_id,
-            section=section_key # Store the section key
+            section=section_key,
+            file_unique_id=file_data.file_unique_id
         )
         
+        status = "✅ تم تخزين بيانات الملف بنجاح" if created else "ℹ️ الملف موجود مسبقاً"
         await message.reply_text(
-            f"✅ تم تخزين بيانات الملف بنجاح في قسم *{section_key}*!\n"
+            f"{status} في قسم *{section_key}*!\n"
             f"النوع: {file_type}\n"
             f"الاسم: {file_name or 'غير متوفر'}\n"
             f"معرف الملف (File ID): `{file_data.file_id}`",
@@ -249,8 +441,65 @@ async def receive_file_and_store(update: Update, context):
         await message.reply_text("لم يتم التعرف على نوع الملف. يرجى إرسال ملف صالح.")
         return UPLOAD_FILE_RECEIVE # Stay in this state until a file is received
 
-def main():
-    application = Application.builder().token(BOT_TOKEN).build()
+# ADM_IMPORT handlers: استيراد جماعي من ملف CSV/TSV/JSONL بعملية كتابة واحدة
+async def adm_import_start(update: Update, context):
+    query = update.callback_query
+    await query.answer()
+    if not user_manager.is_admin(query.from_user.id):
+        await query.edit_message_text("⛔ للمشرفين فقط.", reply_markup=back_to_main_keyboard())
+        return ConversationHandler.END
+    await query.edit_message_text("اختر نوع المحتوى الذي تريد استيراده:", reply_markup=menus.get("import_types"))
+    return IMPORT_TYPE
+
+async def select_import_type(update: Update, context):
+    query = update.callback_query
+    await query.answer()
+    if query.data == "cancel_import":
+        await query.edit_message_text("تم إلغاء الاستيراد.", reply_markup=main_menu_keyboard(query.from_user.id))
+        return ConversationHandler.END
+
+    context.user_data["import_type"] = query.data.split("_", 1)[1]
+    await query.edit_message_text(
+        f"✅ النوع: *{context.user_data['import_type']}*.\n\nأرسل الملف (CSV أو TSV أو JSONL) كمستند.",
+        parse_mode='Markdown'
+    )
+    return IMPORT_FILE
+
+async def receive_import_file(update: Update, context):
+    message = update.effective_message
+    document = message.document
+    file = await document.get_file()
+    data = await file.download_as_bytearray()
+    try:
+        report = await content_manager.run(
+            import_bytes, content_manager, bytes(data), document.file_name or "", context.user_data["import_type"]
+        )
+    except ValueError as e:
+        # صيغة غير مدعومة أو ملف تالف: لا يُستورد شيء وتنتهي المحادثة
+        await message.reply_text(f"⚠️ تعذر الاستيراد: {e}", reply_markup=main_menu_keyboard(message.from_user.id))
+        return ConversationHandler.END
+
+    await message.reply_text(
+        "📥 تم الاستيراد\n" + format_report(report),
+        reply_markup=main_menu_keyboard(message.from_user.id)
+    )
+    return ConversationHandler.END
+
+async def warm_managers(application):
+    # بناء فهارس المحتوى في خيطه قبل أول تحديث، دون إيقاف حلقة الأحداث
+    await content_manager.run(content_manager.warm)
+
+def build_application(request=None):
+    """request: طبقة نقل بديلة لـ Bot (BaseRequest)، تستخدمها القياسات بدل الشبكة"""
+    builder = Application.builder().token(BOT_TOKEN)
+    if TELEGRAM_BASE_URL:
+        builder = builder.base_url(TELEGRAM_BASE_URL)
+    if request is not None:
+        builder = builder.request(request)
+    # تحديثات المستخدمين المختلفين تُعالج بالتوازي، وتحديثات المستخدم نفسه بترتيب وصولها
+    builder = builder.concurrent_updates(ChatOrderedUpdateProcessor(CONCURRENT_UPDATES))
+    builder = builder.post_init(warm_managers)
+    application = builder.build()
 
     # Conversation handler for adding content
     add_content_conv_handler = ConversationHandler(
@@ -272,14 +521,60 @@ def main():
         fallbacks=[CommandHandler('cancel', cancel), CallbackQueryHandler(cancel, pattern='^cancel_upload$')],
     )
 
+    # Conversation handler for bulk content import
+    import_conv_handler = ConversationHandler(
+        entry_points=[CallbackQueryHandler(adm_import_start, pattern='^ADM_IMPORT$')],
+        states={
+            IMPORT_TYPE: [CallbackQueryHandler(select_import_type, pattern='^(IMPTYPE_|cancel_import$)')],
+            IMPORT_FILE: [MessageHandler(filters.Document.ALL, receive_import_file)],
+        },
+        fallbacks=[CommandHandler('cancel', cancel)],
+    )
+
     application.add_handler(add_content_conv_handler)
     application.add_handler(file_upload_conv_handler)
+    application.add_handler(import_conv_handler)
     application.add_handler(CommandHandler("start", start))
+    application.add_handler(CommandHandler("aistats", ai_stats))
+    application.add_handler(CommandHandler("analytics", analytics_stats))
     application.add_handler(CallbackQueryHandler(button_handler))
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_text, block=False))
     
+    # إرسال الإشعارات المخزنة والتذكيرات اليومية
+    notification_dispatcher.schedule(application.job_queue)
+    flashcard_scheduler.schedule(application.job_queue)
+    user_manager.schedule(application.job_queue)
+    content_manager.schedule(application.job_queue)
+
     # Note: The general MessageHandler(filters.ATTACHMENT) is removed, as file upload is now handled by ConversationHandler
-    
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+    return application
+
+def close_managers():
+    # كتابة التعديلات المؤجلة قبل الخروج
+    content_manager.close()
+    user_manager.close()
+
+def build_worker():
+    """عملية عمل خلف موزع webhook.py (عدة عمليات)"""
+    return ApplicationWorker(build_application(), on_stop=close_managers)
+
+def main():
+    application = build_application()
+    try:
+        if WEBHOOK_URL:
+            # عملية واحدة؛ لعدة عمليات استخدم python webhook.py
+            application.run_webhook(
+                listen=WEBHOOK_LISTEN,
+                port=WEBHOOK_PORT,
+                url_path=WEBHOOK_PATH,
+                secret_token=WEBHOOK_SECRET,
+                webhook_url=f"{WEBHOOK_URL.rstrip('/')}/{WEBHOOK_PATH}",
+                allowed_updates=Update.ALL_TYPES
+            )
+        else:
+            application.run_polling(allowed_updates=Update.ALL_TYPES)
+    finally:
+        close_managers()
 
 if __name__ == '__main__':
     main()
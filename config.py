@@ -12,13 +12,60 @@ groq_client = None
 
 # المسارات
 DATA_FILE = "data.json"
-CONTENT_FILE = "content.json"
-BACKUP_FILE = "backup.json"
+CONTENT_FILE = "content.json"  # الصيغة القديمة؛ تُقسم إلى CONTENT_DIR عند أول تشغيل، وتعديلاته بعدها تُستورد عند الإقلاع
+CONTENT_DIR = "content"  # ملف لكل نوع محتوى + سجل إضافات
+CONTENT_LOG_COMPACT_MIN = 1000  # أقل عدد أسطر في السجل قبل إعادة كتابة ملف النوع
+CONTENT_REFRESH_INTERVAL = 5  # ثوانٍ بين قراءة تعديلات العمليات الأخرى على المحتوى (webhook.py)
+BACKUP_DIR = "backups"  # نسخة لكل لقطة: ملفاتها + ما أُضيف إلى سجل التعديلات بعدها
+BACKUP_KEEP = 7  # عدد النسخ المحفوظة
+JOURNAL_COMPACT_MIN = 1 << 20  # أقل حجم (بايت) لسجل تعديلات JSON قبل إعادة كتابة اللقطة
+DB_FILE = "data.db"
+NOTIFICATIONS_FILE = "notifications.json"
+AUTOCOMPLETE_INDEX_FILE = "autocomplete_index.json"
+
+# واجهة التخزين: "json" للتثبيتات الصغيرة أو "sqlite" (وضع WAL) لعدد كبير من المستخدمين
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json")
+
+# الكتابة المؤجلة (write-behind): التعديلات تُعلَّم كمتسخة وتكتبها عملية خلفية دفعة واحدة
+# كل FLUSH_INTERVAL ثانية أو عند تراكم FLUSH_MAX_PENDING تعديلاً، أيهما أسبق.
+# نافذة الفقد القصوى عند انهيار العملية فجأة هي آخر FLUSH_INTERVAL ثانية من التعديلات
+# (الإيقاف العادي يستدعي flush() فلا يُفقد شيء)
+WRITE_BEHIND = os.getenv("WRITE_BEHIND", "1") == "1"
+FLUSH_INTERVAL = 5  # ثوانٍ
+FLUSH_MAX_PENDING = 500  # تعديلات
+
+# المعالجة المتزامنة: تحديثات تيليجرام تُعالج بالتوازي، وتعديلات المستخدمين تعمل على عدة خيوط
+# تحت قفل لكل مستخدم (مقسّم على USER_LOCK_STRIPES قفل)
+CONCURRENT_UPDATES = 32  # تحديثات تُعالج في الوقت نفسه (1 = بالترتيب كما في السابق)
+USER_STORE_WORKERS = 4  # خيوط تعديل بيانات المستخدمين
+USER_LOCK_STRIPES = 64
+
+# وضع webhook: إن ضُبط WEBHOOK_URL يستقبل البوت التحديثات عبر HTTP بدلاً من polling.
+# مع WEBHOOK_WORKERS > 1 يُشغّل `python webhook.py`: موزع محلي يوجه كل تحديث حسب المستخدم إلى
+# إحدى العمليات، وكل عملية تملك جزءاً من المستخدمين في قاعدة SQLite مشتركة (يتطلب STORAGE_BACKEND=sqlite)
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")  # العنوان العام، مثل https://example.com
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "telegram")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")  # يُرسل في ترويسة X-Telegram-Bot-Api-Secret-Token
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "1"))
+WEBHOOK_QUEUE_SIZE = 10000  # أقصى عدد تحديثات تنتظر كل عملية قبل رفض الجديد (تيليجرام يعيد إرساله)
+# "رقم/عدد": تضبطه webhook.py لكل عملية، ولا يُضبط يدوياً
+STORAGE_SHARD = os.getenv("STORAGE_SHARD")
+ADMIN_REFRESH_INTERVAL = 5  # ثوانٍ بين إعادة قراءة المشرفين من SQLite (مهمة admin_refresh؛ تعديلات العمليات الأخرى)
 
 # إعدادات النظام
 MAX_USERS = 1000
-BACKUP_INTERVAL = 24  # ساعات
+BACKUP_INTERVAL = 24  # ساعات بين النسخ الاحتياطية (مهمة خلفية)
 CLEANUP_INTERVAL = 7  # أيام للمستخدمين غير النشطين
+# الحذف يتم في مهمة خلفية عبر فهرس آخر نشاط، وMAX_USERS حد مرن لا يؤخر التسجيل
+EVICTION_INTERVAL = 3600  # ثوانٍ بين كل تشغيل لمهمة الحذف
+EVICTION_BATCH = 1000  # أقصى عدد مستخدمين يُحذف في كل تشغيل
+EVICTION_MIN_IDLE_DAYS = 1  # عند تجاوز MAX_USERS لا يُحذف من نشط خلال هذه المدة
+# كما في السابق: غير النشطين منذ CLEANUP_INTERVAL يُحذفون فقط عند بلوغ MAX_USERS.
+# True يحذفهم في كل تشغيل للمهمة مهما كان العدد (تُفقد بيانات كل من غاب CLEANUP_INTERVAL يوم)
+EXPIRE_BELOW_CAPACITY = os.getenv("EXPIRE_BELOW_CAPACITY", "0") == "1"
+LEADERBOARD_ROLL_INTERVAL = 600  # ثوانٍ بين كل فحص لبداية يوم/أسبوع/شهر جديد في لوحة المتصدرين
 
 # إعدادات التبيهات
 NOTIFICATION_SETTINGS = {
@@ -28,3 +75,51 @@ NOTIFICATION_SETTINGS = {
     "weekly_report": True
 }
 
+# مخزن الإشعارات: آخر NOTIFICATION_HISTORY_LIMIT إشعار لكل مستخدم، ويحذف ما هو أقدم من NOTIFICATION_TTL_DAYS
+NOTIFICATION_HISTORY_LIMIT = 20
+NOTIFICATION_TTL_DAYS = 14
+
+# إرسال الإشعارات (حدود تيليجرام: ~30 رسالة/ثانية عامة، ورسالة/ثانية لكل محادثة)
+DELIVERY_INTERVAL = 60  # ثوانٍ بين كل تفريغ للإشعارات
+DELIVERY_BATCH_SIZE = 1000  # مستخدم في كل دفعة
+DELIVERY_CONCURRENCY = 30
+DELIVERY_MAX_RETRIES = 3
+GLOBAL_SEND_RATE = 25  # أقل من حد تيليجرام بهامش أمان (للبوت كله: webhook.py يقسمه على العمليات)
+PER_CHAT_SEND_INTERVAL = 1.0  # ثوانٍ
+DAILY_REMINDER_TIME = "18:00"
+
+# البطاقات التعليمية (تكرار متباعد SM-2)
+FLASHCARD_NEW_PER_DAY = 10  # كلمات جديدة لكل مستخدم يومياً
+FLASHCARD_RELEARN_MINUTES = 10  # موعد إعادة البطاقة المنسية
+FLASHCARD_REMINDER_INTERVAL = 3600  # ثوانٍ بين كل فحص للمستخدمين المستحقين
+FLASHCARD_DECK_CACHE = 5000  # عدد مجموعات البطاقات المفكوكة في الذاكرة
+FLASHCARD_DELTA_MAX = 64  # بطاقات معدلة تُحفظ منفردة قبل إعادة ضغط المجموعة كاملة
+
+# تصفح المحتوى
+BROWSER_PAGE_SIZE = 10  # عناصر في كل صفحة
+SECTION_FILES_MAX = 30  # أقصى عدد ملفات تُرسل عند فتح قسم
+
+# الاختبارات
+QUIZ_SESSION_TTL = 1800  # ثوانٍ قبل حذف جلسة اختبار غير مكتملة من الذاكرة
+QUIZ_XP_PER_CORRECT = 10
+
+# المعلم الذكي (Groq)
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL")  # خادم بديل متوافق (مثلاً benchmarks/fake_groq_api.py)
+GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
+AI_MAX_TOKENS = 512
+AI_CACHE_SIZE = 2048  # عدد الإجابات المحفوظة في الذاكرة
+AI_CACHE_TTL = 86400  # ثوانٍ
+AI_STREAM_EDIT_INTERVAL = 1.0  # ثوانٍ بين تعديلات الرسالة أثناء البث
+GROQ_CONCURRENCY = 4  # طلبات متزامنة إلى Groq (مع GROQ_TOKENS_PER_MINUTE: للبوت كله، تُقسم على العمليات)
+GROQ_TOKENS_PER_MINUTE = int(os.getenv("GROQ_TOKENS_PER_MINUTE", "6000"))  # حسب حد الحساب لدى Groq
+GROQ_MAX_QUEUE = 200  # طلبات في الانتظار قبل رفض الجديدة
+GROQ_MAX_PENDING_PER_USER = 2
+
+# الإحصائيات: عدادات يومية تُحدث تدريجياً وHyperLogLog لعدد المستخدمين النشطين المختلفين
+ANALYTICS_HLL_PRECISION = 10  # 1024 سجل (~1.4KB لكل يوم)، خطأ ~3%
+ANALYTICS_HLL_DAYS = 31  # أيام تُحفظ سجلاتها (يكفي لـ MAU)
+ANALYTICS_HISTORY_DAYS = 365  # أيام تُحفظ عداداتها
+ANALYTICS_COHORT_DAYS = 90  # دفعات الانضمام المتتبعة للاحتفاظ
+
+# عنوان Bot API بديل (مثلاً خادم وهمي محلي للاختبار)؛ الافتراضي خوادم تيليجرام
+TELEGRAM_BASE_URL = os.getenv("TELEGRAM_BASE_URL")
@@ -0,0 +1,112 @@
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+import config
+from content_manager import BROWSABLE_TYPES
+from quiz_engine import encode_start
+from router import encode
+
+PAGE_PREFIX = "PG"
+ITEM_PREFIX = "ITM"
+MAX_MESSAGE_LENGTH = 4096
+TYPE_TITLES = {"lessons": "📘 الدروس", "vocabulary": "📝 المفردات"}
+HSK_LEVELS = range(1, 7)
+
+
+def section_code(content_type, level):
+    """(رقم النوع، المستوى) داخل callback_data: عددان منفصلان، فلا يقع مستوى كبير على نوع آخر"""
+    return BROWSABLE_TYPES.index(content_type), level
+
+
+def decode_section(type_index, level):
+    """(النوع، المستوى)، أو None لقسم غير موجود (زر مزور)؛ المستوى 0 للمحتوى بلا مستوى"""
+    if type_index >= len(BROWSABLE_TYPES) or level > HSK_LEVELS[-1]:
+        return None
+    return BROWSABLE_TYPES[type_index], level
+
+
+class ContentBrowser:
+    """تصفح الدروس والمفردات حسب مستوى HSK صفحة صفحة.
+
+    ContentManager يحتفظ بقائمة معرفات مرتبة لكل قسم، فكل ضغطة تقطع شريحة بحجم الصفحة فقط.
+    نص الصفحة ولوحتها يُخزنان بعد أول عرض مع رقم إصدار القسم، وأي إضافة للقسم
+    (add_lesson / add_vocabulary) ترفع الإصدار فتُعاد الصفحة عند طلبها التالي.
+    """
+
+    def __init__(self, content_manager, page_size=None):
+        self.content_manager = content_manager
+        self.page_size = page_size or config.BROWSER_PAGE_SIZE
+        self._pages = {}
+
+    def count(self, content_type, level):
+        return len(self.content_manager.section_ids(content_type, level))
+
+    def counts(self, level):
+        """(عدد الدروس، عدد المفردات) في المستوى"""
+        return self.count("lessons", level), self.count("vocabulary", level)
+
+    def page(self, type_index, level, page):
+        """(النص، لوحة المفاتيح) للصفحة page من القسم (section_code)؛ None إن لم يكن قسماً"""
+        section = decode_section(type_index, level)
+        if section is None:
+            return None
+        content_type, level = section
+        code = section_code(content_type, level)
+        version = self.content_manager.section_versions.get(section, 0)
+        cached = self._pages.get((code, page))
+        if cached is not None and cached[0] == version:
+            return cached[1], cached[2]
+
+        ids = self.content_manager.section_ids(content_type, level)
+        pages = max(1, -(-len(ids) // self.page_size))
+        page = min(max(page, 0), pages - 1)
+        start = page * self.page_size
+        chunk = ids[start:start + self.page_size]
+        items = self.content_manager.content[content_type]
+
+        title = f"{TYPE_TITLES[content_type]} HSK{level} — صفحة {page + 1}/{pages}"
+        kb = []
+        if content_type == "lessons":
+            lines = [title]
+            kb = [
+                [InlineKeyboardButton(items[item_id]["title"], callback_data=encode(ITEM_PREFIX, *code, start + i))]
+                for i, item_id in enumerate(chunk)
+            ]
+        else:
+            lines = [title, ""] + [
+                f"• {word} ({items[word].get('pinyin', '')}) — {items[word].get('translation', '')}" for word in chunk
+            ]
+        if not chunk:
+            lines.append("لا يوجد محتوى بعد.")
+
+        nav = []
+        if page > 0:
+            nav.append(InlineKeyboardButton("◀️ السابق", callback_data=encode(PAGE_PREFIX, *code, page - 1)))
+        if page < pages - 1:
+            nav.append(InlineKeyboardButton("التالي ▶️", callback_data=encode(PAGE_PREFIX, *code, page + 1)))
+        if nav:
+            kb.append(nav)
+        kb.append([InlineKeyboardButton("◀️ رجوع", callback_data=f"SEC_HSK{level}")])
+
+        text = "\n".join(lines)[:MAX_MESSAGE_LENGTH]
+        markup = InlineKeyboardMarkup(kb)
+        self._pages[(code, page)] = (version, text, markup)
+        return text, markup
+
+    def item(self, type_index, level, index):
+        """عرض درس واحد؛ None إن لم يعد موجوداً"""
+        section = decode_section(type_index, level)
+        if section is None:
+            return None
+        content_type, level = section
+        ids = self.content_manager.section_ids(content_type, level)
+        if not 0 <= index < len(ids):
+            return None
+        lesson = self.content_manager.content[content_type][ids[index]]
+
+        kb = []
+        quiz_number = self.content_manager.quiz_number(lesson["quiz_id"]) if lesson.get("quiz_id") else None
+        if quiz_number is not None:
+            kb.append([InlineKeyboardButton("❓ ابدأ الاختبار", callback_data=encode_start(quiz_number))])
+        kb.append([InlineKeyboardButton("◀️ رجوع", callback_data=encode(PAGE_PREFIX, type_index, level, index // self.page_size))])
+        text = f"📘 {lesson['title']}\n\n{lesson.get('description', '')}\n\n{lesson.get('content', '')}"
+        return text[:MAX_MESSAGE_LENGTH], InlineKeyboardMarkup(kb)
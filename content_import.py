@@ -0,0 +1,203 @@
+import csv
+import io
+import json
+import os
+import sys
+
+# الأنواع التي يمكن استيرادها جماعياً
+IMPORTABLE_TYPES = ("vocabulary", "phrases", "grammar_rules", "dialogues", "quizzes")
+FORMATS = ("csv", "tsv", "jsonl")
+# أقصى عدد أخطاء يُحتفظ به في التقرير
+MAX_REPORTED_ERRORS = 20
+# فاصل القوائم داخل خلية CSV (الأمثلة، أسطر الحوار، خيارات السؤال)
+LIST_SEPARATOR = "|"
+
+
+def _required(row, field):
+    value = row.get(field)
+    if isinstance(value, str):
+        value = value.strip()
+    if value in (None, "", []):
+        raise ValueError(f"missing '{field}'")
+    return value
+
+
+def _list(value):
+    if isinstance(value, list):
+        return value
+    return [part.strip() for part in value.split(LIST_SEPARATOR) if part.strip()]
+
+
+def _level(row):
+    level = row.get("level")
+    if level in (None, ""):
+        return None
+    level = int(str(level).upper().replace("HSK", ""))
+    if not 1 <= level <= 6:
+        raise ValueError(f"invalid HSK level {level}")
+    return level
+
+
+def vocabulary_item(row):
+    return _required(row, "word"), {
+        "pinyin": _required(row, "pinyin"),
+        "translation": _required(row, "translation"),
+        "level": _level(row)
+    }
+
+
+def phrase_item(row):
+    return _required(row, "id"), {"text": _required(row, "text"), "translation": _required(row, "translation")}
+
+
+def grammar_rule_item(row):
+    return _required(row, "id"), {
+        "title": _required(row, "title"),
+        "explanation": _required(row, "explanation"),
+        "examples": _list(row.get("examples") or [])
+    }
+
+
+def dialogue_item(row):
+    script = row.get("script")
+    if isinstance(script, str):
+        # في CSV: "A: 你好|B: 你好吗"
+        lines = []
+        for line in _list(script):
+            speaker, sep, text = line.partition(":")
+            if not sep:
+                raise ValueError(f"script line without speaker: {line!r}")
+            lines.append({"speaker": speaker.strip(), "text": text.strip()})
+        script = lines
+    if not script:
+        raise ValueError("missing 'script'")
+    return _required(row, "id"), {"title": _required(row, "title"), "script": script}
+
+
+def quiz_question(row):
+    options = _list(_required(row, "options"))
+    answer_index = int(_required(row, "answer_index"))
+    if not 0 <= answer_index < len(options):
+        raise ValueError(f"answer_index {answer_index} out of range")
+    return {"question": _required(row, "question"), "options": options, "answer_index": answer_index}
+
+
+def quiz_item(row):
+    # JSONL: سطر لكل اختبار مع questions؛ CSV/TSV: سطر لكل سؤال ويُجمع حسب id
+    if "questions" in row:
+        questions = [quiz_question(q) for q in _required(row, "questions")]
+    else:
+        questions = [quiz_question(row)]
+    return _required(row, "id"), {"title": _required(row, "title"), "questions": questions}
+
+
+ITEM_BUILDERS = {
+    "vocabulary": vocabulary_item,
+    "phrases": phrase_item,
+    "grammar_rules": grammar_rule_item,
+    "dialogues": dialogue_item,
+    "quizzes": quiz_item,
+}
+
+
+def detect_format(filename):
+    ext = os.path.splitext(filename)[1].lower().lstrip(".")
+    if ext == "json":
+        ext = "jsonl"
+    if ext not in FORMATS:
+        raise ValueError(f"unsupported format: {filename}")
+    return ext
+
+
+def iter_rows(stream, fmt):
+    """قراءة الصفوف واحداً واحداً: (رقم السطر، الصف)؛ أسطر JSONL تُعاد نصاً وتُحلل عند التحقق"""
+    if fmt == "jsonl":
+        for line_no, line in enumerate(stream, 1):
+            if line.strip():
+                yield line_no, line
+    else:
+        reader = csv.DictReader(stream, delimiter="\t" if fmt == "tsv" else ",")
+        for row in reader:
+            yield reader.line_num, row
+
+
+def parse(stream, content_type, fmt):
+    """التحقق من الصفوف أثناء القراءة وإزالة المكرر؛ يعيد (العناصر، التقرير).
+    ValueError إن تعذرت قراءة الملف نفسه"""
+    build = ITEM_BUILDERS[content_type]
+    items = {}
+    report = {"rows": 0, "imported": 0, "duplicates": 0, "errors": []}
+    line_no = 0
+    try:
+        for line_no, row in iter_rows(stream, fmt):
+            report["rows"] += 1
+            try:
+                if isinstance(row, str):
+                    row = json.loads(row)
+                key, item = build(row)
+            except (ValueError, TypeError, AttributeError, KeyError) as e:
+                if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                    report["errors"].append((line_no, str(e)))
+                else:
+                    report["errors_truncated"] = True
+                continue
+            existing = items.get(key)
+            if existing is None:
+                items[key] = item
+            elif content_type == "quizzes" and "questions" not in row:
+                existing["questions"].extend(item["questions"])
+            else:
+                report["duplicates"] += 1
+    except (csv.Error, UnicodeDecodeError) as e:
+        # الملف نفسه تالف (ترميز أو اقتباس) والقراءة لا تستمر بعده: لا يُستورد منه شيء
+        raise ValueError(f"unreadable file after line {line_no}: {e}") from e
+    report["imported"] = len(items)
+    return items, report
+
+
+def import_stream(content_manager, stream, content_type, fmt):
+    """استيراد كامل: تحليل الملف ثم كتابة كل العناصر في عملية واحدة"""
+    if content_type not in ITEM_BUILDERS:
+        raise ValueError(f"unsupported content type: {content_type}")
+    items, report = parse(stream, content_type, fmt)
+    if items:
+        content_manager.import_items(content_type, items)
+    return report
+
+
+def import_bytes(content_manager, data, filename, content_type):
+    """استيراد ملف مرفوع (bytes) كما يصل من تيليجرام"""
+    stream = io.TextIOWrapper(io.BytesIO(data), encoding="utf-8-sig", newline="")
+    return import_stream(content_manager, stream, content_type, detect_format(filename))
+
+
+def import_file(content_manager, path, content_type=None):
+    # نوع المحتوى من اسم الملف إن لم يُحدد، مثلاً vocabulary.csv
+    content_type = content_type or os.path.splitext(os.path.basename(path))[0]
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        return import_stream(content_manager, f, content_type, detect_format(path))
+
+
+def format_report(report):
+    lines = [
+        f"الصفوف: {report['rows']}",
+        f"المستورد: {report['imported']}",
+        f"المكرر: {report['duplicates']}",
+        f"الأخطاء: {len(report['errors'])}{'+' if report.get('errors_truncated') else ''}",
+    ]
+    lines += [f"  سطر {line_no}: {message}" for line_no, message in report["errors"]]
+    return "\n".join(lines)
+
+
+if __name__ == '__main__':
+    # الاستخدام: python content_import.py <file> [content_type]
+    if len(sys.argv) < 2:
+        print(f"usage: python content_import.py <file.csv|.tsv|.jsonl> [{'|'.join(IMPORTABLE_TYPES)}]")
+        sys.exit(1)
+    from content_manager import ContentManager
+
+    manager = ContentManager()
+    try:
+        print(format_report(import_file(manager, sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)))
+    finally:
+        manager.close()
@@ -1,50 +1,221 @@
-import json
+import threading
 import config
+from executor import PersistenceExecutorMixin
+from content_store import ContentStore
+from search_index import SearchIndex, SEARCHABLE_TYPES
+from autocomplete import AutocompleteIndex
+from file_registry import FileRegistry
 
-class ContentManager:
-    def __init__(self):
-        self.content = self.load_content()
-
-    def load_content(self):
-        try:
-            with open(config.CONTENT_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {
-                "lessons": {},
-                "quizzes": {},
-                "phrases": {},
-                "vocabulary": {},
-                "grammar_rules": {},
-                "dialogues": {}
-            }
+# أنواع المحتوى التي تُعرض مقسمة حسب مستوى HSK (المستوى 0 للمحتوى غير المصنف)
+BROWSABLE_TYPES = ("lessons", "vocabulary")
+
+class ContentManager(PersistenceExecutorMixin):
+    """المحتوى يُقرأ من ContentStore (ملف لكل نوع يُحمّل عند أول استخدام).
+
+    الفهارس (البحث، الإكمال التلقائي، ترتيب المفردات، أقسام التصفح) تُبنى أيضاً عند أول
+    حاجة إليها، فلا يتوقف الإقلاع على حجم المحتوى.
+    """
+    executor_name = "content-store"
+
+    def __init__(self, store=None):
+        self.content = store or ContentStore()
+        # يزداد مع كل تعديل؛ تستخدمه لوحات المفاتيح المبنية من المحتوى لمعرفة متى تُعاد
+        self.version = 0
+        self.section_versions = {}
+        self._lazy_lock = threading.RLock()
+        self._search_index = None
+        # ترتيب ثابت للمفردات (الإضافة في النهاية) يُستخدم كرقم للبطاقات
+        self._vocabulary_words = None
+        # وبالمثل للاختبارات: رقم الاختبار في callback_data بدل معرفه (الذي قد يتجاوز 64 بايت)
+        self._quiz_ids = None
+        self._quiz_numbers = None
+        # قوائم معرفات مرتبة لكل (نوع، مستوى) للتصفح صفحة صفحة
+        self._sections = None
+        self._autocomplete_index = None
+        self.files = FileRegistry(self.content)
+        # تعديلات العمليات الأخرى (webhook.py) تُطبق على الفهارس كما تُطبق التعديلات المحلية
+        self.content.on_external = self._apply_external
+
+    def close(self):
+        self.shutdown_executor()
+
+    def schedule(self, job_queue):
+        if config.STORAGE_SHARD:
+            # عدة عمليات: قراءة ما أضافته العمليات الأخرى من محتوى وملفات دورياً
+            job_queue.run_repeating(self.refresh_job, interval=config.CONTENT_REFRESH_INTERVAL, first=config.CONTENT_REFRESH_INTERVAL, name="content_refresh")
+
+    async def refresh_job(self, context):
+        await self.run(self.content.refresh)
+
+    def _apply_external(self, content_type, changes):
+        self._index_items(
+            content_type,
+            {key: item for key, _, item in changes},
+            {key: old for key, old, _ in changes}
+        )
+        if content_type == "files":
+            self.files.reindex(changes)
+
+    def _lazy(self, attr, build):
+        value = getattr(self, attr)
+        if value is None:
+            with self._lazy_lock:
+                value = getattr(self, attr)
+                if value is None:
+                    value = build()
+                    setattr(self, attr, value)
+        return value
+
+    def _build_search_index(self):
+        index = SearchIndex()
+        index.build(self.content)
+        return index
+
+    def _build_sections(self):
+        sections = {}
+        for content_type in BROWSABLE_TYPES:
+            for item_id, item in self.content[content_type].items():
+                sections.setdefault((content_type, item.get("level") or 0), []).append(item_id)
+        return sections
+
+    @property
+    def search_index(self):
+        return self._lazy("_search_index", self._build_search_index)
+
+    @property
+    def autocomplete_index(self):
+        # يُحمّل من القرص ولا يُعاد بناؤه إلا إذا تغير ملف المفردات أو سجله
+        return self._lazy("_autocomplete_index", lambda: AutocompleteIndex.load_or_build(
+            self.content["vocabulary"], config.AUTOCOMPLETE_INDEX_FILE, self.content.fingerprint("vocabulary")
+        ))
+
+    @property
+    def vocabulary_words(self):
+        return self._lazy("_vocabulary_words", lambda: list(self.content["vocabulary"]))
+
+    @property
+    def quiz_ids(self):
+        return self._lazy("_quiz_ids", lambda: list(self.content["quizzes"]))
+
+    @property
+    def quiz_numbers(self):
+        return self._lazy("_quiz_numbers", lambda: {quiz_id: i for i, quiz_id in enumerate(self.quiz_ids)})
+
+    @property
+    def sections(self):
+        return self._lazy("_sections", self._build_sections)
+
+    def warm(self):
+        """تحميل الأنواع وبناء الفهارس مسبقاً (في خيط المحتوى عند الإقلاع) بدل أول طلب يحتاجها"""
+        self.sections
+        self.vocabulary_words
+        self.quiz_numbers
+        self.autocomplete_index
+        self.search_index
+        self.files.indexes
 
     def save_content(self):
-        with open(config.CONTENT_FILE, 'w', encoding='utf-8') as f:
-            json.dump(self.content, f, ensure_ascii=False, indent=2)
+        """كتابة كل الأنواع المحمّلة كاملة الآن (التعديلات العادية تُحفظ في السجل فوراً)"""
+        self.version += 1
+        self.content.compact_all()
+
+    def _put(self, content_type, item_id, item):
+        """حفظ عنصر وتحديث الفهارس المبنية؛ يعيد العنصر السابق (أو None)"""
+        with self.content.exclusive(content_type):
+            old_item = self.content.put(content_type, item_id, item)
+            self._index_items(content_type, {item_id: item}, {item_id: old_item})
+        return old_item
 
-    def add_lesson(self, lesson_id, title, description, content_text, quiz_id=None):
-        self.content["lessons"][lesson_id] = {
+    def import_items(self, content_type, items):
+        """إضافة عناصر كثيرة ({المعرف: العنصر}) بعملية كتابة واحدة، وتحديث الفهارس المبنية في تمريرة واحدة"""
+        with self.content.exclusive(content_type):
+            old_items = self.content.put_many(content_type, items.items())
+            self._index_items(content_type, items, old_items)
+        return len(items)
+
+    def _index_items(self, content_type, items, old_items):
+        if self._search_index is not None and content_type in SEARCHABLE_TYPES:
+            for item_id, item in items.items():
+                self._search_index.add(content_type, item_id, item)
+        if content_type == "vocabulary":
+            for word in items:
+                if old_items[word] is None and self._vocabulary_words is not None:
+                    self._vocabulary_words.append(word)
+            if self._autocomplete_index is not None:
+                self._autocomplete_index.update(items, old_items)
+        if content_type == "quizzes" and self._quiz_ids is not None:
+            for quiz_id in items:
+                if old_items[quiz_id] is None:
+                    self._quiz_ids.append(quiz_id)
+                    if self._quiz_numbers is not None:
+                        self._quiz_numbers[quiz_id] = len(self._quiz_ids) - 1
+        if content_type in BROWSABLE_TYPES:
+            for item_id, item in items.items():
+                self._index_section(content_type, item_id, old_items[item_id], item.get("level"))
+        self.version += 1
+
+    def _index_section(self, content_type, item_id, old_item, level):
+        if self._sections is None:
+            # الأقسام لم تُبنَ بعد وستشمل العنصر عند بنائها
+            return
+        section = (content_type, level or 0)
+        if old_item is not None:
+            old_section = (content_type, old_item.get("level") or 0)
+            if old_section == section:
+                self._bump_section(section)
+                return
+            self._sections[old_section].remove(item_id)
+            self._bump_section(old_section)
+        self._sections.setdefault(section, []).append(item_id)
+        self._bump_section(section)
+
+    def _bump_section(self, section):
+        self.section_versions[section] = self.section_versions.get(section, 0) + 1
+
+    def section_ids(self, content_type, level):
+        return self.sections.get((content_type, level or 0), [])
+
+    def add_lesson(self, lesson_id, title, description, content_text, quiz_id=None, level=None):
+        self._put("lessons", lesson_id, {
             "title": title,
             "description": description,
             "content": content_text,
-            "quiz_id": quiz_id
-        }
-        self.save_content()
+            "quiz_id": quiz_id,
+            "level": level
+        })
+
+    def add_new_lesson(self, title, description, content_text, quiz_id=None, level=None):
+        """إضافة درس بمعرف جديد lessonN يُختار تحت قفل الكتابة، فلا يتكرر بين العمليات؛ يعيد المعرف"""
+        with self.content.exclusive("lessons"):
+            lessons = self.content["lessons"]
+            number = len(lessons) + 1
+            while f"lesson{number}" in lessons:
+                number += 1
+            lesson_id = f"lesson{number}"
+            self.add_lesson(lesson_id, title, description, content_text, quiz_id, level)
+        return lesson_id
 
     def get_lesson(self, lesson_id):
         return self.content["lessons"].get(lesson_id)
 
     def add_quiz(self, quiz_id, title, questions):
-        self.content["quizzes"][quiz_id] = {
+        self._put("quizzes", quiz_id, {
             "title": title,
             "questions": questions  # List of {'question': '...', 'options': [...], 'answer': '...'} 
-        }
-        self.save_content()
+        })
 
     def get_quiz(self, quiz_id):
         return self.content["quizzes"].get(quiz_id)
 
+    def quiz_id_at(self, number):
+        ids = self.quiz_ids
+        if 0 <= number < len(ids):
+            return ids[number]
+        return None
+
+    def quiz_number(self, quiz_id):
+        return self.quiz_numbers.get(quiz_id)
+
     def get_random_phrase(self):
         import random
         phrases = list(self.content["phrases"].values())
@@ -53,8 +224,7 @@ class ContentManager:
         return None
 
     def add_phrase(self, phrase_id, text, translation):
-        self.content["phrases"][phrase_id] = {"text": text, "translation": translation}
-        self.save_content()
+        self._put("phrases", phrase_id, {"text": text, "translation": translation})
 
     def get_all_lessons(self):
         return self.content["lessons"]
@@ -68,61 +238,79 @@ class ContentManager:
     def get_all_vocabulary(self):
         return self.content["vocabulary"]
 
-    def add_vocabulary(self, word, pinyin, translation):
-        self.content["vocabulary"][word] = {"pinyin": pinyin, "translation": translation}
-        self.save_content()
+    def add_vocabulary(self, word, pinyin, translation, level=None):
+        # الفهارس التي لم تُبنَ بعد ستشمل الكلمة عند بنائها
+        self._put("vocabulary", word, {"pinyin": pinyin, "translation": translation, "level": level})
 
     def get_vocabulary_item(self, word):
         return self.content["vocabulary"].get(word)
 
+    def vocabulary_count(self):
+        return len(self.vocabulary_words)
+
+    def vocabulary_word_at(self, index):
+        words = self.vocabulary_words
+        if 0 <= index < len(words):
+            return words[index]
+        return None
+
+    def vocabulary_card(self, index):
+        """(الكلمة، عنصرها) للبطاقة رقم index؛ العنصر قاموس فارغ إن لم توجد"""
+        word = self.vocabulary_word_at(index)
+        return word, self.get_vocabulary_item(word) or {}
+
+    def autocomplete_vocabulary(self, prefix, limit=8):
+        """أفضل الكلمات التي تبدأ بالبادئة (هانزي، بينيين بنغمات أو بدونها أو بالأرقام، أو عربية)"""
+        return [
+            (word, self.content["vocabulary"][word])
+            for word in self.autocomplete_index.complete(prefix, limit)
+            if word in self.content["vocabulary"]
+        ]
+
     def add_grammar_rule(self, rule_id, title, explanation, examples):
-        self.content["grammar_rules"][rule_id] = {
+        self._put("grammar_rules", rule_id, {
             "title": title,
             "explanation": explanation,
             "examples": examples
-        }
-        self.save_content()
+        })
 
     def get_grammar_rule(self, rule_id):
         return self.content["grammar_rules"].get(rule_id)
 
     def add_dialogue(self, dialogue_id, title, script):
-        self.content["dialogues"][dialogue_id] = {
+        self._put("dialogues", dialogue_id, {
             "title": title,
             "script": script # List of {'speaker': '...', 'text': '...'}
-        }
-        self.save_content()
+        })
 
     def get_dialogue(self, dialogue_id):
         return self.content["dialogues"].get(dialogue_id)
 
-    def search_content(self, keyword, content_type=None):
+    def search_content(self, keyword, content_type=None, limit=20, offset=0):
+        """بحث مرتب حسب BM25 عبر الفهرس المعكوس، مع التقسيم إلى صفحات"""
+        _, matches = self.search_index.search(keyword, content_type, limit=limit, offset=offset)
         results = []
-        search_types = [content_type] if content_type else self.content.keys()
-
-        for c_type in search_types:
-            if c_type in self.content:
-                for item_id, item_data in self.content[c_type].items():
-                    if keyword.lower() in json.dumps(item_data, ensure_ascii=False).lower():
-                        results.append({"type": c_type, "id": item_id, "data": item_data})
+        for (c_type, item_id), score in matches:
+            results.append({"type": c_type, "id": item_id, "data": self.content[c_type][item_id], "score": score})
         return results
 
+    def count_search_results(self, keyword, content_type=None):
+        total, _ = self.search_index.search(keyword, content_type, limit=0)
+        return total
 
-    def add_file_data(self, file_id, file_type, file_name=None, user_id=None):
-        if "files" not in self.content:
-            self.content["files"] = {}
-        
-        file_key = f"{file_type}_{file_id}"
-        
-        self.content["files"][file_key] = {
-            "file_id": file_id,
-            "file_type": file_type,
-            "file_name": file_name,
-            "user_id": user_id,
-            "timestamp": datetime.now().isoformat()
-        }
-        self.save_content()
+
+    def add_file_data(self, file_id, file_type, file_name=None, user_id=None, section=None, file_unique_id=None):
+        """تسجيل ملف مرفوع في قسم؛ يعيد (السجل، True إن لم يكن موجوداً في القسم من قبل)"""
+        record, created = self.files.add(
+            file_unique_id or file_id, file_id, file_type, file_name=file_name, user_id=user_id, section=section
+        )
+        if created:
+            self.version += 1
+        return record, created
 
     def get_file_data(self, file_key):
-        return self.content.get("files", {}).get(file_key)
+        return self.files.get(file_key)
+
+    def get_section_files(self, section, file_type=None):
+        return self.files.in_section(section, file_type)
 
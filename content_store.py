@@ -0,0 +1,327 @@
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+import config
+from storage import atomic_write
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: عملية واحدة فقط تكتب في CONTENT_DIR
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# أنواع المحتوى الافتراضية (كما كانت في content.json)
+CONTENT_TYPES = ("lessons", "quizzes", "phrases", "vocabulary", "grammar_rules", "dialogues")
+# آخر نسخة مستوردة من content.json (مع حجمه ووقت تعديله) داخل CONTENT_DIR
+SOURCE_FILE = ".source.json"
+
+
+class ContentStore:
+    """محتوى مقسم إلى ملف (shard) لكل نوع داخل CONTENT_DIR، يُحمّل كل نوع عند أول استخدام.
+
+    لكل نوع ملفان:
+        <type>.json  آخر نسخة مضغوطة من القاموس
+        <type>.log   سجل إضافات (سطر JSON لكل تعديل: [المعرف، العنصر]) يُعاد تطبيقه عند التحميل
+    التعديل يضيف سطراً واحداً إلى السجل فقط، وعندما يكبر السجل مقارنة بالملف يُعاد كتابة
+    ذلك النوع وحده (كتابة ذرية) ويُفرغ سجله. وقت الإقلاع وتكلفة التعديل لا تعتمدان على حجم المحتوى الكلي.
+
+    عدة عمليات (webhook.py) تتشارك المجلد: كل كتابة تتم تحت قفل ملف (flock) بعد قراءة ما أضافته
+    العمليات الأخرى إلى السجل (أو الملف كاملاً إن أُعيدت كتابته)، فلا يُكتب شيء من ذاكرة قديمة.
+    on_external(النوع، [(المعرف، القديم، الجديد)]) يُستدعى بالتعديلات المقروءة من العمليات الأخرى.
+
+    content.json (الملف المتتبع في المستودع) يُقسم عند أول تشغيل، وإن عُدّل بعدها تُطبق العناصر
+    التي تغيرت فيه منذ آخر استيراد كتعديلات عادية عند الإقلاع التالي (_reimport).
+    """
+
+    def __init__(self, directory=None, legacy_file=None, compact_min=None):
+        self.directory = directory or config.CONTENT_DIR
+        self.compact_min = compact_min or config.CONTENT_LOG_COMPACT_MIN
+        self._shards = {}
+        self._log_lines = {}
+        # الأنواع الموجودة على القرص، تُقرأ من المجلد مرة واحدة
+        self._disk_types = None
+        # لكل نوع محمّل: (بصمة الملف المقروء، ما قُرئ من السجل بالبايت)
+        self._positions = {}
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._lock_file = None
+        self.on_external = None
+        legacy_file = legacy_file or config.CONTENT_FILE
+        if not os.path.isdir(self.directory):
+            self._migrate(legacy_file)
+        else:
+            self._reimport(legacy_file)
+
+    def _read_source(self):
+        try:
+            with open(os.path.join(self.directory, SOURCE_FILE), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_source(self, stat, legacy):
+        atomic_write(os.path.join(self.directory, SOURCE_FILE), json.dumps(
+            {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "content": legacy}, ensure_ascii=False
+        ))
+
+    @staticmethod
+    def _read_legacy(legacy_file):
+        """(محتوى content.json، stat) أو None إن لم يوجد"""
+        try:
+            with open(legacy_file, 'rb') as f:
+                return json.loads(f.read()), os.fstat(f.fileno())
+        except FileNotFoundError:
+            return None
+
+    def _migrate(self, legacy_file):
+        """تقسيم content.json القديم إلى ملفات منفصلة (مرة واحدة)"""
+        os.makedirs(self.directory, exist_ok=True)
+        read = self._read_legacy(legacy_file)
+        if read is None:
+            return
+        legacy, stat = read
+        for content_type, items in legacy.items():
+            atomic_write(self.shard_path(content_type), json.dumps(items, ensure_ascii=False))
+        self._write_source(stat, legacy)
+
+    def _reimport(self, legacy_file):
+        """تطبيق ما تغير في content.json منذ آخر استيراد (فحص stat رخيص إن لم يتغير).
+
+        العناصر التي لم تتغير فيه لا تُلمس، فتبقى تعديلات المشرفين عليها؛ والمحذوفة منه تبقى في المخزن.
+        """
+        try:
+            stat = os.stat(legacy_file)
+        except FileNotFoundError:
+            return
+        source = self._read_source()
+        if source is not None and (source["size"], source["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+            return
+        with self.exclusive():
+            # عملية أخرى (webhook.py) ربما استوردته للتو
+            source = self._read_source()
+            read = self._read_legacy(legacy_file)
+            if read is None:
+                return
+            legacy, stat = read
+            if source is None:
+                # مخزن قُسّم قبل تسجيل المصدر: لا يُعرف أي الطرفين أحدث، فلا يُطبق شيء
+                diverged = sorted(
+                    content_type for content_type, items in legacy.items()
+                    if any(self[content_type].get(key) != item for key, item in items.items())
+                )
+                if diverged:
+                    logger.warning(
+                        "%s differs from %s in %s; edits made there before this start were not imported",
+                        legacy_file, self.directory, ", ".join(diverged)
+                    )
+            else:
+                for content_type, items in legacy.items():
+                    previous = source["content"].get(content_type, {})
+                    changed = [(key, item) for key, item in items.items() if previous.get(key) != item]
+                    if changed:
+                        self.put_many(content_type, changed)
+                        logger.info("Imported %d changed %s from %s", len(changed), content_type, legacy_file)
+            self._write_source(stat, legacy)
+
+    def shard_path(self, content_type):
+        return os.path.join(self.directory, f"{content_type}.json")
+
+    def log_path(self, content_type):
+        return os.path.join(self.directory, f"{content_type}.log")
+
+    def _known_types(self):
+        if self._disk_types is None:
+            self._disk_types = {
+                name[:-5] for name in os.listdir(self.directory) if name.endswith(".json") and not name.startswith(".")
+            }
+        return self._disk_types
+
+    def types(self):
+        return sorted(self._known_types().union(CONTENT_TYPES, self._shards))
+
+    def is_loaded(self, content_type):
+        return content_type in self._shards
+
+    def _stamp(self, content_type):
+        try:
+            stat = os.stat(self.shard_path(content_type))
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _read_log(self, content_type, offset, repair=False):
+        """أسطر السجل بعد offset: ([(المعرف، العنصر)]، البايتات المقروءة كاملة)"""
+        try:
+            with open(self.log_path(content_type), 'rb') as f:
+                f.seek(offset)
+                raw = f.read()
+        except FileNotFoundError:
+            return [], 0
+        entries = []
+        valid = 0
+        for line in raw.splitlines(keepends=True):
+            try:
+                if not line.endswith(b"\n"):
+                    raise ValueError("incomplete line")
+                key, item = json.loads(line)
+            except ValueError:
+                # سطر أخير ناقص بعد توقف مفاجئ (أو يُكتب الآن)؛ تحت قفل الكتابة يُقص قبل الإضافة بعده
+                if repair:
+                    with open(self.log_path(content_type), 'r+b') as f:
+                        f.truncate(offset + valid)
+                break
+            entries.append((key, item))
+            valid += len(line)
+        return entries, valid
+
+    def _load(self, content_type, repair=False):
+        stamp = self._stamp(content_type)
+        try:
+            with open(self.shard_path(content_type), 'rb') as f:
+                items = json.loads(f.read())
+        except FileNotFoundError:
+            items = {}
+        entries, offset = self._read_log(content_type, 0, repair)
+        items.update(entries)
+        self._log_lines[content_type] = len(entries)
+        self._positions[content_type] = (stamp, offset)
+        return items
+
+    def _sync(self, content_type, repair=False):
+        """تطبيق ما كتبته العمليات الأخرى على نوع محمّل منذ آخر قراءة (يُستدعى تحت self._lock)"""
+        items = self._shards.get(content_type)
+        if items is None:
+            return
+        stamp, offset = self._positions[content_type]
+        changes = []
+        if self._stamp(content_type) != stamp:
+            # أعادت عملية أخرى كتابة الملف: قراءته كاملاً وتحديث القاموس نفسه (المراجع إليه تبقى صالحة)
+            fresh = self._load(content_type)
+            for key, item in fresh.items():
+                old = items.get(key)
+                if old != item:
+                    items[key] = item
+                    changes.append((key, old, item))
+        else:
+            entries, read = self._read_log(content_type, offset, repair)
+            for key, item in entries:
+                changes.append((key, items.get(key), item))
+                items[key] = item
+            self._log_lines[content_type] += len(entries)
+            self._positions[content_type] = (stamp, offset + read)
+        if changes and self.on_external is not None:
+            self.on_external(content_type, changes)
+
+    @contextmanager
+    def exclusive(self, content_type=None):
+        """قفل الكتابة (بين الخيوط والعمليات) بعد مزامنة النوع مع القرص؛ يمكن تداخله"""
+        with self._lock:
+            self._depth += 1
+            try:
+                if self._depth == 1 and fcntl is not None:
+                    if self._lock_file is None:
+                        self._lock_file = open(os.path.join(self.directory, ".lock"), 'a')
+                    fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+                if content_type is not None and content_type not in self._shards:
+                    self._shards[content_type] = self._load(content_type, repair=True)
+                elif content_type is not None:
+                    self._sync(content_type, repair=True)
+                yield
+            finally:
+                self._depth -= 1
+                if self._depth == 0 and fcntl is not None:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def refresh(self):
+        """قراءة تعديلات العمليات الأخرى على الأنواع المحمّلة (فحص stat رخيص إن لم يتغير شيء)"""
+        for content_type in list(self._shards):
+            stamp, offset = self._positions[content_type]
+            try:
+                log_size = os.path.getsize(self.log_path(content_type))
+            except FileNotFoundError:
+                log_size = 0
+            if self._stamp(content_type) != stamp or log_size != offset:
+                with self.exclusive(content_type):
+                    pass
+
+    def __getitem__(self, content_type):
+        items = self._shards.get(content_type)
+        if items is None:
+            with self._lock:
+                items = self._shards.get(content_type)
+                if items is None:
+                    items = self._shards[content_type] = self._load(content_type)
+        return items
+
+    def get(self, content_type, default=None):
+        # نوع غير معروف لا يُحمّل ولا يُحفظ قاموسه الفارغ
+        if content_type not in self:
+            return default
+        return self[content_type]
+
+    def __contains__(self, content_type):
+        return content_type in self._shards or content_type in CONTENT_TYPES or content_type in self._known_types()
+
+    def put(self, content_type, key, item):
+        """حفظ عنصر واحد: تحديث الذاكرة وإضافة سطر إلى سجل النوع؛ يعيد العنصر السابق (أو None)"""
+        return self.put_many(content_type, ((key, item),))[key]
+
+    def put_many(self, content_type, entries):
+        """حفظ عناصر كثيرة بكتابة واحدة وfsync واحد (سطر لكل عنصر، أو إعادة كتابة الملف إن كان أرخص).
+
+        يعيد {المعرف: العنصر السابق أو None} كما كان على القرص لحظة الكتابة.
+        """
+        with self.exclusive(content_type):
+            items = self[content_type]
+            old_items = {}
+            lines = []
+            for key, item in entries:
+                old_items.setdefault(key, items.get(key))
+                items[key] = item
+                lines.append(json.dumps([key, item], ensure_ascii=False) + "\n")
+            if not lines:
+                return old_items
+            if self._log_lines[content_type] + len(lines) >= max(self.compact_min, len(items)):
+                self.compact(content_type)
+                return old_items
+            data = "".join(lines).encode()
+            with open(self.log_path(content_type), 'ab') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self._log_lines[content_type] += len(lines)
+            stamp, offset = self._positions[content_type]
+            self._positions[content_type] = (stamp, offset + len(data))
+            return old_items
+
+    def compact(self, content_type):
+        """إعادة كتابة ملف النوع من الذاكرة (بعد مزامنتها مع القرص) وحذف سجله"""
+        with self.exclusive(content_type):
+            atomic_write(self.shard_path(content_type), json.dumps(self[content_type], ensure_ascii=False))
+            try:
+                os.remove(self.log_path(content_type))
+            except FileNotFoundError:
+                pass
+            self._log_lines[content_type] = 0
+            self._positions[content_type] = (self._stamp(content_type), 0)
+
+    def compact_all(self):
+        for content_type in list(self._shards):
+            if self._log_lines.get(content_type):
+                self.compact(content_type)
+
+    def fingerprint(self, content_type):
+        """بصمة رخيصة (الحجم ووقت التعديل للملف والسجل) للتحقق من صلاحية الفهارس المحفوظة"""
+        parts = []
+        for path in (self.shard_path(content_type), self.log_path(content_type)):
+            try:
+                stat = os.stat(path)
+                parts.append(f"{stat.st_size}-{stat.st_mtime_ns}")
+            except FileNotFoundError:
+                parts.append("-")
+        return "/".join(parts)
@@ -0,0 +1,31 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PersistenceExecutorMixin:
+    """تشغيل عمليات الحفظ المتزامنة على خيط مخصص بدلاً من حلقة asyncio.
+
+    خيط واحد لكل مدير (الافتراضي) يضمن تنفيذ التعديلات بالترتيب نفسه الذي وصلت به.
+    المدير الذي يحمي بياناته بأقفاله الخاصة يمكنه رفع executor_workers.
+    """
+
+    executor_name = "store"
+    executor_workers = 1
+    _executor = None
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.executor_workers, thread_name_prefix=self.executor_name)
+        return self._executor
+
+    async def run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+
+    def shutdown_executor(self):
+        # انتظار انتهاء العمليات المعلقة قبل الإغلاق
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
@@ -0,0 +1,60 @@
+import heapq
+from datetime import date
+
+
+def activity_day(timestamp):
+    """رقم يوم آخر نشاط (date.toordinal) من UserRecord.last_activity"""
+    return date.fromtimestamp(timestamp).toordinal()
+
+
+class ExpiryIndex:
+    """المستخدمون مرتبون حسب يوم آخر نشاط في min-heap مع إبطال كسول.
+
+    touch يضيف مدخلاً جديداً فقط عند تغير اليوم (مرة لكل مستخدم في اليوم)، والمدخلات القديمة
+    تُتجاهل عند إخراجها. إخراج المنتهين يكلف O(k log n) لـ k مستخدم منتهٍ فقط.
+    """
+
+    def __init__(self, items=()):
+        self._days = dict(items)
+        self._heap = [(day, user_id) for user_id, day in self._days.items()]
+        heapq.heapify(self._heap)
+
+    def __len__(self):
+        return len(self._days)
+
+    def __contains__(self, user_id):
+        return user_id in self._days
+
+    def touch(self, user_id, day):
+        if self._days.get(user_id) == day:
+            return
+        self._days[user_id] = day
+        heapq.heappush(self._heap, (day, user_id))
+        if len(self._heap) > 2 * len(self._days) + 64:
+            self._compact()
+
+    def remove(self, user_id):
+        self._days.pop(user_id, None)
+
+    def _compact(self):
+        self._heap = [(day, user_id) for user_id, day in self._days.items()]
+        heapq.heapify(self._heap)
+
+    def _peek(self):
+        # تجاهل المدخلات التي تغير يومها أو حُذف مستخدمها
+        heap = self._heap
+        while heap and self._days.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def pop_oldest(self, before, limit):
+        """إخراج حتى limit مستخدم آخر نشاط لهم قبل اليوم before، الأقدم أولاً"""
+        popped = []
+        while len(popped) < limit:
+            head = self._peek()
+            if head is None or head[0] >= before:
+                break
+            heapq.heappop(self._heap)
+            del self._days[head[1]]
+            popped.append(head[1])
+        return popped
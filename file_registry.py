@@ -0,0 +1,150 @@
+import threading
+from datetime import datetime
+
+from telegram import InputMediaAudio, InputMediaDocument, InputMediaPhoto, InputMediaVideo
+
+# حد تيليجرام لعدد العناصر في send_media_group
+MEDIA_GROUP_SIZE = 10
+INPUT_MEDIA = {
+    "photo": InputMediaPhoto,
+    "video": InputMediaVideo,
+    "document": InputMediaDocument,
+    "audio": InputMediaAudio,
+}
+# الأنواع التي يمكن جمعها في مجموعة واحدة (الصور مع الفيديو، المستندات وحدها، الصوتيات وحدها)؛
+# الرسائل الصوتية (voice) لا تدخل في المجموعات
+GROUP_KIND = {"photo": "visual", "video": "visual", "document": "document", "audio": "audio"}
+SEND_ONE = {
+    "photo": "send_photo",
+    "video": "send_video",
+    "document": "send_document",
+    "audio": "send_audio",
+    "voice": "send_voice",
+}
+INDEXED_FIELDS = ("sections", "file_type", "user_id")
+
+
+class FileRegistry:
+    """سجل الملفات المرفوعة مفهرس بـ file_unique_id (نفس الملف = نفس المفتاح مهما تكرر رفعه).
+
+    السجلات تُحفظ في نوع "files" من ContentStore، وفهارس القسم والنوع والرافع تُبنى
+    عند أول استخدام ثم تُحدث مع كل إضافة، فعرض ملفات قسم بحث في قاموس وليس مروراً على كل الملفات.
+    الإرسال للمتعلمين يعيد استخدام file_id المحفوظ فلا يُرفع الملف مرة أخرى.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._indexes = None
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _index(indexes, key, record):
+        for field in INDEXED_FIELDS:
+            values = record.get(field)
+            # السجلات القديمة (قبل الأقسام) لها section واحد أو لا شيء
+            if field == "sections" and values is None:
+                values = [record.get("section")]
+            elif field != "sections":
+                values = [values]
+            for value in values:
+                indexes[field].setdefault(value, []).append(key)
+
+    @property
+    def indexes(self):
+        if self._indexes is None:
+            # تحميل النوع قبل قفل السجل: ترتيب الأقفال دائماً قفل المحتوى ← قفل السجل
+            self.store["files"]
+            with self._lock:
+                if self._indexes is None:
+                    indexes = {field: {} for field in INDEXED_FIELDS}
+                    for key, record in self.store["files"].items():
+                        self._index(indexes, key, record)
+                    self._indexes = indexes
+        return self._indexes
+
+    def get(self, key):
+        return self.store["files"].get(key)
+
+    def add(self, file_unique_id, file_id, file_type, file_name=None, user_id=None, section=None):
+        """تسجيل ملف في قسم؛ يعيد (السجل، True إن كان جديداً على هذا القسم)"""
+        # قفل الكتابة أولاً: السجل يُقرأ بعد مزامنته مع ما أضافته العمليات الأخرى
+        with self.store.exclusive("files"), self._lock:
+            indexes = self.indexes
+            record = self.get(file_unique_id)
+            if record is not None:
+                if section in record["sections"]:
+                    return record, False
+                # الملف نفسه في قسم آخر: يُضاف القسم ولا يُكرر السجل
+                record = dict(record, sections=record["sections"] + [section])
+                self.store.put("files", file_unique_id, record)
+                indexes["sections"].setdefault(section, []).append(file_unique_id)
+                return record, True
+
+            record = {
+                "file_id": file_id,
+                "file_type": file_type,
+                "file_name": file_name,
+                "user_id": user_id,
+                "sections": [section],
+                "timestamp": datetime.now().isoformat()
+            }
+            self.store.put("files", file_unique_id, record)
+            self._index(indexes, file_unique_id, record)
+            return record, True
+
+    def reindex(self, changes):
+        """تحديث الفهارس بسجلات كتبتها عملية أخرى: [(المفتاح، القديم، الجديد)]"""
+        with self._lock:
+            if self._indexes is None:
+                return
+            for key, old, record in changes:
+                if old is None:
+                    self._index(self._indexes, key, record)
+                    continue
+                known = old.get("sections") or [old.get("section")]
+                for section in record["sections"]:
+                    if section not in known:
+                        self._indexes["sections"].setdefault(section, []).append(key)
+
+    def _lookup(self, field, value):
+        files = self.store["files"]
+        return [files[key] for key in self.indexes[field].get(value, [])]
+
+    def in_section(self, section, file_type=None):
+        records = self._lookup("sections", section)
+        if file_type is not None:
+            records = [r for r in records if r["file_type"] == file_type]
+        return records
+
+    def by_type(self, file_type):
+        return self._lookup("file_type", file_type)
+
+    def by_uploader(self, user_id):
+        return self._lookup("user_id", user_id)
+
+    def count(self, section):
+        return len(self.indexes["sections"].get(section, []))
+
+
+def media_batches(records):
+    """تقسيم الملفات بالترتيب إلى دفعات يُرسل كل منها بطلب واحد"""
+    batch, kind = [], None
+    for record in records:
+        record_kind = GROUP_KIND.get(record["file_type"])
+        if batch and (record_kind is None or record_kind != kind or len(batch) == MEDIA_GROUP_SIZE):
+            yield batch
+            batch = []
+        batch.append(record)
+        kind = record_kind
+    if batch:
+        yield batch
+
+
+async def send_files(bot, chat_id, records):
+    """إرسال الملفات بإعادة استخدام file_id: مجموعة وسائط لكل دفعة، أو رسالة واحدة للملف المنفرد"""
+    for batch in media_batches(records):
+        if len(batch) == 1:
+            record = batch[0]
+            await getattr(bot, SEND_ONE[record["file_type"]])(chat_id, record["file_id"])
+        else:
+            await bot.send_media_group(chat_id, [INPUT_MEDIA[r["file_type"]](r["file_id"]) for r in batch])
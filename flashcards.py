@@ -0,0 +1,292 @@
+import array
+import base64
+import bisect
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime
+
+import config
+
+logger = logging.getLogger(__name__)
+
+DAY = 86400
+# تقييمات المستخدم (SM-2): 1 نسيت، 3 صعبة، 4 جيدة، 5 سهلة
+RATINGS = (1, 3, 4, 5)
+# مدى التقييم في SM-2 (الأزرار تستخدم جزءاً منه)
+MIN_RATING, MAX_RATING = 0, 5
+DECK_VERSION = 1
+
+
+class UserDeck:
+    """حالة بطاقات مستخدم واحد في مصفوفات متوازية بدلاً من قواميس متداخلة.
+
+    البطاقات تُضاف بترتيب المفردات فتبقى مصفوفة cards مرتبة ويُبحث فيها ثنائياً.
+    كل بطاقة تكلف ~18 بايت، وكومة due تعطي البطاقة التالية بـ O(log n).
+    """
+
+    def __init__(self, cards=None, due=None, interval=None, ease=None, reps=None):
+        self.cards = cards or array.array("I")
+        self.due = due or array.array("I")
+        self.interval = interval or array.array("f")
+        self.ease = ease or array.array("f")
+        self.reps = reps or array.array("H")
+        self.heap = [(due_at, slot) for slot, due_at in enumerate(self.due)]
+        heapq.heapify(self.heap)
+
+    def __len__(self):
+        return len(self.cards)
+
+    def slot_of(self, card_id):
+        slot = bisect.bisect_left(self.cards, card_id)
+        if slot < len(self.cards) and self.cards[slot] == card_id:
+            return slot
+        return None
+
+    def add(self, card_id, now):
+        self.cards.append(card_id)
+        self.due.append(now)
+        self.interval.append(0.0)
+        self.ease.append(2.5)
+        self.reps.append(0)
+        slot = len(self.cards) - 1
+        heapq.heappush(self.heap, (now, slot))
+        return slot
+
+    def peek_due(self):
+        """أقرب موعد مراجعة (مع تجاهل المدخلات القديمة في الكومة)"""
+        while self.heap:
+            due_at, slot = self.heap[0]
+            if self.due[slot] == due_at:
+                return due_at, slot
+            heapq.heappop(self.heap)
+        return None
+
+    def review(self, slot, rating, now):
+        """تحديث البطاقة وفق SM-2"""
+        ease = self.ease[slot]
+        if rating < 3:
+            self.reps[slot] = 0
+            interval = config.FLASHCARD_RELEARN_MINUTES / 1440
+        else:
+            reps = min(self.reps[slot] + 1, 65535)
+            self.reps[slot] = reps
+            if reps == 1:
+                interval = 1.0
+            elif reps == 2:
+                interval = 6.0
+            else:
+                interval = self.interval[slot] * ease
+            ease = max(1.3, ease + 0.1 - (5 - rating) * (0.08 + (5 - rating) * 0.02))
+        self.ease[slot] = ease
+        self.interval[slot] = interval
+        self.due[slot] = int(now + interval * DAY)
+        heapq.heappush(self.heap, (self.due[slot], slot))
+
+    def pack(self):
+        raw = b"".join(a.tobytes() for a in (self.cards, self.due, self.interval, self.ease, self.reps))
+        return base64.b64encode(raw).decode("ascii")
+
+    def entry(self, slot):
+        return [self.cards[slot], self.due[slot], self.interval[slot], self.ease[slot], self.reps[slot]]
+
+    @classmethod
+    def unpack(cls, count, payload, delta=None):
+        """المجموعة المضغوطة ثم البطاقات المعدلة بعدها (delta: {رقم الخانة: entry})"""
+        raw = base64.b64decode(payload)
+        arrays = [array.array(code) for code in ("I", "I", "f", "f", "H")]
+        offset = 0
+        for a in arrays:
+            size = a.itemsize * count
+            a.frombytes(raw[offset:offset + size])
+            offset += size
+        # الخانات بعد آخر ضغط بطاقات جديدة تُضاف بالترتيب
+        for slot, entry in sorted((int(slot), entry) for slot, entry in (delta or {}).items()):
+            for a, value in zip(arrays, entry):
+                if slot < len(a):
+                    a[slot] = value
+                else:
+                    a.append(value)
+        return cls(*arrays)
+
+
+class FlashcardScheduler:
+    """جدولة بطاقات المفردات بتكرار متباعد لكل مستخدم.
+
+    المجموعة تُحفظ مضغوطة في صف منفصل ("decks")، والمراجعة تحفظ البطاقة المعدلة وحدها في
+    user["flashcards"]["delta"]؛ بعد FLASHCARD_DELTA_MAX بطاقة يُعاد ضغط المجموعة كاملة.
+    تُفك فقط عند أول استخدام للمستخدم.
+    كومة عامة (أقرب موعد، مستخدم) تعطي المستخدمين الذين حان موعد مراجعتهم دون فحص الجميع.
+    تعديل بطاقات المستخدم يتم تحت قفله في user_manager، و_lock يحمي الذاكرة المؤقتة والكومة المشتركتين.
+    الجدولة تعمل على خيوط التخزين ولا تقرأ المحتوى: البطاقات أرقام في ترتيب المفردات، وعدد
+    المفردات والكلمات نفسها تُقرأ على خيط المحتوى (bot.py).
+    """
+
+    def __init__(self, user_manager):
+        self.user_manager = user_manager
+        self.decks = {}
+        self.due_users = []
+        self._lock = threading.RLock()
+        # ما يُضاف إلى الكومة أثناء إعادة بنائها (_rebuild_due_users)
+        self._pushed = None
+        for user_id, user_data in user_manager.user_entries():
+            state = user_data.flashcards
+            if state and state.get("next_due"):
+                self.due_users.append((state["next_due"], user_id))
+        heapq.heapify(self.due_users)
+        # مستخدم محذوف قد يعود بسجل جديد، فلا تبقى مجموعته القديمة في الذاكرة
+        user_manager.on_remove.append(self.forget)
+
+    def forget(self, user_id):
+        with self._lock:
+            self.decks.pop(str(user_id), None)
+
+    def _state(self, user_id):
+        user_data = self.user_manager.get_user(user_id)
+        if user_data is None:
+            return None
+        if user_data.flashcards is None:
+            user_data.flashcards = {
+                "v": DECK_VERSION, "delta": {}, "next_due": 0, "next_new": 0, "new_date": None, "new_today": 0
+            }
+        return user_data.flashcards
+
+    def deck(self, user_id):
+        user_id = str(user_id)
+        with self._lock:
+            deck = self.decks.get(user_id)
+        if deck is None:
+            state = self._state(user_id)
+            if state is None:
+                return None
+            # السجلات القديمة تحتوي المجموعة المضغوطة داخل state
+            packed = self.user_manager.get_deck(user_id) or {"n": state.get("n", 0), "data": state.get("data", "")}
+            deck = UserDeck.unpack(packed["n"], packed["data"], state.get("delta"))
+            with self._lock:
+                # الحالة محفوظة مضغوطة دائماً، لذلك يمكن إسقاط أقدم المجموعات المفكوكة من الذاكرة
+                if len(self.decks) >= config.FLASHCARD_DECK_CACHE:
+                    del self.decks[next(iter(self.decks))]
+                self.decks[user_id] = deck
+        return deck
+
+    def _save(self, user_id, deck, slot):
+        """حفظ خانة واحدة معدلة: O(1) حتى تتجمع FLASHCARD_DELTA_MAX خانة فتُضغط المجموعة كاملة"""
+        state = self._state(user_id)
+        # قاموس جديد بدل تعديل القديم: نسخة السجل المأخوذة للحفظ تبقى ثابتة
+        delta = dict(state.get("delta") or {})
+        delta[str(slot)] = deck.entry(slot)
+        if len(delta) > config.FLASHCARD_DELTA_MAX:
+            self.user_manager.save_deck(user_id, {"n": len(deck), "data": deck.pack()})
+            state.pop("n", None)
+            state.pop("data", None)
+            delta = {}
+        state["delta"] = delta
+        head = deck.peek_due()
+        state["next_due"] = head[0] if head else 0
+        if head:
+            with self._lock:
+                heapq.heappush(self.due_users, (head[0], user_id))
+                if self._pushed is not None:
+                    self._pushed.append((head[0], user_id))
+        # الحفظ يتم عند ترك قفل المستخدم (locked)
+        self.user_manager.mark_dirty("users", user_id)
+
+    def _rebuild_due_users(self):
+        """إسقاط المدخلات القديمة من الكومة. user_entries تأخذ أقفال المستخدمين فتُستدعى دون أي قفل،
+        وما يُضاف أثناء اللقطة يُجمع في _pushed ويُضم إليها"""
+        with self._lock:
+            self._pushed = []
+        due_users = [
+            (user_data.flashcards["next_due"], user_id)
+            for user_id, user_data in self.user_manager.user_entries()
+            if user_data.flashcards and user_data.flashcards.get("next_due")
+        ]
+        with self._lock:
+            due_users.extend(self._pushed)
+            self._pushed = None
+            heapq.heapify(due_users)
+            self.due_users = due_users
+
+    def next_card(self, user_id, vocabulary_size, now=None):
+        """رقم البطاقة التالية: أقدم بطاقة مستحقة، وإلا كلمة جديدة ضمن الحد اليومي؛ أو None.
+
+        vocabulary_size: عدد المفردات (من خيط المحتوى)؛ البطاقات أرقام في ترتيبها الثابت.
+        """
+        user_id = str(user_id)
+        now = int(now or time.time())
+        with self.user_manager.locked(user_id):
+            deck = self.deck(user_id)
+            if deck is None:
+                return None
+
+            head = deck.peek_due()
+            if head and head[0] <= now:
+                card_id = deck.cards[head[1]]
+                if card_id < vocabulary_size:
+                    return card_id
+
+            state = self._state(user_id)
+            today = datetime.now().date().isoformat()
+            if state["new_date"] != today:
+                state["new_date"] = today
+                state["new_today"] = 0
+            if state["new_today"] >= config.FLASHCARD_NEW_PER_DAY:
+                return None
+            if state["next_new"] >= vocabulary_size:
+                return None
+
+            card_id = state["next_new"]
+            state["next_new"] += 1
+            state["new_today"] += 1
+            self._save(user_id, deck, deck.add(card_id, now))
+            return card_id
+
+    def review(self, user_id, card_id, rating, now=None):
+        if not MIN_RATING <= rating <= MAX_RATING:
+            return False
+        user_id = str(user_id)
+        with self.user_manager.locked(user_id):
+            deck = self.deck(user_id)
+            if deck is None:
+                return False
+            slot = deck.slot_of(card_id)
+            if slot is None:
+                return False
+            deck.review(slot, rating, int(now or time.time()))
+            self._save(user_id, deck, slot)
+        return True
+
+    def users_due(self, now=None, limit=None):
+        """المستخدمون الذين لديهم بطاقات مستحقة الآن (كل مستخدم مرة واحدة حتى يراجع مجدداً)"""
+        now = int(now or time.time())
+        users = {}
+        # كل مراجعة تضيف مدخلاً وتترك القديم؛ التنظيف هنا لأن _save يعمل تحت قفل المستخدم
+        if len(self.due_users) > 4 * len(self.user_manager.data["users"]) + 64:
+            self._rebuild_due_users()
+        with self._lock:
+            while self.due_users and self.due_users[0][0] <= now and (not limit or len(users) < limit):
+                due_at, user_id = heapq.heappop(self.due_users)
+                user_data = self.user_manager.get_user(user_id)
+                state = user_data.flashcards if user_data else None
+                # تجاهل المدخلات القديمة التي تغير موعدها بعد مراجعة
+                if state and state.get("next_due") == due_at:
+                    users[user_id] = None
+        return list(users)
+
+    def queue_due_reminders(self):
+        queued = 0
+        for user_id in self.users_due():
+            if self.user_manager.queue_notification(user_id, "flashcards_due"):
+                queued += 1
+        self.user_manager.save_data()
+        return queued
+
+    def schedule(self, job_queue):
+        job_queue.run_repeating(self.reminder_job, interval=config.FLASHCARD_REMINDER_INTERVAL, first=60,
+                                name="flashcard_reminders")
+
+    async def reminder_job(self, context):
+        queued = await self.user_manager.run(self.queue_due_reminders)
+        if queued:
+            logger.info("Queued %d flashcard reminders", queued)
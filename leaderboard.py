@@ -0,0 +1,59 @@
+from datetime import datetime
+
+from sortedcontainers import SortedList
+
+TIMEFRAMES = ("daily", "weekly", "monthly", "all_time")
+# الأطر التي تُصفّر نقاطها عند بداية يوم/أسبوع/شهر جديد
+WINDOWED_TIMEFRAMES = ("daily", "weekly", "monthly")
+
+
+def window_key(timeframe, now=None):
+    """معرف النافذة الزمنية الحالية للإطار (يتغير عند بداية يوم/أسبوع/شهر جديد)"""
+    now = now or datetime.now()
+    if timeframe == "daily":
+        return now.date().isoformat()
+    if timeframe == "weekly":
+        return now.strftime("%G-W%V")
+    if timeframe == "monthly":
+        return now.strftime("%Y-%m")
+    return "all"
+
+
+class RankedIndex:
+    """فهرس مرتب للنقاط: تحديث وترتيب مستخدم O(log n) وأفضل k بـ O(k)"""
+
+    def __init__(self, items=()):
+        self._scores = dict(items)
+        self._ranked = SortedList((-score, user_id) for user_id, score in self._scores.items())
+
+    def __len__(self):
+        return len(self._scores)
+
+    def __contains__(self, user_id):
+        return user_id in self._scores
+
+    def update(self, user_id, score):
+        old = self._scores.get(user_id)
+        if old is not None:
+            if old == score:
+                return
+            self._ranked.remove((-old, user_id))
+        self._scores[user_id] = score
+        self._ranked.add((-score, user_id))
+
+    def remove(self, user_id):
+        old = self._scores.pop(user_id, None)
+        if old is not None:
+            self._ranked.remove((-old, user_id))
+
+    def score(self, user_id):
+        return self._scores.get(user_id)
+
+    def top(self, k):
+        return [(user_id, -score) for score, user_id in self._ranked.islice(0, k)]
+
+    def rank(self, user_id):
+        score = self._scores.get(user_id)
+        if score is None:
+            return None
+        return self._ranked.index((-score, user_id)) + 1
@@ -0,0 +1,119 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import Counter, deque
+
+from groq import RateLimitError
+
+import config
+from notification_delivery import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+class GroqScheduler:
+    """مجموعة عمال محدودة أمام Groq مع طابور عادل بين المستخدمين.
+
+    - GROQ_CONCURRENCY طلباً على الأكثر في نفس الوقت
+    - ميزانية توكنات في الدقيقة عبر TokenBucket (التكلفة تقديرية قبل الإرسال)
+    - طابور عادل موزون: لكل مستخدم وقت افتراضي يتقدم بتكلفة طلباته، فلا يحجز مستخدم
+      كثير الطلبات الدور على الآخرين، والطلبات الأقصر تُخدم أولاً عند التساوي
+    - عند امتلاء الطابور (أو تجاوز المستخدم حده) ترفع submit استثناء asyncio.QueueFull فوراً
+    """
+
+    def __init__(self, concurrency=None, tokens_per_minute=None, max_queue=None, max_per_user=None):
+        self.concurrency = concurrency or config.GROQ_CONCURRENCY
+        tokens_per_minute = tokens_per_minute or config.GROQ_TOKENS_PER_MINUTE
+        self.bucket = TokenBucket(tokens_per_minute / 60, capacity=tokens_per_minute)
+        self.max_queue = max_queue or config.GROQ_MAX_QUEUE
+        self.max_per_user = max_per_user or config.GROQ_MAX_PENDING_PER_USER
+        self.heap = []
+        self._seq = itertools.count()
+        self._vtime = 0.0
+        self._user_finish = {}
+        self._user_pending = Counter()
+        self._items = None
+        self._workers = []
+        self.running = 0
+        self.waits = deque(maxlen=1000)
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "rate_limited": 0}
+
+    @property
+    def queued(self):
+        return len(self.heap)
+
+    def _ensure_workers(self):
+        if not self._workers:
+            self._items = asyncio.Semaphore(0)
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    def submit(self, user_id, cost, fn, *args):
+        """جدولة fn(*args) (دالة async) وإرجاع Future بنتيجتها"""
+        user_id = str(user_id)
+        if len(self.heap) >= self.max_queue or self._user_pending[user_id] >= self.max_per_user:
+            self.stats["rejected"] += 1
+            raise asyncio.QueueFull()
+        self._ensure_workers()
+
+        start = max(self._vtime, self._user_finish.get(user_id, 0.0))
+        finish = self._user_finish[user_id] = start + cost
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.heap, (finish, next(self._seq), start, user_id, cost, fn, args, future, time.monotonic()))
+        self._user_pending[user_id] += 1
+        self.stats["submitted"] += 1
+        self._items.release()
+        return future
+
+    async def _worker(self):
+        while True:
+            await self._items.acquire()
+            _, _, start, user_id, cost, fn, args, future, queued_at = heapq.heappop(self.heap)
+            self._vtime = max(self._vtime, start)
+            self._user_pending[user_id] -= 1
+            if not self._user_pending[user_id]:
+                del self._user_pending[user_id]
+                self._user_finish.pop(user_id, None)
+            if future.done():
+                continue
+
+            await self.bucket.acquire(cost)
+            self.waits.append(time.monotonic() - queued_at)
+            self.running += 1
+            try:
+                result = await fn(*args)
+            except RateLimitError as e:
+                # Groq رفض بسبب الحد: إيقاف كل الطلبات للمدة المطلوبة
+                retry_after = float(e.response.headers.get("retry-after", 10))
+                self.stats["rate_limited"] += 1
+                self.bucket.pause(retry_after)
+                if not future.done():
+                    future.set_exception(e)
+            except Exception as e:
+                self.stats["failed"] += 1
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                self.stats["completed"] += 1
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                self.running -= 1
+
+    def metrics(self):
+        waits = sorted(self.waits)
+        return {
+            "queued": len(self.heap),
+            "running": self.running,
+            "users_waiting": len(self._user_pending),
+            "wait_p50": waits[len(waits) // 2] if waits else 0.0,
+            "wait_p95": waits[int(len(waits) * 0.95)] if waits else 0.0,
+            **self.stats,
+        }
+
+    async def close(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
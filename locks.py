@@ -0,0 +1,27 @@
+import threading
+from contextlib import ExitStack, contextmanager
+
+
+class StripedLock:
+    """مجموعة ثابتة من الأقفال، كل مفتاح (مستخدم) يقع على أحدها حسب hash.
+
+    التعديلات على مستخدمين مختلفين تعمل بالتوازي غالباً، وعلى المستخدم نفسه بالتتابع،
+    بذاكرة ثابتة مهما زاد عدد المستخدمين. الأقفال RLock فيمكن للدوال المتداخلة أخذ القفل نفسه.
+    """
+
+    def __init__(self, stripes=64):
+        self._locks = tuple(threading.RLock() for _ in range(stripes))
+
+    def __len__(self):
+        return len(self._locks)
+
+    def for_key(self, key):
+        return self._locks[hash(key) % len(self._locks)]
+
+    @contextmanager
+    def all(self):
+        """أخذ كل الأقفال بالترتيب نفسه دائماً: لحظة ثابتة لا يُعدّل فيها أي مستخدم"""
+        with ExitStack() as stack:
+            for lock in self._locks:
+                stack.enter_context(lock)
+            yield
@@ -0,0 +1,130 @@
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+import config
+from content_import import IMPORTABLE_TYPES
+from quiz_engine import LIST_PREFIX, encode_start
+from router import encode
+
+BACK_BUTTON = InlineKeyboardButton("◀️ رجوع", callback_data="BACK")
+
+# أقسام القائمة الرئيسية
+MAIN_SECTIONS = [
+    ("📚 HSK", "MENU_HSK"),
+    ("🕌 القرآن", "MENU_Quran"),
+    ("🗂️ القاموس", "MENU_Dictionary"),
+    ("📖 القصص", "MENU_Stories"),
+    ("🔤 قواعد", "MENU_GrammarLessons"),
+    ("📑 مراجعة", "MENU_GrammarReview"),
+    ("💬 محادثات", "MENU_Dialogues"),
+    ("🃏 Flashcards", "MENU_Flashcards"),
+    ("❓ كويزات", "MENU_Quizzes"),
+    ("📷 معجم صور", "MENU_PictureDictionary"),
+    ("📱 التطبيقات", "MENU_Apps"),
+    ("🤖 المعلم الذكي", "MENU_AITutor"),
+]
+ADMIN_ITEM = ("⚙️ Admin", "MENU_Admin")
+
+# الأقسام التي يمكن رفع الملفات إليها
+UPLOAD_SECTIONS = [
+    ("HSK", "HSK"), ("القرآن", "Quran"), ("القاموس", "Dictionary"),
+    ("القصص", "Stories"), ("قواعد", "GrammarLessons"), ("مراجعة", "GrammarReview"),
+    ("محادثات", "Dialogues"), ("Flashcards", "Flashcards"), ("كويزات", "Quizzes"),
+    ("صور", "PictureDictionary"), ("تطبيقات", "Apps")
+]
+
+
+def grid(buttons, columns):
+    return [buttons[i:i + columns] for i in range(0, len(buttons), columns)]
+
+
+def _main_menu(is_admin):
+    items = MAIN_SECTIONS + [ADMIN_ITEM] if is_admin else MAIN_SECTIONS
+    return InlineKeyboardMarkup(grid([InlineKeyboardButton(t, callback_data=c) for t, c in items], 3))
+
+
+def _static_menus():
+    return {
+        "main": _main_menu(False),
+        "main_admin": _main_menu(True),
+        "back": InlineKeyboardMarkup([[BACK_BUTTON]]),
+        "admin": InlineKeyboardMarkup([
+            [InlineKeyboardButton("➕ إضافة محتوى", callback_data="ADM_ADD")],
+            [InlineKeyboardButton("📁 رفع ملف", callback_data="ADM_UP")],
+            [InlineKeyboardButton("📥 استيراد محتوى (CSV/TSV/JSONL)", callback_data="ADM_IMPORT")],
+            [BACK_BUTTON]
+        ]),
+        "hsk": InlineKeyboardMarkup(
+            grid([InlineKeyboardButton(f"HSK{i}", callback_data=f"SEC_HSK{i}") for i in range(1, 7)], 3) + [[BACK_BUTTON]]
+        ),
+        "ai_tutor": InlineKeyboardMarkup([
+            [InlineKeyboardButton("💡 اشرح كلمة", callback_data="AI_explain")],
+            [InlineKeyboardButton("✏️ صحح جملتي", callback_data="AI_correct")],
+            [InlineKeyboardButton("🔁 ترجم", callback_data="AI_translate")],
+            [BACK_BUTTON]
+        ]),
+        "upload_sections": InlineKeyboardMarkup(
+            [[InlineKeyboardButton(name, callback_data=f"UPSEC_{key}")] for name, key in UPLOAD_SECTIONS]
+            + [[InlineKeyboardButton("◀️ إلغاء", callback_data="cancel_upload")]]
+        ),
+        "import_types": InlineKeyboardMarkup(
+            [[InlineKeyboardButton(content_type, callback_data=f"IMPTYPE_{content_type}")] for content_type in IMPORTABLE_TYPES]
+            + [[InlineKeyboardButton("◀️ إلغاء", callback_data="cancel_import")]]
+        ),
+    }
+
+
+class MenuRegistry:
+    """لوحات المفاتيح تُبنى مرة واحدة وتُشارك بين كل الطلبات.
+
+    كائنات InlineKeyboardMarkup غير قابلة للتعديل فيمكن إرجاع الكائن نفسه لكل مستخدم.
+    اللوحات المبنية من المحتوى (مثل قائمة الاختبارات) يُعاد بناؤها فقط عندما يتغير
+    content_manager.version.
+    """
+
+    def __init__(self, content_manager, page_size=None):
+        self.content_manager = content_manager
+        self.page_size = page_size or config.BROWSER_PAGE_SIZE
+        self._static = _static_menus()
+        self._content = {}
+        self._content_version = content_manager.version
+
+    def get(self, name):
+        return self._static[name]
+
+    def main(self, is_admin):
+        return self._static["main_admin" if is_admin else "main"]
+
+    def _from_content(self, name, build):
+        if self._content_version != self.content_manager.version:
+            self._content.clear()
+            self._content_version = self.content_manager.version
+        markup = self._content.get(name)
+        if markup is None:
+            markup = self._content[name] = build()
+        return markup
+
+    def quizzes(self, page=0):
+        """قائمة الاختبارات صفحة صفحة؛ الأزرار تحمل رقم الاختبار لا معرفه"""
+        pages = max(1, -(-len(self.content_manager.quiz_ids) // self.page_size))
+        page = min(max(page, 0), pages - 1)
+        return self._from_content(("quizzes", page), lambda: self._quiz_page(page, pages))
+
+    def _quiz_page(self, page, pages):
+        start = page * self.page_size
+        quizzes = self.content_manager.get_all_quizzes()
+        kb = [
+            [InlineKeyboardButton(quizzes[quiz_id].get("title", quiz_id), callback_data=encode_start(start + i))]
+            for i, quiz_id in enumerate(self.content_manager.quiz_ids[start:start + self.page_size])
+        ]
+        nav = []
+        if page > 0:
+            nav.append(InlineKeyboardButton("◀️ السابق", callback_data=encode(LIST_PREFIX, page - 1)))
+        if page < pages - 1:
+            nav.append(InlineKeyboardButton("التالي ▶️", callback_data=encode(LIST_PREFIX, page + 1)))
+        if nav:
+            kb.append(nav)
+        kb.append([BACK_BUTTON])
+        return InlineKeyboardMarkup(kb)
+
+    def invalidate(self):
+        self._content.clear()
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import time
+from datetime import time as dt_time
+
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+def _seconds(delay):
+    # retry_after قد يكون رقماً أو timedelta حسب إصدار المكتبة
+    return delay.total_seconds() if hasattr(delay, "total_seconds") else float(delay)
+
+
+class TokenBucket:
+    """محدد معدل: rate رسالة في الثانية مع سعة انفجار capacity"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount=1):
+        # طلب أكبر من السعة لا يمكن تلبيته أبداً، فيُقص إلى السعة
+        amount = min(amount, self.capacity)
+        async with self.lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def pause(self, seconds):
+        """إيقاف كل الإرسال لمدة seconds (بعد RetryAfter من تيليجرام)"""
+        self._refill()
+        self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+
+class NotificationDispatcher:
+    """إرسال الإشعارات المخزنة على دفعات مع احترام حدود تيليجرام.
+
+    - حد عام GLOBAL_SEND_RATE رسالة/ثانية عبر TokenBucket
+    - رسالة واحدة على الأكثر لكل محادثة كل PER_CHAT_SEND_INTERVAL ثانية،
+      وكل الإشعارات غير المقروءة لمستخدم تُدمج في رسالة واحدة
+    - عند RetryAfter يتوقف الإرسال كله للمدة المطلوبة ثم يعاد المحاولة
+    """
+
+    def __init__(self, user_manager, rate=None, per_chat_interval=None, concurrency=None,
+                 batch_size=None, max_retries=None):
+        self.user_manager = user_manager
+        self.bucket = TokenBucket(rate or config.GLOBAL_SEND_RATE)
+        self.per_chat_interval = per_chat_interval if per_chat_interval is not None else config.PER_CHAT_SEND_INTERVAL
+        self.concurrency = concurrency or config.DELIVERY_CONCURRENCY
+        self.batch_size = batch_size or config.DELIVERY_BATCH_SIZE
+        self.max_retries = max_retries if max_retries is not None else config.DELIVERY_MAX_RETRIES
+        self._chat_next_send = {}
+        self._running = False
+        self.stats = {"sent": 0, "failed": 0, "retry_after": 0}
+
+    def schedule(self, job_queue):
+        job_queue.run_repeating(self.delivery_job, interval=config.DELIVERY_INTERVAL, first=10, name="notification_delivery")
+        hour, minute = (int(part) for part in config.DAILY_REMINDER_TIME.split(":"))
+        job_queue.run_daily(self.daily_reminder_job, time=dt_time(hour, minute), name="daily_reminders")
+        job_queue.run_daily(self.compaction_job, time=dt_time(4, 0), name="notification_compaction")
+
+    async def compaction_job(self, context):
+        changed = await self.user_manager.run(self.user_manager.compact_notifications)
+        logger.info("Compacted notifications for %d users", changed)
+
+    async def daily_reminder_job(self, context):
+        queued = await self.user_manager.run(self.user_manager.queue_daily_reminders)
+        logger.info("Queued %d daily reminders", queued)
+        await self.delivery_job(context)
+
+    async def delivery_job(self, context):
+        # منع تداخل تشغيلين للمهمة إذا استغرق التفريغ أطول من الفاصل الزمني
+        if self._running:
+            return
+        self._running = True
+        try:
+            while await self.deliver_batch(context.bot) >= self.batch_size:
+                pass
+        finally:
+            self._running = False
+
+    async def deliver_batch(self, bot):
+        """إرسال دفعة واحدة، وإرجاع عدد المستخدمين الذين تمت معالجتهم"""
+        pending = await self.user_manager.run(self.user_manager.get_pending_notifications, self.batch_size)
+        if not pending:
+            return 0
+
+        now = time.monotonic()
+        self._chat_next_send = {k: v for k, v in self._chat_next_send.items() if v > now}
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def deliver(user_id, last_id, messages):
+            async with semaphore:
+                return user_id, last_id, await self._send(bot, user_id, "\n\n".join(messages))
+
+        results = await asyncio.gather(
+            *(deliver(user_id, last_id, messages) for user_id, (last_id, messages) in pending.items())
+        )
+        delivered = {user_id: last_id for user_id, last_id, ok in results if ok}
+        if not delivered:
+            # كل الإرسال فشل: لا نكرر الدفعة نفسها فوراً
+            return 0
+        await self.user_manager.run(self.user_manager.mark_notifications_delivered, delivered)
+        return len(pending)
+
+    async def _wait_for_chat(self, chat_id):
+        now = time.monotonic()
+        next_send = self._chat_next_send.get(chat_id, now)
+        self._chat_next_send[chat_id] = max(now, next_send) + self.per_chat_interval
+        if next_send > now:
+            await asyncio.sleep(next_send - now)
+
+    async def _send(self, bot, user_id, text):
+        for attempt in range(self.max_retries + 1):
+            await self._wait_for_chat(user_id)
+            await self.bucket.acquire()
+            try:
+                await bot.send_message(chat_id=int(user_id), text=text)
+                self.stats["sent"] += 1
+                return True
+            except RetryAfter as e:
+                delay = _seconds(e.retry_after)
+                self.stats["retry_after"] += 1
+                self.bucket.pause(delay)
+                await asyncio.sleep(delay)
+            except (Forbidden, BadRequest) as e:
+                # المستخدم حظر البوت أو المحادثة غير موجودة: لا فائدة من إعادة المحاولة
+                logger.info("Dropping notifications for %s: %s", user_id, e)
+                return True
+            except NetworkError as e:
+                logger.warning("Network error sending to %s (attempt %d): %s", user_id, attempt + 1, e)
+                await asyncio.sleep(min(2 ** attempt, 30))
+        self.stats["failed"] += 1
+        return False
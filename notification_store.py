@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta
+
+import config
+
+
+class NotificationStore:
+    """مخزن إشعارات محدود لكل مستخدم.
+
+    سجل كل مستخدم قاموس بسيط قابل للحفظ كـ JSON:
+        {"next": رقم الإشعار التالي، "read": آخر رقم مقروء، "items": [آخر HISTORY_LIMIT إشعار]}
+    الأرقام متزايدة فتكون الإشعارات غير المقروءة ذيلاً متصلاً من القائمة: الاستعلام O(غير المقروء).
+    مجموعة unread_users تجعل البحث عن المستخدمين الذين لديهم إشعارات دون فحص الجميع.
+    """
+
+    def __init__(self, records, history_limit=None, ttl_days=None):
+        self.records = records
+        self.history_limit = history_limit or config.NOTIFICATION_HISTORY_LIMIT
+        self.ttl = timedelta(days=ttl_days or config.NOTIFICATION_TTL_DAYS)
+        self.migrated = 0
+        for user_id, record in list(records.items()):
+            if isinstance(record, list):
+                records[user_id] = self._migrate(record)
+                self.migrated += 1
+        self.unread_users = {user_id for user_id, record in records.items() if self.unread_count(user_id)}
+
+    def _migrate(self, legacy):
+        """تحويل القائمة القديمة (إشعارات مع حقل read) إلى السجل الجديد"""
+        items = []
+        read_upto = 0
+        for seq, n in enumerate(legacy, 1):
+            if n.get("read") and read_upto == seq - 1:
+                read_upto = seq
+            items.append({"id": seq, "type": n["type"], "message": n["message"], "timestamp": n["timestamp"]})
+        return {"next": len(legacy) + 1, "read": read_upto, "items": items[-self.history_limit:]}
+
+    def _expire(self, record, now=None):
+        # التواريخ بصيغة ISO فتقارن كنصوص دون تحليل
+        cutoff = ((now or datetime.now()) - self.ttl).isoformat()
+        items = record["items"]
+        expired = 0
+        while expired < len(items) and items[expired]["timestamp"] < cutoff:
+            expired += 1
+        if expired:
+            del items[:expired]
+        return expired
+
+    def push(self, user_id, notification_type, message):
+        record = self.records.get(user_id)
+        if record is None:
+            record = self.records[user_id] = {"next": 1, "read": 0, "items": []}
+        record["items"].append({
+            "id": record["next"],
+            "type": notification_type,
+            "message": message,
+            "timestamp": datetime.now().isoformat()
+        })
+        record["next"] += 1
+        overflow = len(record["items"]) - self.history_limit
+        if overflow > 0:
+            del record["items"][:overflow]
+        self._expire(record)
+        self.unread_users.add(user_id)
+
+    def unread_count(self, user_id):
+        record = self.records.get(user_id)
+        if not record:
+            return 0
+        return min(record["next"] - 1 - record["read"], len(record["items"]))
+
+    def unread(self, user_id):
+        count = self.unread_count(user_id)
+        if not count:
+            return []
+        return self.records[user_id]["items"][-count:]
+
+    def mark_read(self, user_id, upto=None):
+        """تحريك مؤشر القراءة حتى الإشعار upto (أو حتى آخر إشعار)"""
+        record = self.records.get(user_id)
+        if not record:
+            return False
+        last = record["next"] - 1
+        record["read"] = max(record["read"], min(last, upto if upto is not None else last))
+        if record["read"] >= last:
+            self.unread_users.discard(user_id)
+        return True
+
+    def remove(self, user_id):
+        self.unread_users.discard(user_id)
+        return self.records.pop(user_id, None) is not None
+
+    def compact(self):
+        """حذف الإشعارات المنتهية وسجلات المستخدمين الفارغة؛ يعيد المستخدمين الذين تغيرت سجلاتهم"""
+        now = datetime.now()
+        changed = []
+        for user_id, record in list(self.records.items()):
+            expired = self._expire(record, now)
+            if not record["items"]:
+                del self.records[user_id]
+                self.unread_users.discard(user_id)
+                changed.append(user_id)
+            elif expired:
+                if not self.unread_count(user_id):
+                    self.unread_users.discard(user_id)
+                changed.append(user_id)
+        return changed
@@ -0,0 +1,109 @@
+import secrets
+import time
+from collections import OrderedDict
+
+import config
+from router import encode, unpack_exact
+
+# بيانات الأزرار: QZ_<رمز الجلسة، رقم السؤال، رقم الخيار مضغوطة> (~10 بايت)
+ANSWER_PREFIX = "QZ"
+# QZS_<رقم الاختبار> وQZL_<رقم صفحة قائمة الاختبارات>
+START_PREFIX = "QZS"
+LIST_PREFIX = "QZL"
+
+
+def encode_start(quiz_number):
+    return encode(START_PREFIX, quiz_number)
+
+
+def encode_answer(token, question_index, option_index):
+    return encode(ANSWER_PREFIX, token, question_index, option_index)
+
+
+def decode_answer(payload):
+    """(رمز الجلسة، رقم السؤال، رقم الخيار)، أو None إن كانت البيانات تالفة"""
+    return unpack_exact(payload, 3)
+
+
+class QuizSession:
+    __slots__ = ("quiz_id", "token", "index", "correct", "wrong", "expires")
+
+    def __init__(self, quiz_id, ttl):
+        self.quiz_id = quiz_id
+        # رمز قصير يميز أزرار هذه الجلسة عن أزرار اختبار سابق
+        self.token = secrets.randbits(24)
+        self.index = 0
+        self.correct = 0
+        self.wrong = 0
+        self.expires = time.monotonic() + ttl
+
+
+class QuizEngine:
+    """جلسات الاختبار تبقى في الذاكرة (مع انتهاء صلاحية)، والنتيجة تُحفظ مرة واحدة عند انتهاء الاختبار"""
+
+    def __init__(self, user_manager, content_manager, ttl=None):
+        self.user_manager = user_manager
+        self.content_manager = content_manager
+        self.ttl = ttl or config.QUIZ_SESSION_TTL
+        self.sessions = OrderedDict()
+
+    def _expire(self):
+        # الجلسات مرتبة حسب آخر استخدام فيكفي فحص البداية
+        now = time.monotonic()
+        while self.sessions:
+            user_id, session = next(iter(self.sessions.items()))
+            if session.expires > now:
+                break
+            del self.sessions[user_id]
+
+    def _touch(self, user_id, session):
+        session.expires = time.monotonic() + self.ttl
+        self.sessions[user_id] = session
+        self.sessions.move_to_end(user_id)
+
+    def start(self, user_id, quiz_number):
+        """بدء الاختبار رقم quiz_number (ترتيبه في content_manager.quiz_ids)؛ None إن لم يوجد"""
+        self._expire()
+        quiz_id = self.content_manager.quiz_id_at(quiz_number)
+        quiz = self.content_manager.get_quiz(quiz_id) if quiz_id is not None else None
+        if not quiz or not quiz.get("questions"):
+            return None
+        session = QuizSession(quiz_id, self.ttl)
+        self._touch(str(user_id), session)
+        return session
+
+    def current_question(self, session):
+        quiz = self.content_manager.get_quiz(session.quiz_id)
+        if not quiz or session.index >= len(quiz["questions"]):
+            return None
+        return quiz["questions"][session.index]
+
+    def answer(self, user_id, token, question_index, option_index):
+        """معالجة إجابة؛ يعيد (الجلسة، صحيحة؟، انتهى؟) أو None إن كانت الأزرار قديمة"""
+        self._expire()
+        user_id = str(user_id)
+        session = self.sessions.get(user_id)
+        if session is None or session.token != token or session.index != question_index:
+            return None
+
+        question = self.current_question(session)
+        if question is None:
+            return None
+        correct = option_index == question.get("answer_index")
+        if correct:
+            session.correct += 1
+        else:
+            session.wrong += 1
+        session.index += 1
+        self._touch(user_id, session)
+
+        finished = self.current_question(session) is None
+        if finished:
+            del self.sessions[user_id]
+        return session, correct, finished
+
+    def commit(self, user_id, session):
+        """حفظ النتيجة النهائية في عملية كتابة واحدة؛ يُشغَّل على خيط التخزين"""
+        xp = session.correct * config.QUIZ_XP_PER_CORRECT
+        self.user_manager.record_quiz_result(user_id, session.quiz_id, session.correct, session.wrong, xp)
+        return xp
@@ -0,0 +1,82 @@
+import base64
+import logging
+
+logger = logging.getLogger(__name__)
+
+# حد تيليجرام لطول callback_data
+MAX_CALLBACK_BYTES = 64
+SEPARATOR = "_"
+
+
+def pack(*numbers):
+    """ضغط أعداد صحيحة غير سالبة (varint) في نص base64 آمن للروابط بدون حشو"""
+    raw = bytearray()
+    for n in numbers:
+        while n >= 0x80:
+            raw.append(n & 0x7F | 0x80)
+            n >>= 7
+        raw.append(n)
+    return base64.urlsafe_b64encode(bytes(raw)).rstrip(b"=").decode("ascii")
+
+
+def unpack(payload):
+    raw = base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4))
+    numbers = []
+    n = shift = 0
+    for byte in raw:
+        n |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            numbers.append(n)
+            n = shift = 0
+    return numbers
+
+
+def unpack_exact(payload, count):
+    """count عدداً من callback_data، أو None إن كانت تالفة (زر مزور أو من نسخة قديمة)"""
+    try:
+        numbers = unpack(payload)
+    except ValueError:
+        return None
+    return numbers if len(numbers) == count else None
+
+
+def encode(prefix, *numbers):
+    """callback_data بالشكل <prefix>_<أعداد مضغوطة>، مثلاً القسم ورقم العنصر والصفحة"""
+    data = f"{prefix}{SEPARATOR}{pack(*numbers)}"
+    if len(data.encode()) > MAX_CALLBACK_BYTES:
+        raise ValueError(f"callback_data too long: {data!r}")
+    return data
+
+
+class CallbackRouter:
+    """توجيه الأزرار عبر جدول: البادئة (ما قبل أول "_") تُبحث في قاموس مرة واحدة.
+
+    المعالجات تُسجل بالمزخرف route وتستقبل (query, context, payload) حيث payload ما بعد البادئة.
+    """
+
+    def __init__(self):
+        self.routes = {}
+
+    def route(self, prefix):
+        if SEPARATOR in prefix:
+            raise ValueError(f"prefix must not contain {SEPARATOR!r}: {prefix!r}")
+
+        def register(handler):
+            if prefix in self.routes:
+                raise ValueError(f"duplicate route: {prefix!r}")
+            self.routes[prefix] = handler
+            return handler
+        return register
+
+    def resolve(self, data):
+        prefix, _, payload = data.partition(SEPARATOR)
+        return self.routes.get(prefix), payload
+
+    async def dispatch(self, query, context):
+        handler, payload = self.resolve(query.data)
+        if handler is None:
+            logger.warning("No route for callback data %r", query.data)
+            return None
+        return await handler(query, context, payload)
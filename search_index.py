@@ -0,0 +1,136 @@
+import heapq
+import math
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+# أنواع المحتوى التي يشملها البحث
+SEARCHABLE_TYPES = ("lessons", "vocabulary", "phrases", "grammar_rules", "dialogues", "quizzes")
+
+CJK_RANGES = "㐀-䶿一-鿿豈-﫿"
+TOKEN_RE = re.compile(f"[{CJK_RANGES}]+|[^\\W_{CJK_RANGES}]+")
+CJK_RE = re.compile(f"^[{CJK_RANGES}]+$")
+NUMBERED_PINYIN_RE = re.compile(r"^(?:[a-zü]+[1-5])+$")
+NUMBERED_SYLLABLE_RE = re.compile(r"([a-zü]+)[1-5]")
+
+# توحيد الحروف العربية التي لا يغطيها تفكيك NFD
+ARABIC_FOLD = str.maketrans({"ى": "ي", "ة": "ه", "ٱ": "ا", "\u0640": None})
+
+
+def fold(text):
+    """إزالة علامات النغمات من البينيين والتشكيل والهمزات من العربية"""
+    decomposed = unicodedata.normalize("NFD", text)
+    stripped = "".join(ch for ch in decomposed if unicodedata.category(ch) != "Mn")
+    return unicodedata.normalize("NFC", stripped).translate(ARABIC_FOLD)
+
+
+def _term_variants(token):
+    """الصيغ المفهرسة لكلمة واحدة: الكلمة الأصلية (إن كانت بينيين بنغمات) والصيغة الموحدة"""
+    if CJK_RE.match(token):
+        # مقاطع أحادية وثنائية للحروف الصينية
+        grams = list(token)
+        grams.extend(token[i:i + 2] for i in range(len(token) - 1))
+        return grams
+    if NUMBERED_PINYIN_RE.match(token):
+        return NUMBERED_SYLLABLE_RE.findall(token)
+    folded = fold(token)
+    if folded != token and folded.isascii():
+        return [token, folded]
+    return [folded]
+
+
+def tokenize(text):
+    terms = []
+    for token in TOKEN_RE.findall(unicodedata.normalize("NFC", text).lower()):
+        terms.extend(_term_variants(token))
+    return terms
+
+
+def query_terms(text):
+    """كلمات الاستعلام: البينيين بنغمات يطابق الصيغة المنغمة فقط، وبدونها يطابق الجميع"""
+    terms = []
+    for token in TOKEN_RE.findall(unicodedata.normalize("NFC", text).lower()):
+        variants = _term_variants(token)
+        if CJK_RE.match(token) or NUMBERED_PINYIN_RE.match(token):
+            terms.extend(variants)
+        else:
+            terms.append(variants[0])
+    return terms
+
+
+def _item_text(item_id, item):
+    """جمع كل النصوص داخل العنصر (كما كان يفعل البحث القديم عبر json.dumps)"""
+    parts = [str(item_id)]
+    stack = [item]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, str):
+            parts.append(value)
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+    return " ".join(parts)
+
+
+class SearchIndex:
+    """فهرس معكوس مع ترتيب BM25، يُبنى مرة عند التحميل ويُحدَّث مع كل إضافة"""
+
+    K1 = 1.5
+    B = 0.75
+
+    def __init__(self):
+        self.postings = defaultdict(dict)  # term -> {(type, id): tf}
+        self.doc_terms = {}  # (type, id) -> Counter
+        self.doc_lengths = {}
+        self.total_length = 0
+
+    def build(self, content):
+        for content_type in SEARCHABLE_TYPES:
+            for item_id, item in content.get(content_type, {}).items():
+                self.add(content_type, item_id, item)
+
+    def add(self, content_type, item_id, item):
+        key = (content_type, item_id)
+        self.remove(content_type, item_id)
+        counts = Counter(tokenize(_item_text(item_id, item)))
+        self.doc_terms[key] = counts
+        self.doc_lengths[key] = sum(counts.values())
+        self.total_length += self.doc_lengths[key]
+        for term, tf in counts.items():
+            self.postings[term][key] = tf
+
+    def remove(self, content_type, item_id):
+        key = (content_type, item_id)
+        counts = self.doc_terms.pop(key, None)
+        if counts is None:
+            return
+        self.total_length -= self.doc_lengths.pop(key)
+        for term in counts:
+            docs = self.postings[term]
+            docs.pop(key, None)
+            if not docs:
+                del self.postings[term]
+
+    def search(self, query, content_type=None, limit=10, offset=0):
+        """إرجاع (عدد النتائج، [(المفتاح، الدرجة)...]) للصفحة المطلوبة مرتبة حسب BM25"""
+        n_docs = len(self.doc_terms)
+        if not n_docs:
+            return 0, []
+        avg_length = self.total_length / n_docs
+
+        scores = defaultdict(float)
+        for term in set(query_terms(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for key, tf in docs.items():
+                if content_type and key[0] != content_type:
+                    continue
+                length = self.doc_lengths[key]
+                norm = tf * (self.K1 + 1) / (tf + self.K1 * (1 - self.B + self.B * length / avg_length))
+                scores[key] += idf * norm
+
+        top = heapq.nlargest(offset + limit, scores.items(), key=lambda kv: kv[1])
+        return len(scores), top[offset:]
@@ -0,0 +1,633 @@
+import copy
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+
+import config
+
+# الأقسام العامة التي تُخزن كصف واحد لكل منها
+META_KEYS = ("admins", "analytics", "system")
+
+
+def atomic_write(path, text):
+    # الكتابة في ملف مؤقت ثم استبداله: القارئ (أو الإقلاع بعد انهيار) يرى النسخة القديمة أو الجديدة كاملة فقط
+    # اسم مؤقت لكل عملية وخيط: عدة عمليات (webhook.py) قد تكتب الملف نفسه في الوقت نفسه
+    tmp = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    if isinstance(text, bytes):
+        f = open(tmp, 'wb')
+    else:
+        f = open(tmp, 'w', encoding='utf-8')
+    with f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    _fsync_dir(path)
+
+
+def _fsync_dir(path):
+    # تثبيت إعادة التسمية نفسها على القرص (غير مدعوم على Windows)
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+# أسماء الملفات داخل مجلد النسخة الاحتياطية (ثابتة مهما كانت المسارات الأصلية)
+BACKUP_DATA_NAME = "data.json"
+BACKUP_NOTIFICATIONS_NAME = "notifications.json"
+
+
+def _backup_name():
+    return datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+
+
+def _prune_backups(directory, keep):
+    """حذف النسخ الأقدم والإبقاء على آخر keep نسخة (الأسماء مرتبة زمنياً)"""
+    names = sorted(name for name in os.listdir(directory) if not name.endswith(".tmp"))
+    for name in names[:-keep] if keep else ():
+        path = os.path.join(directory, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+
+
+def _encode(obj):
+    # سجلات المستخدمين (UserRecord) تُحوّل إلى شكلها المحفوظ أثناء التسلسل
+    to_dict = getattr(obj, "to_dict", None)
+    if to_dict is None:
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    return to_dict()
+
+
+def _detach(value):
+    # سجل المستخدم بشكله المحفوظ، وباقي القيم نسخة عميقة: لا تتأثر بتعديلات تحدث بعد ترك الأقفال
+    to_dict = getattr(value, "to_dict", None)
+    if to_dict is not None:
+        return to_dict()
+    return copy.deepcopy(value)
+
+
+def capture(data, changes):
+    """نسخة مستقلة من الصفوف المعدلة فقط (تُؤخذ تحت الأقفال)؛ snapshot يسلسلها بعد تركها.
+
+    للنسخة شكل data نفسه، وما ليس فيها يُعامل كصف محذوف كما في data.
+    """
+    if ("all",) in changes:
+        return {
+            key: {user_id: _detach(record) for user_id, record in value.items()} if key == "users" else _detach(value)
+            for key, value in data.items()
+        }
+    view = {"users": {}, "notifications": {}, "decks": {}, "leaderboard": {}}
+    for change in changes:
+        kind = change[0]
+        if kind == "meta":
+            if change[1] in data:
+                view[change[1]] = _detach(data[change[1]])
+        elif kind == "leaderboard" and len(change) == 2:
+            view["leaderboard"][change[1]] = _detach(data["leaderboard"].get(change[1], {}))
+        elif kind == "leaderboard":
+            row = data["leaderboard"].get(change[1], {}).get(change[2])
+            if row is not None:
+                view["leaderboard"].setdefault(change[1], {})[change[2]] = _detach(row)
+        else:
+            value = data[kind].get(change[1])
+            if value is not None:
+                view[kind][change[1]] = _detach(value)
+    return view
+
+
+class JSONStorage:
+    """تخزين البيانات في ملفات JSON (مناسب للتثبيتات الصغيرة): لقطة كاملة + سجل تعديلات.
+
+        data.json / notifications.json  آخر لقطة مضغوطة (كتابة ذرية)
+        data.json.journal               سطر JSON لكل عملية حفظ بالصفوف المعدلة فيها، يُعاد تطبيقه عند التحميل
+    الحفظ العادي يضيف سطراً واحداً إلى السجل (fsync واحد)، وعندما يكبر السجل مقارنة باللقطة تُعاد
+    كتابة اللقطة ويُحذف السجل. سطر أخير ناقص بعد انهيار يُتجاهل، فكل عملية حفظ تُطبق كاملة أو لا تُطبق.
+    """
+
+    def __init__(self, path=None, notifications_path=None, journal_path=None, compact_min=None):
+        self.path = path or config.DATA_FILE
+        self.notifications_path = notifications_path or config.NOTIFICATIONS_FILE
+        self.journal_path = journal_path or f"{self.path}.journal"
+        self.compact_min = compact_min or config.JOURNAL_COMPACT_MIN
+        self._journal_size = 0
+        self._snapshot_size = 0
+        # النسخة الاحتياطية الحالية: [المجلد، بصمة اللقطة المنسوخة، ما نُسخ من السجل بالبايت]
+        self._backup_base = None
+
+    @staticmethod
+    def _read_json(path):
+        try:
+            with open(path, 'rb') as f:
+                return json.loads(f.read())
+        except FileNotFoundError:
+            return None
+
+    def load(self):
+        data = self._read_json(self.path)
+        self._snapshot_size = os.path.getsize(self.path) if data is not None else 0
+        entries = self._read_journal()
+        if data is None and not entries:
+            return None
+        data = data or {}
+        # الملفات القديمة تحتوي الإشعارات داخل data.json، والملف المنفصل له الأولوية
+        notifications = data.setdefault("notifications", {})
+        notifications.update(self._read_json(self.notifications_path) or {})
+        for batch in entries:
+            for entry in batch:
+                _apply_entry(data, entry)
+        return data
+
+    def _read_journal(self):
+        try:
+            with open(self.journal_path, 'rb') as f:
+                raw = f.read()
+        except FileNotFoundError:
+            self._journal_size = 0
+            return []
+        entries = []
+        valid = 0
+        for line in raw.splitlines(keepends=True):
+            try:
+                if not line.endswith(b"\n"):
+                    raise ValueError("incomplete line")
+                entries.append(json.loads(line))
+            except ValueError:
+                # سطر أخير ناقص بعد توقف مفاجئ: يُقص حتى لا تُلحق به الأسطر التالية
+                with open(self.journal_path, 'r+b') as f:
+                    f.truncate(valid)
+                break
+            valid += len(line)
+        self._journal_size = valid
+        return entries
+
+    def snapshot(self, data, changes):
+        # بدون indent يستخدم json المرمّز المكتوب بلغة C فيتم التسلسل دفعة واحدة
+        if not changes:
+            return None
+        if ("all",) in changes:
+            return self._snapshot_payload(data)
+        entries = [_journal_entry(data, change) for change in changes]
+        return "journal", (json.dumps(entries, ensure_ascii=False, default=_encode) + "\n").encode()
+
+    @staticmethod
+    def _snapshot_payload(data):
+        main = json.dumps({k: v for k, v in data.items() if k != "notifications"}, ensure_ascii=False, default=_encode)
+        notifications = json.dumps(data.get("notifications", {}), ensure_ascii=False)
+        return "snapshot", main, notifications
+
+    def commit(self, payload):
+        if payload is None:
+            return
+        if payload[0] == "journal":
+            line = payload[1]
+            with open(self.journal_path, 'ab') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self._journal_size += len(line)
+            if self._journal_size >= max(self.compact_min, self._snapshot_size):
+                # اللقطة الجديدة تُبنى من الملفات (اللقطة + السجل) لا من الذاكرة، فلا تحتاج أقفال المستخدمين
+                self.commit(self._snapshot_payload(self.load()))
+            return
+        _, main, notifications = payload
+        atomic_write(self.notifications_path, notifications)
+        atomic_write(self.path, main)
+        # اللقطة تحتوي كل ما في السجل؛ إن توقفت العملية قبل الحذف فإعادة تطبيقه لا تغير شيئاً
+        try:
+            os.remove(self.journal_path)
+        except FileNotFoundError:
+            pass
+        self._journal_size = 0
+        self._snapshot_size = len(main.encode())
+
+    def write(self, data, changes):
+        self.commit(self.snapshot(data, changes))
+
+    def write_all(self, data):
+        self.write(data, {("all",)})
+
+    def _snapshot_stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def backup(self, directory=None, keep=None):
+        """نسخة احتياطية تزايدية؛ يُستدعى بين عمليات الحفظ (لا أثناء commit).
+
+        اللقطة تُنسخ إلى مجلد جديد مرة واحدة بعد كل إعادة كتابة لها، وبعدها يُضاف إلى نسخة السجل
+        ما أُضيف إلى السجل منذ آخر نسخة فقط. المجلد لقطة + سجل بالشكل نفسه، ويُستعاد بـ
+        restore_json_backup. يعيد (المجلد، عدد البايتات المنسوخة).
+        """
+        directory = directory or config.BACKUP_DIR
+        os.makedirs(directory, exist_ok=True)
+        stamp = self._snapshot_stamp()
+        copied = 0
+        base = self._backup_base
+        if base is None or base[1] != stamp or not os.path.isdir(base[0]):
+            base = [os.path.join(directory, _backup_name()), stamp, 0]
+            os.makedirs(base[0])
+            for source, name in ((self.path, BACKUP_DATA_NAME), (self.notifications_path, BACKUP_NOTIFICATIONS_NAME)):
+                if os.path.exists(source):
+                    with open(source, 'rb') as f:
+                        content = f.read()
+                    atomic_write(os.path.join(base[0], name), content)
+                    copied += len(content)
+            self._backup_base = base
+            _prune_backups(directory, keep or config.BACKUP_KEEP)
+
+        if self._journal_size > base[2]:
+            with open(self.journal_path, 'rb') as f:
+                f.seek(base[2])
+                tail = f.read(self._journal_size - base[2])
+            with open(os.path.join(base[0], f"{BACKUP_DATA_NAME}.journal"), 'ab') as f:
+                f.write(tail)
+                f.flush()
+                os.fsync(f.fileno())
+            base[2] += len(tail)
+            copied += len(tail)
+        return base[0], copied
+
+    def close(self):
+        pass
+
+
+def _journal_entry(data, change):
+    """صف معدل بشكل قابل لإعادة التطبيق: [النوع، المفتاح...، القيمة أو null للحذف]"""
+    kind = change[0]
+    if kind == "meta":
+        return ["meta", change[1], data.get(change[1])]
+    if kind == "leaderboard" and len(change) == 2:
+        return ["leaderboard", change[1], data["leaderboard"].get(change[1], {})]
+    if kind == "leaderboard":
+        return ["leaderboard", change[1], change[2], data["leaderboard"].get(change[1], {}).get(change[2])]
+    return [kind, change[1], data[kind].get(change[1])]
+
+
+def _apply_entry(data, entry):
+    kind = entry[0]
+    if kind == "meta":
+        data[entry[1]] = entry[2]
+        return
+    if kind == "leaderboard" and len(entry) == 3:
+        data.setdefault("leaderboard", {})[entry[1]] = entry[2]
+        return
+    if kind == "leaderboard":
+        table = data.setdefault("leaderboard", {}).setdefault(entry[1], {})
+    else:
+        table = data.setdefault(kind, {})
+    key, value = entry[-2], entry[-1]
+    if value is None:
+        table.pop(key, None)
+    else:
+        table[key] = value
+
+
+class SQLiteStorage:
+    """تخزين كل مستخدم وصف لوحة متصدرين وإشعارات وإحصائيات كصفوف منفصلة (وضع WAL).
+
+    shard=(رقم، عدد): عدة عمليات تتشارك الملف نفسه، كل منها تحمّل وتكتب صفوف المستخدمين الذين
+    user_id % عدد == رقم فقط، وإحصائياتها في صفوف meta باسم "المفتاح:رقم". المشرفون مشتركون:
+    صفهم يُعدّل فقط عبر update_admins (قراءة وكتابة في معاملة واحدة)، والحفظ العادي لا يكتبه إلا إن لم يوجد.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            user_id TEXT PRIMARY KEY,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS leaderboard (
+            timeframe TEXT NOT NULL,
+            user_id TEXT NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (timeframe, user_id)
+        );
+        CREATE INDEX IF NOT EXISTS leaderboard_xp ON leaderboard (timeframe, json_extract(data, '$.xp') DESC);
+        CREATE TABLE IF NOT EXISTS notifications (
+            user_id TEXT PRIMARY KEY,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS decks (
+            user_id TEXT PRIMARY KEY,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            data TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, path=None, shard=None):
+        self.path = path or config.DB_FILE
+        self.shard = shard
+        self.lock = threading.Lock()
+        # timeout: انتظار قفل الكتابة عندما تكتب عملية أخرى في الملف نفسه
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+        if shard:
+            count = shard[1]
+            self.conn.create_function("shard_of", 1, lambda user_id: int(user_id) % count, deterministic=True)
+        # شرط الصفوف المملوكة لهذه العملية (فارغ بدون تقسيم)
+        self._own = " AND shard_of(user_id) = ?" if shard else ""
+        self._own_params = (shard[0],) if shard else ()
+        # اتصال قراءة منفصل: في وضع WAL لا ينتظر القارئ كتابة جارية على الاتصال الرئيسي
+        self._reader = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._reader_lock = threading.Lock()
+
+    def _meta_key(self, key):
+        if not self.shard or key == "admins":
+            return key
+        return f"{key}:{self.shard[0]}"
+
+    def load(self):
+        with self.lock:
+            meta = dict(self.conn.execute("SELECT key, data FROM meta").fetchall())
+            if not meta:
+                return None
+
+            data = {}
+            for key in META_KEYS:
+                value = meta.get(self._meta_key(key))
+                if value is None and self.shard and (key != "analytics" or self.shard[0] == 0):
+                    # أول تشغيل بعدة عمليات: الإحصائيات (عدادات تُجمع بين العمليات) ترثها العملية 0 وحدها،
+                    # وحالة النظام (نوافذ لوحة المتصدرين) ترثها كل العمليات
+                    value = meta.get(key)
+                if value is not None:
+                    data[key] = json.loads(value)
+            data["users"] = {
+                user_id: json.loads(value)
+                for user_id, value in self.conn.execute(f"SELECT user_id, data FROM users WHERE 1{self._own}", self._own_params)
+            }
+            data["leaderboard"] = {"daily": {}, "weekly": {}, "monthly": {}, "all_time": {}}
+            for timeframe, user_id, value in self.conn.execute(
+                f"SELECT timeframe, user_id, data FROM leaderboard WHERE 1{self._own}", self._own_params
+            ):
+                data["leaderboard"].setdefault(timeframe, {})[user_id] = json.loads(value)
+            data["notifications"] = {
+                user_id: json.loads(value)
+                for user_id, value in self.conn.execute(
+                    f"SELECT user_id, data FROM notifications WHERE 1{self._own}", self._own_params
+                )
+            }
+            data["decks"] = {
+                user_id: json.loads(value)
+                for user_id, value in self.conn.execute(f"SELECT user_id, data FROM decks WHERE 1{self._own}", self._own_params)
+            }
+            return data
+
+    def load_admins(self):
+        """قائمة المشرفين المحفوظة الآن (كما عدلتها أي عملية)، أو None إن لم تُحفظ بعد"""
+        with self._reader_lock:
+            row = self._reader.execute("SELECT data FROM meta WHERE key = 'admins'").fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update_admins(self, add=(), remove=(), default=()):
+        """إضافة/حذف مشرفين على الصف المحفوظ: BEGIN IMMEDIATE يمنع كتابة أخرى بين القراءة والكتابة،
+        فلا يضيع تعديل عملية أخرى. default: القائمة إن لم يوجد الصف. يعيد (القائمة قبل، القائمة بعد)"""
+        add, remove = set(add), set(remove)
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute("SELECT data FROM meta WHERE key = 'admins'").fetchone()
+                before = json.loads(row[0]) if row else list(default)
+                current = set(before)
+                after = [admin for admin in before if admin not in remove]
+                after.extend(sorted(add - current - remove))
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, data) VALUES ('admins', ?)", (json.dumps(after),)
+                )
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        return before, after
+
+    def shard_meta(self, key):
+        """قيمة صف meta لكل عملية أخرى {رقم: القيمة} كما كتبتها في آخر حفظ لها"""
+        if not self.shard:
+            return {}
+        with self.lock:
+            rows = self.conn.execute("SELECT key, data FROM meta WHERE key LIKE ?", (f"{key}:%",)).fetchall()
+        result = {}
+        for name, value in rows:
+            index = int(name.rpartition(":")[2])
+            if index != self.shard[0]:
+                result[index] = json.loads(value)
+        return result
+
+    def leaderboard_top(self, timeframe, limit, shards):
+        """أفضل limit صف في الإطار من العمليات المذكورة: [(المعرف، الصف، اسم المستخدم، الاسم الأول)]"""
+        if not shards:
+            return []
+        marks = ",".join("?" * len(shards))
+        with self.lock:
+            rows = self.conn.execute(
+                f"""SELECT l.user_id, l.data, json_extract(u.data, '$.info.username'), json_extract(u.data, '$.info.first_name')
+                    FROM leaderboard l JOIN users u ON u.user_id = l.user_id
+                    WHERE l.timeframe = ? AND shard_of(l.user_id) IN ({marks})
+                    ORDER BY json_extract(l.data, '$.xp') DESC LIMIT ?""",
+                (timeframe, *shards, limit)
+            ).fetchall()
+        return [(user_id, json.loads(row), username, first_name) for user_id, row, username, first_name in rows]
+
+    def leaderboard_count_above(self, timeframe, xp, shards):
+        """عدد مستخدمي العمليات المذكورة بنقاط أعلى من xp في الإطار (لحساب الترتيب العام)"""
+        if not shards:
+            return 0
+        marks = ",".join("?" * len(shards))
+        with self.lock:
+            return self.conn.execute(
+                f"""SELECT COUNT(*) FROM leaderboard
+                    WHERE timeframe = ? AND json_extract(data, '$.xp') > ? AND shard_of(user_id) IN ({marks})""",
+                (timeframe, xp, *shards)
+            ).fetchone()[0]
+
+    def snapshot(self, data, changes):
+        """تحويل الصفوف المعدلة إلى أوامر SQL جاهزة، دون أي عمليات على القرص"""
+        if not changes:
+            return []
+        if ("all",) in changes:
+            return self._snapshot_all(data)
+
+        statements = []
+        for change in changes:
+            statements.extend(self._statements(data, change))
+        return statements
+
+    def commit(self, statements):
+        if not statements:
+            return
+        with self.lock, self.conn:
+            for sql, params in statements:
+                self.conn.execute(sql, params)
+
+    def write(self, data, changes):
+        self.commit(self.snapshot(data, changes))
+
+    def write_all(self, data):
+        self.commit(self._snapshot_all(data))
+
+    def _snapshot_all(self, data):
+        statements = [
+            (f"DELETE FROM users WHERE 1{self._own}", self._own_params),
+            (f"DELETE FROM leaderboard WHERE 1{self._own}", self._own_params),
+            (f"DELETE FROM notifications WHERE 1{self._own}", self._own_params),
+            (f"DELETE FROM decks WHERE 1{self._own}", self._own_params),
+        ]
+        for user_id in list(data.get("users", {})):
+            statements.extend(self._statements(data, ("users", user_id)))
+        for timeframe in list(data.get("leaderboard", {})):
+            statements.extend(self._statements(data, ("leaderboard", timeframe)))
+        for user_id in list(data.get("notifications", {})):
+            statements.extend(self._statements(data, ("notifications", user_id)))
+        for user_id in list(data.get("decks", {})):
+            statements.extend(self._statements(data, ("decks", user_id)))
+        for key in META_KEYS:
+            statements.extend(self._statements(data, ("meta", key)))
+        return statements
+
+    def _statements(self, data, change):
+        kind = change[0]
+        if kind == "users":
+            return [self._upsert("users", "user_id", change[1], data["users"].get(change[1]))]
+        if kind == "notifications":
+            return [self._upsert("notifications", "user_id", change[1], data["notifications"].get(change[1]))]
+        if kind == "decks":
+            return [self._upsert("decks", "user_id", change[1], data["decks"].get(change[1]))]
+        if kind == "meta" and change[1] == "admins":
+            # نسخة هذه العملية قد تكون قديمة: لا تُكتب فوق ما عدلته عملية أخرى
+            return [(
+                "INSERT OR IGNORE INTO meta (key, data) VALUES ('admins', ?)",
+                (json.dumps(data.get("admins", [])),)
+            )]
+        if kind == "meta":
+            return [self._upsert("meta", "key", self._meta_key(change[1]), data.get(change[1]))]
+        if kind == "leaderboard" and len(change) == 2:
+            # استبدال إطار زمني كامل (مثلاً عند بداية يوم أو أسبوع جديد)
+            timeframe = change[1]
+            rows = list(data["leaderboard"].get(timeframe, {}).items())
+            return [(f"DELETE FROM leaderboard WHERE timeframe = ?{self._own}", (timeframe, *self._own_params))] + [
+                (
+                    "INSERT INTO leaderboard (timeframe, user_id, data) VALUES (?, ?, ?)",
+                    (timeframe, user_id, json.dumps(row, ensure_ascii=False))
+                )
+                for user_id, row in rows
+            ]
+        if kind == "leaderboard":
+            timeframe, user_id = change[1], change[2]
+            row = data["leaderboard"].get(timeframe, {}).get(user_id)
+            if row is None:
+                return [("DELETE FROM leaderboard WHERE timeframe = ? AND user_id = ?", (timeframe, user_id))]
+            return [(
+                "INSERT OR REPLACE INTO leaderboard (timeframe, user_id, data) VALUES (?, ?, ?)",
+                (timeframe, user_id, json.dumps(row, ensure_ascii=False))
+            )]
+        return []
+
+    def backup(self, directory=None, keep=None):
+        """نسخة كاملة متسقة بواجهة النسخ الاحتياطي في SQLite (صفحة بصفحة، دون إيقاف الكتابة طويلاً)"""
+        directory = directory or config.BACKUP_DIR
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{_backup_name()}.db")
+        target = sqlite3.connect(path)
+        try:
+            with self.lock:
+                self.conn.backup(target)
+        finally:
+            target.close()
+        _prune_backups(directory, keep or config.BACKUP_KEEP)
+        return path, os.path.getsize(path)
+
+    @staticmethod
+    def _upsert(table, key_column, key, value):
+        if value is None:
+            return (f"DELETE FROM {table} WHERE {key_column} = ?", (key,))
+        return (
+            f"INSERT OR REPLACE INTO {table} ({key_column}, data) VALUES (?, ?)",
+            (key, json.dumps(value, ensure_ascii=False, default=_encode))
+        )
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+        with self._reader_lock:
+            self._reader.close()
+
+
+def get_storage(backend=None):
+    backend = backend or config.STORAGE_BACKEND
+    shard = tuple(int(part) for part in config.STORAGE_SHARD.split("/")) if config.STORAGE_SHARD else None
+    if backend == "sqlite":
+        return SQLiteStorage(shard=shard)
+    if backend == "json":
+        if shard:
+            raise ValueError("STORAGE_SHARD requires STORAGE_BACKEND=sqlite")
+        return JSONStorage()
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+def migrate_json_to_sqlite(json_path=None, db_path=None):
+    """ترحيل لمرة واحدة من data.json إلى قاعدة SQLite"""
+    data = JSONStorage(json_path).load()
+    if data is None:
+        raise FileNotFoundError(json_path or config.DATA_FILE)
+
+    for key in ("users", "notifications", "decks"):
+        data.setdefault(key, {})
+    data.setdefault("leaderboard", {})
+    # توحيد المعرفات كنصوص كما في data.json
+    data["users"] = {str(k): v for k, v in data["users"].items()}
+
+    target = SQLiteStorage(db_path)
+    try:
+        target.write_all(data)
+    finally:
+        target.close()
+    return len(data["users"])
+
+
+def restore_json_backup(backup_dir, json_path=None, notifications_path=None):
+    """استعادة نسخة JSON احتياطية (لقطة + سجل) وكتابتها لقطة كاملة في المسارات الحالية"""
+    source = JSONStorage(
+        os.path.join(backup_dir, BACKUP_DATA_NAME),
+        os.path.join(backup_dir, BACKUP_NOTIFICATIONS_NAME)
+    )
+    data = source.load()
+    if data is None:
+        raise FileNotFoundError(backup_dir)
+    JSONStorage(json_path, notifications_path).write_all(data)
+    return len(data.get("users", {}))
+
+
+if __name__ == '__main__':
+    # الاستخدام: python storage.py migrate [data.json] [data.db]
+    #            python storage.py restore <مجلد النسخة> [data.json] [notifications.json]
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == "migrate":
+        args = sys.argv[2:] + [None, None]
+        count = migrate_json_to_sqlite(args[0], args[1])
+        print(f"Migrated {count} users to SQLite")
+    elif command == "restore" and len(sys.argv) > 2:
+        args = sys.argv[3:] + [None, None]
+        count = restore_json_backup(sys.argv[2], args[0], args[1])
+        print(f"Restored {count} users")
+    else:
+        print("usage: python storage.py migrate [json_path] [db_path]")
+        print("       python storage.py restore <backup_dir> [json_path] [notifications_path]")
+        sys.exit(1)
@@ -0,0 +1,8 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# fake_bot_api وbench_handlers: Bot بدون شبكة وتحديثات اصطناعية
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+os.environ.setdefault("BOT_TOKEN", "123:fake")
@@ -0,0 +1,42 @@
+"""المشرفون: is_admin من الذاكرة فقط، والتحديث من الصف المشترك مهمة دورية على منفذ التخزين."""
+import asyncio
+
+import pytest
+
+from storage import SQLiteStorage
+from user_manager import UserManager
+
+NEW_ADMIN = 12345
+
+
+class FakeJobQueue:
+    def __init__(self):
+        self.jobs = {}
+
+    def run_repeating(self, callback, interval, first, name):
+        self.jobs[name] = callback
+
+
+def test_admin_changes_reach_other_shard_through_refresh_job(tmp_path, monkeypatch):
+    path = str(tmp_path / "data.db")
+    first = UserManager(SQLiteStorage(path, shard=(0, 2)), write_behind=False)
+    second = UserManager(SQLiteStorage(path, shard=(1, 2)), write_behind=False)
+    first.save_data()
+    jobs = FakeJobQueue()
+    second.schedule(jobs)
+
+    assert first.add_admin(NEW_ADMIN)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(second.storage, "load_admins", lambda: pytest.fail("is_admin read from storage"))
+        assert not second.is_admin(NEW_ADMIN)
+
+    asyncio.run(jobs.jobs["admin_refresh"](None))
+    assert second.is_admin(NEW_ADMIN)
+    assert NEW_ADMIN in second.get_admin_ids()
+
+    assert first.remove_admin(NEW_ADMIN)
+    asyncio.run(jobs.jobs["admin_refresh"](None))
+    assert not second.is_admin(NEW_ADMIN)
+    first.close()
+    second.close()
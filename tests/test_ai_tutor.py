@@ -0,0 +1,124 @@
+"""المعلم الذكي: الطلبات المتطابقة المتزامنة تُرسل إلى Groq مرة واحدة، والإجابات تُعاد من الذاكرة المؤقتة."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import ai_tutor
+from ai_tutor import AITutor, TTLCache
+from llm_scheduler import GroqScheduler
+
+ANSWER = ["你好 ", "(nǐ hǎo) ", "تعني ", "مرحباً"]
+
+
+class FakeCompletions:
+    """chat.completions يبث ANSWER جزءاً جزءاً، أو يرفع error"""
+
+    def __init__(self, delay=0.01, error=None):
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+
+        async def chunks():
+            for piece in ANSWER:
+                await asyncio.sleep(self.delay)
+                if self.error is not None:
+                    raise self.error
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+        return chunks()
+
+
+def make_tutor(completions, **kwargs):
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return AITutor(client=client, model="test", scheduler=GroqScheduler(), **kwargs)
+
+
+def test_identical_requests_coalesce_then_hit_cache():
+    completions = FakeCompletions()
+
+    async def main():
+        tutor = make_tutor(completions)
+        prompts = ["ما معنى 你好", "  ما معنى   你好 ", "ما معنى 你好\n"] * 10
+        answers = await asyncio.gather(*(tutor.ask("explain", prompt, user_id=i) for i, prompt in enumerate(prompts)))
+        cached = await tutor.ask("explain", "ما معنى 你好")
+        other_task = await tutor.ask("translate", "ما معنى 你好")
+        await tutor.scheduler.close()
+        return tutor, answers, cached, other_task
+
+    tutor, answers, cached, other_task = asyncio.run(main())
+    assert set(answers) == {"".join(ANSWER)} and cached == "".join(ANSWER)
+    assert other_task == "".join(ANSWER)
+    # الطلب الأول والمهمة الأخرى فقط وصلا إلى Groq
+    assert completions.calls == 2
+    assert tutor.stats == {"upstream": 2, "coalesced": 29, "errors": 0}
+    assert tutor.cache.hits == 1 and not tutor._inflight
+
+
+def test_failed_request_reaches_every_follower_and_is_not_cached():
+    completions = FakeCompletions(error=RuntimeError("upstream down"))
+
+    async def main():
+        tutor = make_tutor(completions)
+        results = await asyncio.gather(*(tutor.ask("explain", "你好") for _ in range(5)), return_exceptions=True)
+        completions.error = None
+        retry = await tutor.ask("explain", "你好")
+        await tutor.scheduler.close()
+        return tutor, results, retry
+
+    tutor, results, retry = asyncio.run(main())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert tutor.stats["errors"] == 1 and completions.calls == 2
+    assert retry == "".join(ANSWER)
+
+
+class FakeSent:
+    def __init__(self):
+        self.texts = []
+
+    async def edit_text(self, text):
+        self.texts.append(text)
+
+
+class FakeMessage:
+    def __init__(self):
+        self.sent = FakeSent()
+
+    async def reply_text(self, text):
+        return self.sent
+
+
+def test_reply_streams_with_throttled_edits():
+    async def main():
+        tutor = make_tutor(FakeCompletions(), edit_interval=1000)
+        message = FakeMessage()
+        answer = await tutor.reply(message, "explain", "你好")
+        await tutor.scheduler.close()
+        return answer, message.sent.texts
+
+    answer, texts = asyncio.run(main())
+    # أول جزء فوراً، ثم لا تعديل قبل edit_interval، ثم الإجابة كاملة
+    assert answer == "".join(ANSWER)
+    assert texts == [ANSWER[0], answer]
+
+
+def test_ttl_cache_expires_and_evicts_lru(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(ai_tutor.time, "monotonic", lambda: now[0])
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1 and len(cache) == 2
+    now[0] += 11
+    assert cache.get("a") is None and cache.get("c") is None
+    assert len(cache) == 0 and (cache.hits, cache.misses) == (2, 3)
+
+
+@pytest.mark.parametrize("text", ["你好", "Hello  World", "ＡＢＣ"])
+def test_normalized_prompts_share_a_key(text):
+    tutor = make_tutor(FakeCompletions())
+    assert tutor.cache_key("explain", text) == tutor.cache_key("explain", f"  {text.upper()}\t")
@@ -0,0 +1,89 @@
+"""الإحصائيات: خطأ HyperLogLog ضمن حدوده، ودمج الأيام والعمليات، والاستعلامات لا تكتب شيئاً."""
+import copy
+import json
+from datetime import date, timedelta
+
+from analytics import Analytics, HyperLogLog, merge_shards
+from storage import JSONStorage
+from user_manager import UserManager
+
+PRECISION = 10
+# الخطأ المعياري 1.04/√1024 ≈ 3.25%؛ أربعة أضعافه
+MAX_ERROR = 4 * 1.04 / (1 << PRECISION) ** 0.5
+DAY = date(2026, 3, 1)
+
+
+def day(offset):
+    return (DAY + timedelta(days=offset)).isoformat()
+
+
+def test_hll_estimate_within_error_bounds():
+    for n in (10, 100, 1000, 10000, 100000):
+        hll = HyperLogLog(PRECISION)
+        for i in range(n):
+            hll.add(f"user{i}")
+        assert abs(hll.count() - n) <= max(1, MAX_ERROR * n), n
+        # التكرار لا يغير شيئاً
+        assert not any(hll.add(f"user{i}") for i in range(0, n, 7))
+        assert HyperLogLog.decode(hll.encode(), PRECISION).registers == hll.registers
+
+
+def test_hll_merge_is_union():
+    a, b = HyperLogLog(PRECISION), HyperLogLog(PRECISION)
+    for i in range(6000):
+        a.add(i)
+    for i in range(3000, 9000):
+        b.add(i)
+    union = HyperLogLog(PRECISION).merge(a).merge(b)
+    assert abs(union.count() - 9000) <= MAX_ERROR * 9000
+    assert HyperLogLog(PRECISION).merge(union).merge(a).registers == union.registers
+
+
+def test_distinct_active_users_across_days_and_shards():
+    shards = [{"total_users": 0}, {"total_users": 0}]
+    analytics = [Analytics(data) for data in shards]
+    # 2000 مستخدم على عمليتين، كل منهم نشط في أيام مختلفة من الأسبوع
+    for user_id in range(2000):
+        shard = analytics[user_id % 2]
+        shard.data["total_users"] += 1
+        shard.record_new_user(user_id, day(0))
+        for offset in range(1, 7):
+            if (user_id + offset) % 3 == 0:
+                shard.record_active(user_id, day(0), day(offset))
+
+    merged = merge_shards(shards)
+    assert merged.data["total_users"] == 2000
+    assert merged.active_users(1, day(0)) == 2000
+    assert abs(merged.active_users(7, day(6)) - 2000) <= MAX_ERROR * 2000
+    assert abs(merged.active_users(1, day(3)) - 667) <= 1
+    returned = merged.retention(offsets=(1, 3, 7), days=7, day=day(6))
+    assert returned == [{"date": day(0), "size": 2000, "retention": {1: 33.3, 3: 33.4, 7: None}}]
+
+
+def test_queries_never_write(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    users = UserManager(JSONStorage(), write_behind=False)
+    for user_id in range(50):
+        users.register_user(user_id)
+    users.flush()
+    before = json.dumps(users.data["analytics"], sort_keys=True)
+    stamp = users.storage._snapshot_stamp(), users.storage._journal_size
+
+    users.get_analytics_report(days=60)
+    users.get_active_users(30)
+    users.get_user_growth_data(400)
+    users.get_retention(days=120)
+    # يوم لم يُسجل فيه شيء لا يُنشئ له عدادات
+    Analytics(users.data["analytics"]).summary(day="2000-01-01")
+
+    assert json.dumps(users.data["analytics"], sort_keys=True) == before
+    assert not users._dirty and (users.storage._snapshot_stamp(), users.storage._journal_size) == stamp
+    users.close()
+
+
+def test_legacy_growth_migrates_once():
+    data = {"total_users": 3, "user_growth": [{"date": day(0), "new_users": 3, "total_users": 3}], "active_today": [1]}
+    analytics = Analytics(data)
+    assert analytics.migrated and "user_growth" not in data
+    assert analytics.growth(1, day(0)) == [{"date": day(0), "new_users": 3, "active": 0, "total_users": 3}]
+    assert not Analytics(copy.deepcopy(data)).migrated
@@ -0,0 +1,66 @@
+"""فهرس الإكمال التلقائي: البادئات بالهانزي والبينيين (بنغمات وبدونها وبالأرقام) والعربية، والتعديل يحذف المفاتيح القديمة."""
+import random
+
+from autocomplete import MERGE_MIN, AutocompleteIndex
+
+VOCABULARY = {
+    "你好": {"pinyin": "nǐ hǎo", "translation": "مرحباً"},
+    "你们": {"pinyin": "nǐ men", "translation": "أنتم"},
+    "好": {"pinyin": "hǎo", "translation": "جيد، حسن"},
+    "谢谢": {"pinyin": "xiè xie", "translation": "شكراً"},
+    "女儿": {"pinyin": "nǚ'ér", "translation": "ابنة"},
+}
+
+
+def test_prefixes_in_every_script():
+    index = AutocompleteIndex.build(VOCABULARY)
+    assert index.complete("你") == ["你们", "你好"]
+    assert index.complete("你好") == ["你好"]
+    # بينيين بدون نغمات، بمسافة أو بدونها، وبالنغمات كما تُكتب
+    assert index.complete("nihao") == ["你好"]
+    assert index.complete("ni h") == ["你好"]
+    assert index.complete("nǐ") == ["你好", "你们"]
+    # بالأرقام
+    assert index.complete("ni3hao3") == ["你好"]
+    assert index.complete("ni3m") == ["你们"]
+    assert index.complete("nv3") == [] and index.complete("nü3er2") == ["女儿"]
+    # العربية: بداية الترجمة أو أي كلمة فيها، والتشكيل لا يهم
+    assert index.complete("مرح") == ["你好"]
+    assert index.complete("حسن") == ["好"]
+    assert index.complete("شُكر") == ["谢谢"]
+    assert index.complete("  ") == [] and index.complete("zzz") == []
+
+
+def test_changed_item_drops_old_keys():
+    index = AutocompleteIndex.build(VOCABULARY)
+    old = VOCABULARY["好"]
+    index.add("好", {"pinyin": "hǎo", "translation": "ممتاز"}, old)
+    assert index.complete("جيد") == [] and index.complete("حسن") == []
+    assert index.complete("ممت") == ["好"]
+    assert index.complete("hao3") == ["好"]
+    # إعادة إضافة العنصر نفسه لا تكرر مفاتيحه
+    before = list(index.keys)
+    index.add("好", {"pinyin": "hǎo", "translation": "ممتاز"}, {"pinyin": "hǎo", "translation": "ممتاز"})
+    assert index.keys == before
+
+
+def test_updates_match_full_build():
+    rng = random.Random(3)
+    syllables = ["ni", "hao", "xie", "men", "zhong", "guo", "ren", "da"]
+    translations = ["كبير", "بلد", "إنسان", "جيد", "شكر", "صين"]
+
+    def item():
+        return {
+            "pinyin": " ".join(rng.choice(syllables) + "āáǎà"[rng.randrange(4)] for _ in range(2)),
+            "translation": " ".join(rng.sample(translations, 2)),
+        }
+
+    vocabulary = {f"词{i}": item() for i in range(200)}
+    index = AutocompleteIndex.build(vocabulary)
+    # دفعة صغيرة (إدراج) ثم دفعة كبيرة (دمج)، تعدل كلمات موجودة وتضيف جديدة
+    for size in (5, MERGE_MIN):
+        changes = {f"词{rng.randrange(300)}": item() for _ in range(size)}
+        index.update(changes, {word: vocabulary.get(word) for word in changes})
+        vocabulary.update(changes)
+        expected = AutocompleteIndex.build({word: vocabulary[word] for word in index.words})
+        assert (index.keys, index.refs) == (expected.keys, expected.refs)
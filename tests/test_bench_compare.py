@@ -0,0 +1,58 @@
+"""bench_handlers --compare: كل مقياس ساء أكثر من العتبة يُبلّغ عنه ويخرج البرنامج بالرمز 1."""
+import json
+import os
+import subprocess
+import sys
+
+import bench_handlers
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, "benchmarks", "bench_handlers.py")
+
+
+def run(p99_ms=1.0, updates_per_s=100.0, bytes_per_update=500.0, peak_rss_mb=50.0):
+    return {
+        "users": 10, "content": 20, "peak_rss_mb": peak_rss_mb,
+        "scenarios": {"start": {
+            "updates": 5, "p50_ms": 0.5, "p99_ms": p99_ms, "updates_per_s": updates_per_s,
+            "bytes_per_update": bytes_per_update, "api_calls_per_update": 1.0,
+        }},
+    }
+
+
+def save(path, runs):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"backend": "json", "ops": 5, "runs": runs}, f)
+    return str(path)
+
+
+def test_compare_flags_only_regressions_over_threshold(tmp_path):
+    baseline = save(tmp_path / "base.json", [run()])
+    assert bench_handlers.compare([run()], baseline, 0.25) == []
+    # التحسن وتراجع أقل من العتبة لا يُبلّغ عنهما
+    assert bench_handlers.compare([run(p99_ms=0.2, updates_per_s=500, bytes_per_update=600)], baseline, 0.25) == []
+
+    regressions = bench_handlers.compare(
+        [run(p99_ms=1.5, updates_per_s=60, bytes_per_update=900, peak_rss_mb=80)], baseline, 0.25
+    )
+    assert sorted(line.split(":")[0] for line in regressions) == [
+        "10/20 peak_rss_mb", "10/20/start bytes_per_update", "10/20/start p99_ms", "10/20/start updates_per_s"
+    ]
+    assert "10/20/start p99_ms: 1.0 -> 1.5 (+50%)" in regressions
+    # مقاسات أو مقاييس غير موجودة في الملف السابق تُتجاهل
+    other = dict(run(p99_ms=9), users=99)
+    assert bench_handlers.compare([other], baseline, 0.25) == []
+
+
+def test_cli_exits_nonzero_on_regression(tmp_path):
+    # خط أساس أسرع بكثير من أي تشغيل حقيقي
+    baseline = save(tmp_path / "base.json", [run(p99_ms=1e-6)])
+    result = subprocess.run(
+        [sys.executable, SCRIPT, "--users", "10", "--content", "20", "--ops", "5", "--scenarios", "start",
+         "--compare", baseline, "--save", str(tmp_path / "new.json")],
+        cwd=tmp_path, stdout=subprocess.PIPE, text=True
+    )
+    assert result.returncode == 1
+    assert "10/20/start p99_ms" in result.stdout
+    saved = json.loads((tmp_path / "new.json").read_text(encoding="utf-8"))
+    assert saved["runs"][0]["scenarios"]["start"]["updates"] == 5
@@ -0,0 +1,78 @@
+"""callback_data مزورة أو قديمة: المعالج يرد "غير متوفر" بدل رفع استثناء."""
+import asyncio
+import importlib
+import logging
+import random
+import sys
+
+import pytest
+
+import bench_handlers
+from content_browser import HSK_LEVELS, ITEM_PREFIX, PAGE_PREFIX, decode_section, section_code
+from content_manager import BROWSABLE_TYPES
+from fake_bot_api import RecordingRequest
+from quiz_engine import ANSWER_PREFIX, LIST_PREFIX, START_PREFIX
+from router import encode, pack
+
+USERS = 10
+CONTENT = 200
+
+FORGED = [
+    "SEC_HSKx",
+    "SEC_HSK99",
+    "SEC_HSK٣",
+    f"{PAGE_PREFIX}_!!!",
+    f"{PAGE_PREFIX}_{pack(5, 0)}",
+    encode(PAGE_PREFIX, 200, 1, 0),
+    encode(PAGE_PREFIX, 0, 9, 0),
+    f"{ITEM_PREFIX}_{pack(1, 2, 3, 4)}",
+    encode(ITEM_PREFIX, 200, 1, 0),
+    f"{LIST_PREFIX}_###",
+    f"{START_PREFIX}_{pack(1, 2)}",
+    f"{ANSWER_PREFIX}_{pack(1)}",
+    "FCS_é",
+    "FCR_",
+]
+
+
+@pytest.fixture
+def bot(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    bench_handlers.populate(USERS, CONTENT, seed=1)
+    sys.modules.pop("bot", None)
+    module = importlib.import_module("bot")
+    yield module
+    module.close_managers()
+    sys.modules.pop("bot", None)
+
+
+def test_forged_callback_data_answers_unavailable(bot, caplog):
+    async def main():
+        request = RecordingRequest()
+        application = bot.build_application(request=request)
+        await application.initialize()
+        harness = bench_handlers.Harness(bot, application, request, USERS, random.Random(1))
+        user = harness.user()
+        replies = []
+        try:
+            for data in FORGED:
+                await harness.process(harness.press(user, data))
+                replies.append(request.api.messages[-1][2])
+        finally:
+            await application.shutdown()
+        return replies
+
+    with caplog.at_level(logging.ERROR):
+        replies = asyncio.run(main())
+    assert not [record for record in caplog.records if record.levelno >= logging.ERROR]
+    assert len(replies) == len(FORGED)
+    for data, text in zip(FORGED, replies):
+        assert "غير متوفر" in text or "غير صالح" in text, (data, text)
+
+
+def test_section_codes_round_trip():
+    for content_type in BROWSABLE_TYPES:
+        for level in (0, *HSK_LEVELS):
+            assert decode_section(*section_code(content_type, level)) == (content_type, level)
+    # مستوى كبير لا يقع على نوع آخر
+    assert decode_section(0, 8) is None
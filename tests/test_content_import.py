@@ -0,0 +1,84 @@
+"""الاستيراد الجماعي: أخطاء الصفوف في التقرير، إزالة المكرر، وكتابة واحدة؛ والملف التالف لا يُستورد منه شيء."""
+import csv
+import json
+
+import pytest
+
+from content_import import import_bytes
+
+
+class RecordingContent:
+    def __init__(self):
+        self.commits = []
+
+    def import_items(self, content_type, items):
+        self.commits.append((content_type, dict(items)))
+        return len(items)
+
+
+def test_malformed_rows_are_reported_and_skipped():
+    content = RecordingContent()
+    data = (
+        "word,pinyin,translation,level\n"
+        "你好,nǐ hǎo,مرحبا,1\n"
+        ",wǒ,أنا,1\n"
+        "谢谢,xiè xie,شكرا,HSK9\n"
+        "再见,zài jiàn,وداعا,HSK1\n"
+    ).encode()
+    report = import_bytes(content, data, "vocabulary.csv", "vocabulary")
+    assert report["rows"] == 4 and report["imported"] == 2
+    assert [line_no for line_no, _ in report["errors"]] == [3, 4]
+    assert "missing 'word'" in report["errors"][0][1]
+    assert content.commits[0][1]["再见"]["level"] == 1
+
+
+def test_jsonl_bad_lines_reported():
+    content = RecordingContent()
+    lines = [
+        json.dumps({"id": "p1", "text": "你好", "translation": "مرحبا"}, ensure_ascii=False),
+        "{not json",
+        "",
+        json.dumps({"id": "p2", "text": "谢谢"}, ensure_ascii=False),
+    ]
+    report = import_bytes(content, "\n".join(lines).encode(), "phrases.jsonl", "phrases")
+    assert report["imported"] == 1
+    assert [line_no for line_no, _ in report["errors"]] == [2, 4]
+
+
+def test_duplicates_dropped_and_quiz_rows_merged_in_one_commit():
+    content = RecordingContent()
+    vocabulary = "word\tpinyin\ttranslation\n好\thǎo\tجيد\n好\thǎo\tحسن\n人\trén\tإنسان\n".encode()
+    report = import_bytes(content, vocabulary, "words.tsv", "vocabulary")
+    assert report["duplicates"] == 1 and report["imported"] == 2
+    # الأول يبقى
+    assert content.commits[0][1]["好"]["translation"] == "جيد"
+
+    quizzes = (
+        "id,title,question,options,answer_index\n"
+        "q1,Basics,你好?,hello|bye,0\n"
+        "q1,Basics,再见?,hello|bye,1\n"
+        "q2,More,人?,person|dog,0\n"
+    ).encode()
+    report = import_bytes(content, quizzes, "quizzes.csv", "quizzes")
+    assert report["imported"] == 2 and report["duplicates"] == 0
+    assert len(content.commits) == 2
+    content_type, items = content.commits[1]
+    assert content_type == "quizzes"
+    assert [q["answer_index"] for q in items["q1"]["questions"]] == [0, 1]
+
+
+def test_unreadable_file_imports_nothing():
+    content = RecordingContent()
+    too_long = "x" * (csv.field_size_limit() + 1)
+    data = f"id,text,translation\np1,你好,مرحبا\np2,{too_long},t\n".encode()
+    with pytest.raises(ValueError, match="after line 2"):
+        import_bytes(content, data, "phrases.csv", "phrases")
+
+    with pytest.raises(ValueError, match="unreadable"):
+        import_bytes(content, b"id,text,translation\np1,\xff\xfe,t\n", "phrases.csv", "phrases")
+    assert content.commits == []
+
+
+def test_unsupported_format_rejected():
+    with pytest.raises(ValueError):
+        import_bytes(RecordingContent(), b"", "words.xlsx", "vocabulary")
@@ -0,0 +1,47 @@
+"""تعديل content.json بعد تقسيمه إلى CONTENT_DIR يصل إلى المخزن عند الإقلاع التالي."""
+import json
+import logging
+import os
+
+from content_store import SOURCE_FILE, ContentStore
+
+
+def write_legacy(path, lessons):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"lessons": lessons}, f, ensure_ascii=False)
+    # وقت تعديل مختلف حتى على أنظمة الملفات ذات الدقة المنخفضة
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def test_changed_items_in_content_json_are_reimported(tmp_path):
+    legacy, directory = str(tmp_path / "content.json"), str(tmp_path / "content")
+    write_legacy(legacy, {"a": {"title": "A"}, "b": {"title": "B"}})
+    store = ContentStore(directory, legacy)
+    assert store["lessons"] == {"a": {"title": "A"}, "b": {"title": "B"}}
+    # تعديل من المشرف على عنصر لم يتغير في content.json يبقى
+    store.put("lessons", "a", {"title": "A (admin)"})
+
+    write_legacy(legacy, {"a": {"title": "A"}, "b": {"title": "B2"}, "c": {"title": "C"}})
+    reopened = ContentStore(directory, legacy)
+    assert reopened["lessons"] == {"a": {"title": "A (admin)"}, "b": {"title": "B2"}, "c": {"title": "C"}}
+    assert "lessons" in reopened.types() and ".source" not in reopened.types()
+
+    # دون تغيير: لا يُطبق شيء من جديد
+    reopened.put("lessons", "b", {"title": "B (admin)"})
+    assert ContentStore(directory, legacy)["lessons"]["b"] == {"title": "B (admin)"}
+
+
+def test_store_without_source_warns_on_divergence(tmp_path, caplog):
+    legacy, directory = str(tmp_path / "content.json"), str(tmp_path / "content")
+    write_legacy(legacy, {"a": {"title": "A"}})
+    ContentStore(directory, legacy)
+    # مخزن قُسّم قبل تسجيل المصدر
+    os.remove(os.path.join(directory, SOURCE_FILE))
+    write_legacy(legacy, {"a": {"title": "A2"}})
+
+    with caplog.at_level(logging.WARNING, logger="content_store"):
+        store = ContentStore(directory, legacy)
+    assert store["lessons"]["a"] == {"title": "A"}
+    assert any("lessons" in record.getMessage() for record in caplog.records)
+    assert os.path.exists(os.path.join(directory, SOURCE_FILE))
@@ -0,0 +1,136 @@
+"""المعالجات لا تنفذ عملاً حاجباً (قراءة ملفات، بناء فهارس، fsync) على خيط حلقة الأحداث."""
+import asyncio
+import gc
+import importlib
+import random
+import sys
+import threading
+import time
+
+import pytest
+
+import bench_handlers
+from autocomplete import AutocompleteIndex
+from content_browser import PAGE_PREFIX, section_code
+from content_store import ContentStore
+from fake_bot_api import RecordingRequest
+from quiz_engine import encode_start
+from router import encode
+from search_index import SearchIndex
+from storage import JSONStorage
+
+# مدة أي خطوة واحدة للحلقة تُعد توقفاً: خطوات المعالجات نفسها (تحليل التحديث وبناء الطلب) دون ذلك،
+# وتحميل نوع واحد من المحتوى المولد أو بناء فهرسه على الحلقة يتجاوزه بكثير
+STALL_SECONDS = 0.01
+USERS = 200
+CONTENT = 20000
+
+
+@pytest.fixture
+def bot(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    bench_handlers.populate(USERS, CONTENT, seed=1)
+    sys.modules.pop("bot", None)
+    module = importlib.import_module("bot")
+    yield module
+    module.close_managers()
+    sys.modules.pop("bot", None)
+
+
+def record_threads(monkeypatch, calls):
+    """تسجيل الخيط الذي تعمل عليه كل دالة حاجبة"""
+    def wrap(owner, name, static=False):
+        original = getattr(owner, name)
+
+        def wrapper(*args, **kwargs):
+            calls.append((name, threading.get_ident()))
+            return original(*args, **kwargs)
+        monkeypatch.setattr(owner, name, classmethod(lambda cls, *a, **k: wrapper(*a, **k)) if static else wrapper)
+
+    wrap(ContentStore, "_load")
+    wrap(ContentStore, "put_many")
+    wrap(SearchIndex, "build")
+    wrap(JSONStorage, "commit")
+    wrap(AutocompleteIndex, "load_or_build", static=True)
+
+
+async def drive(bot, harness):
+    admin = bot.ADMIN_IDS[0]
+    user = harness.user()
+    # كل خطوة تُبنى بعد معالجة السابقة فترى أزرار آخر رسالة
+    steps = [
+        lambda: harness.command(user, "/start"),
+        lambda: harness.press(user, "MENU_HSK"),
+        lambda: harness.press(user, "SEC_HSK2"),
+        lambda: harness.press(user, encode(PAGE_PREFIX, *section_code("vocabulary", 2), 1)),
+        lambda: harness.press(user, "MENU_Quizzes"),
+        lambda: harness.press(user, encode_start(3)),
+        lambda: harness.press_shown(user, "QZ", "BACK"),
+        lambda: harness.press(user, "MENU_Flashcards"),
+        lambda: harness.press_shown(user, "FCS", "BACK"),
+        lambda: harness.press_shown(user, "FCR", "BACK"),
+        lambda: harness.press(user, "MENU_Dictionary"),
+        lambda: harness.text(user, "de"),
+        lambda: harness.press(admin, "ADM_ADD"),
+        lambda: harness.text(admin, "عنوان"),
+        lambda: harness.text(admin, "محتوى"),
+        lambda: harness.press(admin, "ADM_UP"),
+        lambda: harness.press(admin, "UPSEC_HSK"),
+        lambda: harness.document(admin, "file.pdf"),
+    ]
+    for step in steps:
+        await harness.process(step())
+
+
+def record_stalls(monkeypatch, stalls, active):
+    """كاشف التوقف: كل خطوة للحلقة أطول من STALL_SECONDS ما دام active[0].
+
+    بدل وضع debug في asyncio الذي يلتقط traceback عند كل call_soon فيضاعف زمن الخطوات ويجعله متذبذباً.
+    """
+    original = asyncio.events.Handle._run
+
+    def run(handle):
+        start = time.perf_counter()
+        try:
+            return original(handle)
+        finally:
+            elapsed = time.perf_counter() - start
+            if active[0] and elapsed > STALL_SECONDS:
+                stalls.append(f"{handle!r} took {elapsed:.3f}s")
+    monkeypatch.setattr(asyncio.events.Handle, "_run", run)
+
+
+def test_handlers_do_not_block_event_loop(bot, monkeypatch):
+    calls = []
+    stalls = []
+    active = [False]
+    record_threads(monkeypatch, calls)
+    record_stalls(monkeypatch, stalls, active)
+
+    async def main():
+        request = RecordingRequest()
+        application = bot.build_application(request=request)
+        await application.initialize()
+        harness = bench_handlers.Harness(bot, application, request, USERS, random.Random(2))
+        active[0] = True
+        try:
+            await drive(bot, harness)
+        finally:
+            active[0] = False
+            await application.shutdown()
+        return threading.get_ident(), request
+
+    # جمع القمامة يتوقف أحياناً أكثر من STALL_SECONDS مع كومة كبيرة من الاختبارات السابقة، وليس عملاً حاجباً
+    gc.collect()
+    gc.disable()
+    try:
+        loop_thread, request = asyncio.run(main())
+    finally:
+        gc.enable()
+
+    assert not stalls
+    on_loop = sorted({name for name, thread in calls if thread == loop_thread})
+    assert not on_loop, f"blocking calls on the event loop: {on_loop}"
+    # المسارات المقصودة نُفذت فعلاً (تحميل المحتوى وكتابته)
+    assert {"_load", "put_many", "load_or_build"} <= {name for name, _ in calls}
+    assert request.api.calls["editMessageText"] > 10
@@ -0,0 +1,36 @@
+"""مهمة الحذف: غير النشطين يُحذفون عند بلوغ MAX_USERS فقط، كما قبل فهرس الانتهاء."""
+from datetime import datetime, timedelta
+
+import user_manager as user_manager_module
+from storage import JSONStorage
+from user_manager import UserManager
+
+LATER = datetime.now() + timedelta(days=30)
+
+
+def make_users(tmp_path, monkeypatch, count):
+    monkeypatch.chdir(tmp_path)
+    users = UserManager(JSONStorage(), write_behind=False)
+    for user_id in range(count):
+        users.register_user(user_id)
+    return users
+
+
+def test_idle_users_kept_below_capacity(tmp_path, monkeypatch):
+    monkeypatch.setattr(user_manager_module, "MAX_USERS", 10)
+    users = make_users(tmp_path, monkeypatch, 9)
+    assert users.cleanup_inactive_users(now=LATER) == 0
+    assert len(users.data["users"]) == 9
+
+    monkeypatch.setattr(user_manager_module, "EXPIRE_BELOW_CAPACITY", True)
+    assert users.cleanup_inactive_users(now=LATER) == 9
+    users.close()
+
+
+def test_idle_users_expired_at_capacity(tmp_path, monkeypatch):
+    monkeypatch.setattr(user_manager_module, "MAX_USERS", 10)
+    users = make_users(tmp_path, monkeypatch, 10)
+    # كل المنتهين يُحذفون، لا ما يكفي للنزول تحت الحد فقط
+    assert users.cleanup_inactive_users(now=LATER) == 10
+    assert users.get_total_users() == 0
+    users.close()
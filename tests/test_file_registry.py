@@ -0,0 +1,65 @@
+"""سجل الملفات: مفتاحه file_unique_id، وفهارس الأقسام تطابق ما يُبنى من القرص، والإرسال يعيد استخدام file_id."""
+import asyncio
+
+from content_store import ContentStore
+from file_registry import MEDIA_GROUP_SIZE, FileRegistry, media_batches, send_files
+
+
+def make_registry(tmp_path):
+    return FileRegistry(ContentStore(str(tmp_path / "content"), str(tmp_path / "content.json")))
+
+
+def test_same_file_is_one_record_across_sections(tmp_path):
+    files = make_registry(tmp_path)
+    record, created = files.add("u1", "id-a", "document", file_name="a.pdf", user_id=7, section="HSK")
+    assert created
+    # رفع الملف نفسه مرة أخرى (file_id مختلف) إلى القسم نفسه لا يضيف شيئاً
+    assert files.add("u1", "id-b", "document", user_id=7, section="HSK") == (record, False)
+    _, created = files.add("u1", "id-b", "document", user_id=7, section="Stories")
+    assert created
+    files.add("u2", "id-c", "photo", user_id=8, section="HSK")
+
+    assert [r["file_id"] for r in files.in_section("HSK")] == ["id-a", "id-c"]
+    assert [r["file_id"] for r in files.in_section("Stories")] == ["id-a"]
+    assert files.in_section("HSK", "photo") == [files.get("u2")]
+    assert files.count("HSK") == 2 and files.count("Apps") == 0
+    assert len(files.by_uploader(7)) == 1 and len(files.by_type("document")) == 1
+
+    # الفهارس المبنية من القرص تطابق المحدثة تدريجياً، والسجلات القديمة بقسم واحد تُفهرس أيضاً
+    files.store.put("files", "legacy", {"file_id": "id-d", "file_type": "photo", "user_id": 9, "section": "HSK"})
+    reopened = make_registry(tmp_path)
+    assert [r["file_id"] for r in reopened.in_section("HSK")] == ["id-a", "id-c", "id-d"]
+    assert reopened.indexes["sections"]["Stories"] == ["u1"]
+
+
+def test_media_batches_group_compatible_types():
+    records = (
+        [{"file_type": "photo"}] * 12
+        + [{"file_type": "video"}, {"file_type": "document"}, {"file_type": "document"}, {"file_type": "voice"},
+           {"file_type": "voice"}, {"file_type": "audio"}]
+    )
+    sizes = [(len(batch), batch[0]["file_type"]) for batch in media_batches(records)]
+    assert sizes == [(MEDIA_GROUP_SIZE, "photo"), (3, "photo"), (2, "document"), (1, "voice"), (1, "voice"), (1, "audio")]
+
+
+class FakeBot:
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        async def call(chat_id, payload):
+            self.calls.append((name, chat_id, payload))
+        return call
+
+
+def test_send_files_reuses_file_ids():
+    records = [
+        {"file_type": "photo", "file_id": "p1"},
+        {"file_type": "video", "file_id": "v1"},
+        {"file_type": "voice", "file_id": "s1"},
+    ]
+    bot = FakeBot()
+    asyncio.run(send_files(bot, 5, records))
+    (group, _, media), single = bot.calls
+    assert group == "send_media_group" and [item.media for item in media] == ["p1", "v1"]
+    assert single == ("send_voice", 5, "s1")
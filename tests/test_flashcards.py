@@ -0,0 +1,69 @@
+"""البطاقات بعد حذف المستخدم وعودته: لا تبقى مجموعته القديمة في الذاكرة."""
+from datetime import datetime, timedelta
+
+import user_manager as user_manager_module
+from flashcards import FlashcardScheduler, UserDeck
+from storage import JSONStorage
+from user_manager import UserManager
+
+VOCABULARY = 100
+
+
+def persisted_deck(users, user_id):
+    state = users.get_user(user_id).flashcards
+    packed = users.get_deck(user_id) or {"n": 0, "data": ""}
+    return UserDeck.unpack(packed["n"], packed["data"], state["delta"])
+
+
+def test_evicted_user_returns_with_fresh_deck(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # فوق السعة دائماً: كل مستخدم غير نشط منذ EVICTION_MIN_IDLE_DAYS يُحذف
+    monkeypatch.setattr(user_manager_module, "MAX_USERS", 0)
+    users = UserManager(JSONStorage(), write_behind=False)
+    scheduler = FlashcardScheduler(users)
+    users.register_user("7")
+    for _ in range(5):
+        card_id = scheduler.next_card("7", VOCABULARY)
+        assert scheduler.review("7", card_id, 4)
+    assert list(scheduler.deck("7").cards) == [0, 1, 2, 3, 4]
+
+    assert users.cleanup_inactive_users(now=datetime.now() + timedelta(days=30)) == 1
+    assert "7" not in scheduler.decks
+
+    users.register_user("7")
+    assert scheduler.next_card("7", VOCABULARY) == 0
+    assert list(scheduler.deck("7").cards) == [0]
+    assert list(persisted_deck(users, "7").cards) == [0]
+    assert scheduler.review("7", 0, 5)
+    users.close()
+
+
+def test_review_rejects_out_of_range_rating(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    users = UserManager(JSONStorage(), write_behind=False)
+    scheduler = FlashcardScheduler(users)
+    users.register_user("7")
+    card_id = scheduler.next_card("7", VOCABULARY)
+    assert not scheduler.review("7", card_id, 6)
+    assert not scheduler.review("7", card_id, -1)
+    assert scheduler.deck("7").reps[0] == 0
+    # بطاقة خارج المفردات الحالية لا تُعرض
+    assert scheduler.next_card("7", 0) is None
+    users.close()
+
+
+def test_users_due_compacts_stale_heap_entries(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    users = UserManager(JSONStorage(), write_behind=False)
+    scheduler = FlashcardScheduler(users)
+    users.register_user("7")
+    card_id = scheduler.next_card("7", VOCABULARY)
+    # كل مراجعة تترك مدخلاً قديماً في الكومة
+    for _ in range(100):
+        assert scheduler.review("7", card_id, 0)
+    assert len(scheduler.due_users) > 100
+
+    later = users.get_user("7").flashcards["next_due"] + 1
+    assert scheduler.users_due(now=later) == ["7"]
+    assert scheduler.due_users == [] and scheduler._pushed is None
+    users.close()
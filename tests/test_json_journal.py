@@ -0,0 +1,67 @@
+"""سجل تعديلات JSONStorage: الضغط في لقطة جديدة، والنسخ الاحتياطية التزايدية واستعادتها."""
+import os
+
+from storage import JSONStorage, restore_json_backup
+
+
+def make_storage(tmp_path, compact_min=1 << 20):
+    return JSONStorage(str(tmp_path / "data.json"), str(tmp_path / "notifications.json"), compact_min=compact_min)
+
+
+def put(storage, data, key, value):
+    data["users"][key] = value
+    storage.write(data, {("users", key)})
+
+
+def test_journal_compacts_into_snapshot(tmp_path):
+    storage = make_storage(tmp_path, compact_min=2048)
+    data = {"users": {}, "notifications": {"1": [{"message": "hi"}]}}
+    storage.write_all(data)
+    sizes = []
+    for i in range(100):
+        put(storage, data, str(i % 10), {"n": i, "pad": "x" * 50})
+        sizes.append(os.path.getsize(storage.journal_path) if os.path.exists(storage.journal_path) else 0)
+
+    # يكبر السجل حتى الحد ثم يُحذف بعد كتابة لقطة تشمله
+    assert max(sizes) < 2048 + 200
+    assert sizes.count(0) >= 2
+    assert JSONStorage(storage.path, storage.notifications_path).load() == data
+
+
+def test_backups_copy_only_new_journal_lines(tmp_path):
+    storage = make_storage(tmp_path)
+    backups = str(tmp_path / "backups")
+    data = {"users": {}, "notifications": {}}
+    storage.write_all(data)
+    put(storage, data, "1", {"n": 1})
+
+    first, copied = storage.backup(backups)
+    assert copied == os.path.getsize(storage.path) + os.path.getsize(storage.notifications_path) + os.path.getsize(storage.journal_path)
+    assert storage.backup(backups) == (first, 0)
+
+    size = os.path.getsize(storage.journal_path)
+    put(storage, data, "2", {"n": 2})
+    assert storage.backup(backups) == (first, os.path.getsize(storage.journal_path) - size)
+
+    # لقطة جديدة: مجلد جديد، والقديم يبقى قابلاً للاستعادة
+    expected = {key: dict(value) for key, value in data["users"].items()}
+    put(storage, data, "3", {"n": 3})
+    storage.write_all(data)
+    second, _ = storage.backup(backups)
+    assert second != first and sorted(os.listdir(backups)) == sorted(map(os.path.basename, (first, second)))
+
+    restored = tmp_path / "restored"
+    restored.mkdir()
+    assert restore_json_backup(first, str(restored / "data.json"), str(restored / "notifications.json")) == 2
+    assert JSONStorage(str(restored / "data.json"), str(restored / "notifications.json")).load()["users"] == expected
+
+
+def test_backups_pruned_to_keep(tmp_path):
+    storage = make_storage(tmp_path)
+    backups = str(tmp_path / "backups")
+    data = {"users": {}, "notifications": {}}
+    for i in range(5):
+        put(storage, data, str(i), {"n": i})
+        storage.write_all(data)
+        storage.backup(backups, keep=3)
+    assert len(os.listdir(backups)) == 3
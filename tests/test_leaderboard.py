@@ -0,0 +1,38 @@
+"""RankedIndex: الترتيب وأفضل k يطابقان ترتيباً عادياً للنقاط بعد تحديثات وحذف عشوائية."""
+import random
+
+from leaderboard import RankedIndex
+
+USERS = 300
+
+
+def expected_order(scores):
+    # النقاط تنازلياً، والتعادل بمعرف المستخدم تصاعدياً
+    return sorted(scores, key=lambda user_id: (-scores[user_id], user_id))
+
+
+def test_rank_and_top_match_plain_sort():
+    rng = random.Random(4)
+    initial = {str(i): rng.randrange(50) for i in range(USERS // 2)}
+    index = RankedIndex(initial.items())
+    scores = dict(initial)
+    for step in range(3000):
+        user_id = str(rng.randrange(USERS))
+        if rng.random() < 0.1:
+            index.remove(user_id)
+            scores.pop(user_id, None)
+        else:
+            # نطاق ضيق للنقاط: تعادلات كثيرة
+            score = rng.randrange(50)
+            index.update(user_id, score)
+            scores[user_id] = score
+
+        if step % 100 == 0:
+            order = expected_order(scores)
+            assert len(index) == len(scores)
+            for k in (0, 1, 10, len(order) + 5):
+                assert index.top(k) == [(user_id, scores[user_id]) for user_id in order[:k]]
+            for position, user_id in enumerate(order, 1):
+                assert index.rank(user_id) == position
+                assert index.score(user_id) == scores[user_id]
+    assert index.rank("missing") is None and "missing" not in index
@@ -0,0 +1,124 @@
+"""GroqScheduler: حصة كل مستخدم حسب تكلفة طلباته، لا تجويع، والتوقف عند 429 من Groq."""
+import asyncio
+import time
+
+import httpx
+import pytest
+from groq import RateLimitError
+from telegram.error import RetryAfter
+
+from ai_tutor import AITutor
+from llm_scheduler import GroqScheduler
+
+UNLIMITED = 10 ** 9
+
+
+def record(served, user_id, cost, delay=0.0):
+    async def fn():
+        served.append((user_id, cost))
+        await asyncio.sleep(delay)
+        return user_id
+    return fn
+
+
+def rate_limit_error(retry_after):
+    request = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+    response = httpx.Response(429, headers={"retry-after": str(retry_after)}, request=request)
+    return RateLimitError("rate limited", response=response, body=None)
+
+
+def test_users_share_by_cost():
+    async def main():
+        scheduler = GroqScheduler(concurrency=1, tokens_per_minute=UNLIMITED, max_queue=100, max_per_user=30)
+        served = []
+        # a يرسل طلبات بتكلفة 1 وb بتكلفة 3، والكل في الطابور قبل أن يبدأ العامل
+        futures = [scheduler.submit(user_id, cost, record(served, user_id, cost))
+                   for _ in range(30) for user_id, cost in (("a", 1), ("b", 3))]
+        with pytest.raises(asyncio.QueueFull):
+            scheduler.submit("a", 1, record(served, "a", 1))
+        await asyncio.gather(*futures)
+        await scheduler.close()
+        return served, scheduler.stats
+
+    served, stats = asyncio.run(main())
+    assert stats["completed"] == 60 and stats["rejected"] == 1
+    totals = {"a": 0, "b": 0}
+    for user_id, cost in served:
+        totals[user_id] += cost
+        if totals["a"] == 30:
+            break
+        # ما خُدم لكل مستخدم لا يبتعد عن الآخر بأكثر من أكبر تكلفة طلب
+        assert abs(totals["a"] - totals["b"]) <= 3
+    assert totals["a"] == 30 and totals["b"] >= 27
+
+
+def test_light_user_not_starved_by_flood():
+    async def main():
+        scheduler = GroqScheduler(concurrency=1, tokens_per_minute=UNLIMITED, max_queue=100, max_per_user=50)
+        served = []
+        heavy = [scheduler.submit("heavy", 500, record(served, "heavy", 500, 0.001)) for _ in range(40)]
+        await heavy[4]
+        before = len(served)
+        light = scheduler.submit("light", 10, record(served, "light", 10))
+        await light
+        position = len(served) - 1
+        await asyncio.gather(*heavy)
+        await scheduler.close()
+        return before, position
+
+    before, position = asyncio.run(main())
+    # يُخدم بعد ما بدأ قبله (وطلب قد يكون العامل سحبه للتو)، لا بعد الطوفان كله
+    assert before < 40 and position <= before + 1
+
+
+def test_rate_limit_pauses_all_requests():
+    async def main():
+        scheduler = GroqScheduler(concurrency=2, tokens_per_minute=6000, max_queue=10, max_per_user=10)
+        started = []
+
+        async def limited():
+            started.append(time.monotonic())
+            raise rate_limit_error(0.2)
+
+        async def ok():
+            started.append(time.monotonic())
+            return "ok"
+
+        first = scheduler.submit("a", 1, limited)
+        with pytest.raises(RateLimitError):
+            await first
+        second = scheduler.submit("b", 1, ok)
+        assert await second == "ok"
+        stats = scheduler.stats
+        await scheduler.close()
+        return started, stats
+
+    started, stats = asyncio.run(main())
+    assert stats["rate_limited"] == 1 and stats["completed"] == 1
+    # retry-after يوقف كل العمال، لا الطلب المرفوض وحده
+    assert started[1] - started[0] >= 0.18
+
+
+class FakeMessage:
+    def __init__(self, failures):
+        self.failures = failures
+        self.texts = []
+
+    async def edit_text(self, text):
+        if self.failures:
+            self.failures -= 1
+            raise RetryAfter(0.01)
+        self.texts.append(text)
+
+
+def test_tutor_final_edit_waits_out_retry_after():
+    async def main():
+        tutor = AITutor(client=object(), scheduler=GroqScheduler())
+        message = FakeMessage(failures=1)
+        # التعديل الوسيط يُتخطى عند RetryAfter
+        assert await tutor._edit(message, "partial", None) is None
+        message.failures = 2
+        assert await tutor._edit(message, "final", None, final=True) == "final"
+        return message.texts
+
+    assert asyncio.run(main()) == ["final"]
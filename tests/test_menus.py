@@ -0,0 +1,41 @@
+"""لوحات المفاتيح تُبنى مرة وتُشارك، وما بُني من المحتوى يُعاد بناؤه فقط بعد تعديله."""
+from content_manager import ContentManager
+from content_store import ContentStore
+from menus import ADMIN_ITEM, MAIN_SECTIONS, MenuRegistry
+from quiz_engine import encode_start
+
+QUESTION = {"question": "?", "options": ["a", "b"], "answer_index": 0}
+
+
+def buttons(markup):
+    return [button.callback_data for row in markup.inline_keyboard for button in row]
+
+
+def make_menus(tmp_path):
+    content = ContentManager(ContentStore(str(tmp_path / "content"), str(tmp_path / "content.json")))
+    content.import_items("quizzes", {f"q{i}": {"title": f"q{i}", "questions": [QUESTION]} for i in range(3)})
+    return content, MenuRegistry(content, page_size=10)
+
+
+def test_static_menus_are_shared(tmp_path):
+    _, menus = make_menus(tmp_path)
+    assert menus.main(False) is menus.main(False)
+    assert menus.get("hsk") is menus.get("hsk")
+    assert buttons(menus.main(False)) == [data for _, data in MAIN_SECTIONS]
+    assert buttons(menus.main(True)) == [data for _, data in MAIN_SECTIONS + [ADMIN_ITEM]]
+
+
+def test_content_menus_rebuilt_only_after_changes(tmp_path):
+    content, menus = make_menus(tmp_path)
+    first = menus.quizzes(0)
+    assert menus.quizzes(0) is first
+    content.get_quiz("q0")
+    assert menus.quizzes(0) is first
+
+    content.add_quiz("q3", "q3", [QUESTION])
+    rebuilt = menus.quizzes(0)
+    assert rebuilt is not first and encode_start(3) in buttons(rebuilt)
+    assert menus.quizzes(0) is rebuilt
+
+    menus.invalidate()
+    assert menus.quizzes(0) is not rebuilt
@@ -0,0 +1,83 @@
+"""إرسال الإشعارات: رسالة واحدة لكل محادثة، ضمن الحد العام وحد كل محادثة، ومع احترام RetryAfter."""
+import asyncio
+import time
+
+from telegram import Bot
+
+from fake_bot_api import FakeBotAPI, RecordingRequest
+from notification_delivery import NotificationDispatcher
+from storage import JSONStorage
+from user_manager import UserManager
+
+SERVER_RATE = 50
+RATE = 20
+USERS = 30
+
+
+def make_users(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    users = UserManager(JSONStorage(), write_behind=False)
+    for user_id in range(1, USERS + 1):
+        users.register_user(user_id)
+    return users
+
+
+def deliver_all(dispatcher, api, rounds=(None,)):
+    """تفريغ الإشعارات بعد كل دالة في rounds (تضيف إشعارات جديدة)؛ يعيد الزمن الكلي"""
+    async def main():
+        async with Bot("123:fake", request=RecordingRequest(api)) as bot:
+            start = time.monotonic()
+            for queue in rounds:
+                if queue:
+                    queue()
+                while await dispatcher.deliver_batch(bot):
+                    pass
+            return time.monotonic() - start
+    return asyncio.run(main())
+
+
+def notify(users, level):
+    return lambda: users.send_notification(1, "level_up", {"new_level": level})
+
+
+def test_unread_merged_into_one_message_within_rate(tmp_path, monkeypatch):
+    users = make_users(tmp_path, monkeypatch)
+    for user_id in range(1, USERS + 1):
+        for level in (2, 3):
+            users.send_notification(user_id, "level_up", {"new_level": level})
+    api = FakeBotAPI(global_rate=SERVER_RATE, per_chat_interval=1)
+    dispatcher = NotificationDispatcher(users, rate=RATE, batch_size=7)
+
+    elapsed = deliver_all(dispatcher, api)
+    assert api.flood_errors == 0
+    assert sorted(int(chat_id) for _, chat_id, _ in api.messages) == list(range(1, USERS + 1))
+    assert all("2" in text and "3" in text for _, _, text in api.messages)
+    # سعة الانفجار RATE رسالة ثم RATE في الثانية
+    assert elapsed >= (USERS - RATE) / RATE * 0.9
+    assert users.get_pending_notifications() == {}
+    assert users.get_unread_notifications(1) == []
+    users.close()
+
+
+def test_per_chat_interval_spaces_messages(tmp_path, monkeypatch):
+    users = make_users(tmp_path, monkeypatch)
+    api = FakeBotAPI(global_rate=SERVER_RATE, per_chat_interval=0.3)
+    dispatcher = NotificationDispatcher(users, rate=RATE, per_chat_interval=0.3)
+    elapsed = deliver_all(dispatcher, api, [notify(users, 2), notify(users, 3)])
+    assert api.flood_errors == 0 and len(api.messages) == 2
+    assert elapsed >= 0.29
+    users.close()
+
+
+def test_retry_after_pauses_and_resends(tmp_path, monkeypatch):
+    users = make_users(tmp_path, monkeypatch)
+    api = FakeBotAPI(global_rate=SERVER_RATE, per_chat_interval=0.5)
+    # بدون حد لكل محادثة في المرسل: الخادم يرد 429 على الرسالة الثانية
+    dispatcher = NotificationDispatcher(users, rate=RATE, per_chat_interval=0)
+    elapsed = deliver_all(dispatcher, api, [notify(users, 2), notify(users, 3)])
+
+    assert api.flood_errors == 1
+    assert dispatcher.stats == {"sent": 2, "failed": 0, "retry_after": 1}
+    assert elapsed >= 1
+    assert users.get_pending_notifications() == {}
+    users.close()
@@ -0,0 +1,74 @@
+"""مخزن الإشعارات: سجل محدود لكل مستخدم، وغير المقروء ذيل متصل، وفهرس unread_users يطابق السجلات."""
+import random
+from datetime import datetime, timedelta
+
+from notification_store import NotificationStore
+
+LIMIT = 5
+
+
+def make_store(records=None):
+    return NotificationStore({} if records is None else records, history_limit=LIMIT, ttl_days=14)
+
+
+def test_history_is_bounded():
+    store = make_store()
+    for i in range(50):
+        store.push("1", "level_up", f"m{i}")
+    record = store.records["1"]
+    assert [item["id"] for item in record["items"]] == list(range(46, 51))
+    assert store.unread_count("1") == LIMIT
+    assert [item["message"] for item in store.unread("1")] == [f"m{i}" for i in range(45, 50)]
+
+    store.mark_read("1", 48)
+    assert [item["id"] for item in store.unread("1")] == [49, 50]
+    # مؤشر القراءة لا يتراجع ولا يتجاوز آخر إشعار
+    store.mark_read("1", 3)
+    store.mark_read("1", 999)
+    assert record["read"] == 50 and store.unread("1") == [] and "1" not in store.unread_users
+
+
+def test_unread_index_matches_records():
+    rng = random.Random(8)
+    store = make_store()
+    for _ in range(2000):
+        user_id = str(rng.randrange(20))
+        action = rng.random()
+        if action < 0.6:
+            store.push(user_id, "level_up", "m")
+        elif action < 0.9:
+            record = store.records.get(user_id)
+            store.mark_read(user_id, rng.randrange(record["next"] + 1) if record and rng.random() < 0.5 else None)
+        else:
+            store.remove(user_id)
+        assert store.unread_users == {uid for uid in store.records if store.unread_count(uid)}
+        for uid, record in store.records.items():
+            assert len(record["items"]) <= LIMIT
+            assert len(store.unread(uid)) == min(record["next"] - 1 - record["read"], len(record["items"]))
+
+
+def test_compact_drops_expired():
+    store = make_store()
+    old = (datetime.now() - timedelta(days=30)).isoformat()
+    store.push("1", "level_up", "old")
+    store.push("2", "level_up", "old")
+    store.push("2", "level_up", "new")
+    store.records["1"]["items"][0]["timestamp"] = old
+    store.records["2"]["items"][0]["timestamp"] = old
+    store.mark_read("2", 1)
+
+    assert sorted(store.compact()) == ["1", "2"]
+    assert "1" not in store.records and store.unread_users == {"2"}
+    assert [item["message"] for item in store.unread("2")] == ["new"]
+    assert store.compact() == []
+
+
+def test_legacy_lists_migrate():
+    now = datetime.now().isoformat()
+    legacy = [{"type": "level_up", "message": f"m{i}", "timestamp": now, "read": i < 3 or i == 4} for i in range(8)]
+    store = make_store({"1": legacy, "2": [dict(n, read=True) for n in legacy]})
+    assert store.migrated == 2
+    # المقروء هو البادئة المتصلة فقط: الإشعار 5 المقروء بعد غير مقروء يبقى غير مقروء
+    assert [item["message"] for item in store.unread("1")] == [f"m{i}" for i in range(3, 8)]
+    assert store.records["1"]["next"] == 9 and len(store.records["1"]["items"]) == LIMIT
+    assert store.unread_users == {"1"}
@@ -0,0 +1,42 @@
+"""أزرار الاختبارات تحمل رقم الاختبار فتبقى تحت حد 64 بايت مهما طال معرفه، والقائمة مقسمة إلى صفحات."""
+from content_browser import ContentBrowser, section_code
+from content_manager import ContentManager
+from content_store import ContentStore
+from menus import MenuRegistry
+from quiz_engine import LIST_PREFIX, START_PREFIX, QuizEngine, encode_start
+from router import MAX_CALLBACK_BYTES, unpack
+
+QUESTION = {"question": "?", "options": ["a", "b"], "answer_index": 0}
+
+
+def buttons(markup):
+    return [button.callback_data for row in markup.inline_keyboard for button in row]
+
+
+def test_long_quiz_ids_paginate_with_compact_buttons(tmp_path):
+    content = ContentManager(ContentStore(str(tmp_path / "content"), str(tmp_path / "content.json")))
+    long_id = "imported-" + "x" * 200
+    content.import_items("quizzes", {f"{long_id}-{i}": {"title": f"q{i}", "questions": [QUESTION]} for i in range(25)})
+    menus = MenuRegistry(content, page_size=10)
+
+    seen = []
+    for page in range(3):
+        data = buttons(menus.quizzes(page))
+        assert all(len(item.encode()) <= MAX_CALLBACK_BYTES for item in data)
+        seen += [unpack(item.partition("_")[2])[0] for item in data if item.startswith(START_PREFIX + "_")]
+        assert any(item.startswith(LIST_PREFIX + "_") for item in data)
+    assert seen == list(range(25))
+    # الصفحة بعد الأخيرة تعرض الأخيرة
+    assert buttons(menus.quizzes(7)) == buttons(menus.quizzes(2))
+
+    # الاختبار المضاف لاحقاً يأخذ الرقم التالي ويظهر في القائمة بعد تغير الإصدار
+    content.add_quiz(long_id, "new", [QUESTION])
+    assert content.quiz_number(long_id) == 25
+    assert encode_start(25) in buttons(menus.quizzes(2))
+    session = QuizEngine(None, content).start(1, 25)
+    assert session.quiz_id == long_id
+
+    content.add_lesson("l1", "lesson", "", "", quiz_id=long_id, level=1)
+    _, markup = ContentBrowser(content).item(*section_code("lessons", 1), 0)
+    assert all(len(item.encode()) <= MAX_CALLBACK_BYTES for item in buttons(markup))
+    assert QuizEngine(None, content).start(1, 99) is None
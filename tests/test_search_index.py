@@ -0,0 +1,95 @@
+"""فهرس البحث: درجات BM25 كما يحسبها التعريف مباشرة، والمطابقة بكل الكتابات، والتعديل والصفحات."""
+import math
+import random
+from collections import Counter
+
+import pytest
+
+from search_index import SearchIndex, _item_text, query_terms, tokenize
+
+CONTENT = {
+    "vocabulary": {
+        "你好": {"pinyin": "nǐ hǎo", "translation": "مرحباً"},
+        "中国": {"pinyin": "zhōng guó", "translation": "الصين"},
+        "中国人": {"pinyin": "zhōng guó rén", "translation": "صيني، إنسان من الصين"},
+    },
+    "phrases": {
+        "p1": {"text": "你好，我是中国人", "translation": "مرحباً، أنا صينيّ"},
+    },
+    "lessons": {
+        "lesson1": {"title": "التحيات", "content": "نتعلم قول nǐ hǎo والرد عليه"},
+    },
+}
+
+
+def brute_force(content, query, k1=SearchIndex.K1, b=SearchIndex.B):
+    docs = {
+        (content_type, item_id): Counter(tokenize(_item_text(item_id, item)))
+        for content_type, items in content.items()
+        for item_id, item in items.items()
+    }
+    avg_length = sum(sum(counts.values()) for counts in docs.values()) / len(docs)
+    scores = {}
+    for key, counts in docs.items():
+        length = sum(counts.values())
+        score = 0.0
+        for term in set(query_terms(query)):
+            df = sum(1 for other in docs.values() if term in other)
+            if term in counts:
+                idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+                tf = counts[term]
+                score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avg_length))
+        if score:
+            scores[key] = score
+    return scores
+
+
+def make_index(content):
+    index = SearchIndex()
+    index.build(content)
+    return index
+
+
+def test_scores_match_definition():
+    rng = random.Random(5)
+    words = ["ni", "hao", "zhong", "guo", "ren", "كبير", "جيد", "صين", "你", "好", "中国"]
+    content = {"lessons": {
+        f"l{i}": {"title": " ".join(rng.choices(words, k=rng.randint(1, 12)))} for i in range(60)
+    }}
+    index = make_index(content)
+    for query in ("ni hao", "中国", "جيد صين", "ren"):
+        expected = brute_force(content, query)
+        total, results = index.search(query, limit=len(expected))
+        assert total == len(expected)
+        assert dict(results) == pytest.approx(expected)
+        scores = [score for _, score in results]
+        assert scores == sorted(scores, reverse=True)
+
+
+def test_matches_in_every_script():
+    index = make_index(CONTENT)
+
+    def keys(query, content_type=None):
+        return {item_id for (_, item_id), _ in index.search(query, content_type, limit=10)[1]}
+
+    assert keys("中国") == {"中国", "中国人", "p1"}
+    assert keys("中国人", "vocabulary") == {"中国", "中国人"}
+    # البينيين بدون نغمات يطابق المنغم، والمنغم والمرقم يطابقان المقطع نفسه فقط
+    assert keys("ni hao") == keys("nǐ hǎo") == keys("ni3 hao3") == {"你好", "lesson1"}
+    assert keys("zhong") == {"中国", "中国人"}
+    # التشكيل والهمزات لا تهم
+    assert keys("صيني") == {"中国人", "p1"}
+    assert keys("مرحبا") == {"你好", "p1"}
+    assert keys("不存在") == set()
+
+
+def test_add_replaces_old_terms_and_pages():
+    index = make_index(CONTENT)
+    index.add("vocabulary", "中国", {"pinyin": "zhōng guó", "translation": "بلد"})
+    assert ("vocabulary", "中国") not in dict(index.search("الصين", limit=10)[1])
+    assert ("vocabulary", "中国") in dict(index.search("بلد", limit=10)[1])
+
+    total, everything = index.search("中 国 你 好", limit=10)
+    assert total == len(everything) == 4
+    pages = [index.search("中 国 你 好", limit=1, offset=offset)[1] for offset in range(total)]
+    assert [page[0] for page in pages] == everything
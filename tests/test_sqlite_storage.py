@@ -0,0 +1,70 @@
+"""SQLiteStorage: البيانات تعود كما حُفظت، والحفظ يكتب الصفوف المعدلة فقط، والترحيل من data.json."""
+import re
+
+from storage import JSONStorage, SQLiteStorage, migrate_json_to_sqlite
+from user_manager import UserManager
+
+USERS = 20
+
+
+def fill(users):
+    for user_id in range(USERS):
+        users.register_user(user_id, username=f"user{user_id}")
+        users.add_xp(user_id, 10 * user_id)
+    users.send_notification(3, "level_up", {"new_level": 2})
+    users.save_deck(5, "deck")
+
+
+def state(users):
+    return (
+        {user_id: record.to_dict() for user_id, record in users.user_entries()},
+        users.get_leaderboard("all_time", limit=USERS),
+        users.get_unread_notifications(3),
+        users.get_deck(5),
+        users.data["analytics"]["total_users"],
+    )
+
+
+def test_round_trip(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    users = UserManager(SQLiteStorage(), write_behind=False)
+    fill(users)
+    expected = state(users)
+    users.close()
+
+    reloaded = UserManager(SQLiteStorage(), write_behind=False)
+    assert state(reloaded) == expected
+    assert reloaded.get_user_rank(USERS - 1) == 1
+    reloaded.close()
+
+
+def test_save_writes_only_changed_rows(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    storage = SQLiteStorage()
+    users = UserManager(storage, write_behind=False)
+    fill(users)
+    users.flush()
+
+    statements = []
+    storage.conn.set_trace_callback(statements.append)
+    users.add_xp(7, 5)
+    storage.conn.set_trace_callback(None)
+
+    writes = [sql for sql in statements if sql.startswith(("INSERT", "DELETE", "UPDATE"))]
+    assert writes and all("'7'" in sql for sql in writes)
+    # صف المستخدم وصفوفه في لوحة المتصدرين، لا الجداول كاملة ولا المستخدمون الآخرون
+    assert {re.search(r"(?:INTO|FROM) (\w+)", sql).group(1) for sql in writes} == {"users", "leaderboard"}
+    users.close()
+
+
+def test_migrate_json_to_sqlite(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    users = UserManager(JSONStorage(), write_behind=False)
+    fill(users)
+    expected = state(users)
+    users.close()
+
+    assert migrate_json_to_sqlite() == USERS
+    migrated = UserManager(SQLiteStorage(), write_behind=False)
+    assert state(migrated) == expected
+    migrated.close()
@@ -0,0 +1,87 @@
+"""JSONStorage بعد توقف مفاجئ: اللقطة + السجل تعطي دائماً حالة عملية حفظ مكتملة (بادئة مما كُتب)."""
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+
+from storage import JSONStorage
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+KEYS = 50
+# كاتب في عملية منفصلة: عملية حفظ لكل تعديل، ويطبع رقمها بعد اكتمالها
+WRITER = f"""
+import sys
+sys.path.insert(0, {ROOT!r})
+from storage import JSONStorage
+
+storage = JSONStorage("data.json", "notifications.json", compact_min=4096)
+data = {{"users": {{}}, "notifications": {{}}}}
+i = 0
+while True:
+    i += 1
+    key = str(i % {KEYS})
+    data["users"][key] = {{"n": i, "pad": "x" * (i % 300)}}
+    if i % 97 == 0:
+        storage.write_all(data)
+    else:
+        storage.write(data, {{("users", key)}})
+    print(i, flush=True)
+"""
+
+
+def state_after(count):
+    users = {}
+    for i in range(1, count + 1):
+        users[str(i % KEYS)] = {"n": i, "pad": "x" * (i % 300)}
+    return users
+
+
+def run_and_kill(directory, rng):
+    writer = subprocess.Popen([sys.executable, "-c", WRITER], cwd=directory, stdout=subprocess.PIPE, text=True)
+    acked = int(writer.stdout.readline())
+    time.sleep(rng.uniform(0, 0.3))
+    os.kill(writer.pid, signal.SIGKILL)
+    # ما طُبع قبل القتل: آخر عملية حفظ مؤكدة اكتمالها
+    for line in writer.stdout:
+        acked = int(line)
+    writer.wait()
+    return acked
+
+
+def test_sigkill_mid_flush_recovers_committed_prefix(tmp_path):
+    rng = random.Random(23)
+    for attempt in range(12):
+        directory = tmp_path / str(attempt)
+        directory.mkdir()
+        acked = run_and_kill(directory, rng)
+
+        storage = JSONStorage(str(directory / "data.json"), str(directory / "notifications.json"))
+        users = (storage.load() or {}).get("users", {})
+        # عملية الحفظ التالية قد تكون اكتملت على القرص قبل أن تطبع رقمها
+        recovered = max((user["n"] for user in users.values()), default=0)
+        assert recovered in (acked, acked + 1)
+        assert users == state_after(recovered)
+
+
+def test_torn_journal_line_is_truncated(tmp_path):
+    path, notifications = str(tmp_path / "data.json"), str(tmp_path / "notifications.json")
+    storage = JSONStorage(path, notifications)
+    data = {"users": {"1": {"n": 1}}, "notifications": {}}
+    storage.write_all(data)
+    data["users"]["2"] = {"n": 2}
+    storage.write(data, {("users", "2")})
+    size = os.path.getsize(storage.journal_path)
+    # سطر ناقص كما يتركه توقف أثناء الكتابة
+    with open(storage.journal_path, "ab") as f:
+        f.write(b'[["users", "3", {"n"')
+
+    reloaded = JSONStorage(path, notifications)
+    assert reloaded.load()["users"] == {"1": {"n": 1}, "2": {"n": 2}}
+    assert os.path.getsize(storage.journal_path) == size
+
+    # الحفظ التالي يُضاف بعد آخر سطر كامل ويُقرأ بعد إعادة التحميل
+    data["users"]["3"] = {"n": 3}
+    reloaded.write(data, {("users", "3")})
+    assert JSONStorage(path, notifications).load()["users"] == data["users"]
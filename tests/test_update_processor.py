@@ -0,0 +1,54 @@
+"""ChatOrderedUpdateProcessor: دفعة تحديثات من مستخدم واحد لا تحجز الأماكن عن المستخدمين الآخرين."""
+import asyncio
+from types import SimpleNamespace
+
+from webhook import ChatOrderedUpdateProcessor
+
+LIMIT = 2
+
+
+def update(user_id):
+    return SimpleNamespace(effective_user=SimpleNamespace(id=user_id))
+
+
+def test_burst_from_one_user_does_not_block_another():
+    async def main():
+        processor = ChatOrderedUpdateProcessor(LIMIT)
+        release = asyncio.Event()
+        done = []
+
+        async def handle(user_id, i):
+            if user_id == 1:
+                await release.wait()
+            done.append((user_id, i))
+
+        burst = [asyncio.create_task(processor.process_update(update(1), handle(1, i))) for i in range(5 * LIMIT)]
+        await asyncio.sleep(0)
+        # تحديث الأول من الدفعة يعمل وينتظر، والبقية تنتظر دورها دون أخذ مكان
+        await asyncio.wait_for(processor.process_update(update(2), handle(2, 0)), 1)
+        assert done == [(2, 0)]
+
+        release.set()
+        await asyncio.gather(*burst)
+        assert done[1:] == [(1, i) for i in range(5 * LIMIT)]
+        assert not processor._keys
+
+    asyncio.run(main())
+
+
+def test_limit_applies_to_running_updates():
+    async def main():
+        processor = ChatOrderedUpdateProcessor(LIMIT)
+        running = peak = 0
+
+        async def handle():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        await asyncio.gather(*(processor.process_update(update(user_id), handle()) for user_id in range(10)))
+        assert peak == LIMIT
+
+    asyncio.run(main())
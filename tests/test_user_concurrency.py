@@ -0,0 +1,90 @@
+"""تعديلات متزامنة على المستخدمين: لا يضيع أي تعديل، وuser_entries تعطي نسخاً متسقة."""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from storage import JSONStorage
+from user_manager import UserManager
+
+USERS = 4
+THREADS = 8
+CALLS = 200
+XP = 3
+
+
+def make_users(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    users = UserManager(JSONStorage(), write_behind=True)
+    for user_id in range(USERS):
+        users.register_user(user_id)
+    return users
+
+
+def test_concurrent_add_xp_and_update_totals_are_exact(tmp_path, monkeypatch):
+    users = make_users(tmp_path, monkeypatch)
+
+    def answer(record):
+        record.total_quizzes += 1
+        time.sleep(0)
+        record.total_correct += 1
+
+    def work(thread):
+        for i in range(CALLS):
+            user_id = (thread + i) % USERS
+            if i % 2:
+                users.add_xp(user_id, XP)
+            else:
+                users.apply(user_id, answer)
+
+    async def handlers():
+        # واجهة update للمعالجات على منفذ التخزين نفسه
+        await asyncio.gather(*(users.update(i % USERS, answer) for i in range(CALLS)))
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        list(pool.map(work, range(THREADS)))
+    asyncio.run(handlers())
+
+    xp = THREADS * CALLS // 2 * XP
+    answers = THREADS * CALLS // 2 + CALLS
+    entries = dict(users.user_entries())
+    assert sum(record.total_xp for record in entries.values()) == xp
+    assert sum(record.total_quizzes for record in entries.values()) == answers
+    assert sum(record.total_correct for record in entries.values()) == answers
+    assert sum(row["xp"] for row in users.get_leaderboard("all_time", limit=USERS)) == xp
+    users.close()
+
+
+def test_user_entries_are_consistent_snapshots(tmp_path, monkeypatch):
+    users = make_users(tmp_path, monkeypatch)
+    stop = threading.Event()
+
+    def answer(record):
+        record.total_quizzes += 1
+        # نافذة بين الحقلين: من يقرأ السجل الحي دون قفله يرى أحدهما معدلاً دون الآخر
+        time.sleep(0.0001)
+        record.total_correct += 1
+
+    def writer(user_id):
+        while not stop.is_set():
+            users.apply(user_id, answer)
+
+    writers = [threading.Thread(target=writer, args=(user_id,)) for user_id in range(USERS)]
+    for thread in writers:
+        thread.start()
+    try:
+        for _ in range(200):
+            snapshot = users.user_entries()
+            time.sleep(0.0001)
+            for _, record in snapshot:
+                assert record.total_quizzes == record.total_correct
+    finally:
+        stop.set()
+        for thread in writers:
+            thread.join()
+    # النسخ لا تتغير بتعديل السجل الحي
+    user_id, record = snapshot[0]
+    before = record.total_quizzes
+    users.apply(user_id, answer)
+    assert record.total_quizzes == before
+    users.close()
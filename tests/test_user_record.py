@@ -0,0 +1,82 @@
+"""UserRecord: الشكل المحفوظ لا يتغير ذهاباً وإياباً، والسجلات القديمة تُرقّى مرة وتُحفظ بالشكل الجديد."""
+import json
+from datetime import datetime
+
+from storage import JSONStorage
+from user_manager import UserManager
+from user_record import DEFAULT_WEAK_AREAS, SCHEMA_VERSION, UserRecord
+
+JOINED = "2025-01-02T03:04:05"
+LEGACY = {
+    "info": {"username": "li", "first_name": "Li", "join_date": JOINED, "nickname": "小李"},
+    "learning": {"level": "متوسط", "total_xp": 40, "last_activity": "2025-02-03T10:00:00"},
+    "progress": {"completed_lessons": ["lesson1", "lesson2"], "weak_areas": ["المفردات", "القواعد"]},
+    "stats": {"total_quizzes": 2},
+    "favorites": ["你好"],
+}
+
+
+def test_round_trip_keeps_stored_shape():
+    record = UserRecord.new("li", "Li", now=datetime(2025, 1, 2, 3, 4, 5))
+    record.completed_lessons += ("lesson1",)
+    record.flashcards = {"0": [1, 2]}
+    stored = record.to_dict()
+    assert stored["schema"] == SCHEMA_VERSION and stored["info"]["join_date"] == JOINED
+    assert stored["progress"]["completed_lessons"] == ["lesson1"]
+
+    loaded, migrated = UserRecord.from_dict(json.loads(json.dumps(stored)))
+    assert not migrated
+    assert loaded.to_dict() == stored
+
+
+def test_legacy_record_migrates():
+    record, migrated = UserRecord.from_dict(LEGACY)
+    assert migrated
+    assert record.total_xp == 40 and record.daily_goal == 3 and record.language == "ar"
+    assert record.join_date == datetime.fromisoformat(JOINED).timestamp()
+    assert record.completed_lessons == ("lesson1", "lesson2")
+    # القيم المتكررة مشتركة بين السجلات
+    assert record.weak_areas is DEFAULT_WEAK_AREAS and record.strong_areas == ()
+
+    stored = record.to_dict()
+    assert stored["schema"] == SCHEMA_VERSION
+    # الحقول غير المعروفة تبقى في مكانها
+    assert stored["info"]["nickname"] == "小李" and stored["favorites"] == ["你好"]
+    assert stored["learning"]["last_activity"] == "2025-02-03T10:00:00"
+    assert UserRecord.from_dict(stored)[0].to_dict() == stored
+
+    # سجل بلا نشاط محفوظ: آخر نشاط هو تاريخ الانضمام
+    no_activity = dict(LEGACY, schema=SCHEMA_VERSION, learning={})
+    record, migrated = UserRecord.from_dict(no_activity)
+    assert migrated and record.last_activity == record.join_date
+
+
+def test_copy_and_set_field():
+    record, _ = UserRecord.from_dict(LEGACY)
+    record.flashcards = {"0": [1]}
+    snapshot = record.copy()
+    record.flashcards["1"] = [2]
+    record.extra["favorites"].append("谢谢")
+    assert snapshot.flashcards == {"0": [1]} and snapshot.extra["favorites"] == ["你好"]
+
+    assert record.set_field("progress", "achievements", ["first"]) and record.achievements == ("first",)
+    assert not record.set_field("stats", "achievements", [])
+    assert record.wants("level_up")
+    record.set_field("notifications", "daily_reminder", False)
+    assert not record.wants("daily_reminder")
+
+
+def test_manager_rewrites_legacy_users_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    storage = JSONStorage()
+    storage.write_all({"users": {"1": LEGACY}, "notifications": {}})
+
+    users = UserManager(JSONStorage(), write_behind=False)
+    assert ("users", "1") in users._dirty
+    users.close()
+    assert JSONStorage().load()["users"]["1"]["schema"] == SCHEMA_VERSION
+
+    users = UserManager(JSONStorage(), write_behind=False)
+    assert ("users", "1") not in users._dirty
+    assert users.get_user(1).username == "li"
+    users.close()
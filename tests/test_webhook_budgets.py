@@ -0,0 +1,63 @@
+"""عدة عمليات webhook.py معاً لا تتجاوز GLOBAL_SEND_RATE ولا ميزانية Groq المضبوطة للبوت كله."""
+import asyncio
+import glob
+import json
+import os
+import time
+
+import config
+from llm_scheduler import GroqScheduler
+from notification_delivery import NotificationDispatcher
+from webhook import Dispatcher
+
+WORKERS = 2
+MESSAGES = 30
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text):
+        # CLOCK_MONOTONIC مشترك بين العمليات على الجهاز نفسه
+        self.sent.append(time.monotonic())
+
+
+class SendingWorker:
+    """عملية عمل ترسل MESSAGES رسالة (لمحادثات مختلفة) عند الإيقاف وتكتب أوقاتها وحدودها"""
+
+    async def start(self):
+        pass
+
+    async def process(self, data):
+        pass
+
+    async def stop(self):
+        bot = FakeBot()
+        delivery = NotificationDispatcher(None)
+        await asyncio.gather(*(delivery._send(bot, chat_id, "hi") for chat_id in range(1, MESSAGES + 1)))
+        scheduler = GroqScheduler()
+        with open(f"worker{os.environ['STORAGE_SHARD'].split('/')[0]}.json", "w") as f:
+            json.dump({
+                "sent": bot.sent,
+                "groq_rate": scheduler.bucket.rate * 60,
+                "groq_concurrency": scheduler.concurrency,
+            }, f)
+
+
+def test_workers_share_global_send_rate(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, "STORAGE_BACKEND", "sqlite")
+    dispatcher = Dispatcher(WORKERS, factory="test_webhook_budgets:SendingWorker")
+    dispatcher.close()
+
+    reports = [json.load(open(path)) for path in sorted(glob.glob("worker*.json"))]
+    assert len(reports) == WORKERS
+    sent = sorted(t for report in reports for t in report["sent"])
+    assert len(sent) == WORKERS * MESSAGES
+    # الدفعة الأولى بسعة الدلو (ثانية واحدة من المعدل الكلي)، والباقي بالمعدل الكلي على الأكثر
+    minimum = (len(sent) - config.GLOBAL_SEND_RATE) / config.GLOBAL_SEND_RATE
+    assert sent[-1] - sent[0] >= 0.9 * minimum
+
+    assert sum(report["groq_rate"] for report in reports) <= config.GROQ_TOKENS_PER_MINUTE
+    assert sum(report["groq_concurrency"] for report in reports) <= config.GROQ_CONCURRENCY
@@ -0,0 +1,84 @@
+"""الكتابة المؤجلة: التعديلات لا تلمس القرص، وتُجمع في عملية حفظ واحدة عند الحد أو الإغلاق."""
+import threading
+
+import pytest
+
+import user_manager as user_manager_module
+from storage import JSONStorage
+from user_manager import UserManager
+
+USERS = 10
+
+
+class RecordingStorage(JSONStorage):
+    """JSONStorage يسجل الصفوف المعدلة في كل عملية حفظ"""
+
+    def __init__(self):
+        super().__init__()
+        self.writes = []
+        self.committed = threading.Event()
+        self.fail = False
+
+    def snapshot(self, data, changes):
+        self.writes.append(set(changes))
+        return super().snapshot(data, changes)
+
+    def commit(self, payload):
+        if self.fail:
+            raise OSError("disk full")
+        super().commit(payload)
+        self.committed.set()
+
+
+def make_users(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    storage = RecordingStorage()
+    users = UserManager(storage, write_behind=True)
+    users.flush()
+    storage.writes.clear()
+    return users, storage
+
+
+def test_mutations_coalesce_until_close(tmp_path, monkeypatch):
+    users, storage = make_users(tmp_path, monkeypatch)
+    for user_id in range(USERS):
+        users.register_user(user_id)
+    for _ in range(20):
+        users.add_xp(1, 5)
+    assert storage.writes == []
+
+    users.close()
+    # عملية حفظ واحدة بكل صف مرة واحدة مهما تكرر تعديله
+    assert len(storage.writes) == 1
+    assert {change for change in storage.writes[0] if change[0] == "users"} == {("users", str(i)) for i in range(USERS)}
+
+    reloaded = UserManager(JSONStorage(), write_behind=False)
+    assert reloaded.get_user(1).total_xp == 100
+    assert reloaded.get_total_users() == USERS
+    reloaded.close()
+
+
+def test_pending_limit_wakes_flusher(tmp_path, monkeypatch):
+    monkeypatch.setattr(user_manager_module, "FLUSH_MAX_PENDING", 5)
+    users, storage = make_users(tmp_path, monkeypatch)
+    users.register_user(1)
+    for _ in range(5):
+        users.add_xp(1, 1)
+    # قبل FLUSH_INTERVAL بكثير
+    assert storage.committed.wait(2)
+    users.close()
+
+
+def test_failed_flush_keeps_rows_dirty(tmp_path, monkeypatch):
+    users, storage = make_users(tmp_path, monkeypatch)
+    users.register_user(1)
+    storage.fail = True
+    with pytest.raises(OSError):
+        users.flush()
+    storage.fail = False
+    users.flush()
+    assert ("users", "1") in storage.writes[-1]
+    users.close()
+    reloaded = UserManager(JSONStorage(), write_behind=False)
+    assert reloaded.get_user(1) is not None
+    reloaded.close()
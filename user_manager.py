@@ -1,450 +1,818 @@
-import json
+import logging
 import threading
-from datetime import datetime, timedelta
+from contextlib import contextmanager
+from datetime import datetime
 from config import *
+from storage import capture, get_storage
+from executor import PersistenceExecutorMixin
+from leaderboard import RankedIndex, TIMEFRAMES, WINDOWED_TIMEFRAMES, window_key
+from notification_store import NotificationStore
+from analytics import Analytics, merge_shards
+from expiry_index import ExpiryIndex, activity_day
+from user_record import UserRecord
+from locks import StripedLock
 
-class UserManager:
-    def __init__(self):
-        self.data = self.load_data()
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_TEMPLATES = {
+    "daily_reminder": "⏰ تذكر مذاكرة الصينية اليوم! حافظ على سلسلتك 🔥",
+    "streak_warning": "⚠️ سلسلتك في خطر! واصل التعلم للحفاظ عليها",
+    "goal_achieved": "🎉 لقد حققت هدفك اليومي! أكملت {completed} نشاط",
+    "level_up": "🚀 تهانينا! لقد تقدمت لمستوى {new_level}",
+    "weekly_report": "📊 تقريرك الأسبوعي: {lessons} درس، {xp} نقطة",
+    "new_achievement": "🏆 فزت بإنجاز جديد: {achievement}",
+    "flashcards_due": "🃏 لديك بطاقات جاهزة للمراجعة الآن!"
+}
+
+class UserManager(PersistenceExecutorMixin):
+    """ترتيب الأقفال ثابت لتجنب التعارض: قفل المستخدم ← _shared ← lock.
+
+    user_locks: قفل لكل مستخدم (مقسّم على USER_LOCK_STRIPES) يحمي سجله.
+    _shared: الهياكل المشتركة (قاموس المستخدمين، لوحة المتصدرين، الإحصائيات، فهرس الانتهاء، الإشعارات).
+    lock: مجموعة الصفوف المتسخة فقط. الحفظ لا يتم أبداً وأحد هذه الأقفال مأخوذ.
+    """
+    executor_name = "user-store"
+    executor_workers = USER_STORE_WORKERS
+
+    def __init__(self, storage=None, write_behind=WRITE_BEHIND):
+        self.storage = storage or get_storage()
         self.lock = threading.Lock()
-        # self.setup_cleanup_job() # Temporarily disabled until implemented
+        # الصفوف المعدلة منذ آخر حفظ، تكتبها واجهة التخزين وحدها بدلاً من الملف كاملاً
+        self._dirty = set()
+        self._pending = 0
+        # عمق batch/locked لكل خيط: الحفظ يؤجل حتى الخروج من آخرها
+        self._local = threading.local()
+        self.user_locks = StripedLock(USER_LOCK_STRIPES)
+        self._shared = threading.RLock()
+        # الكتابة المؤجلة: save_data لا يلمس القرص، وعملية خلفية تكتب التعديلات المتراكمة
+        self._io_lock = threading.Lock()
+        self._flush_event = threading.Event()
+        self._closed = False
+        self._flusher = None
+        # (رقم، عدد) عند تشغيل عدة عمليات على قاعدة مشتركة (webhook.py): هذه العملية تملك جزءاً من المستخدمين
+        self.shard = getattr(self.storage, "shard", None)
+        # دوال fn(user_id) تُستدعى بعد حذف مستخدم (تحت قفله) لإسقاط ما تحفظه عنه في الذاكرة
+        self.on_remove = []
+        self.data = self.load_data()
+        self._build_leaderboard_index()
+        self._build_expiry_index()
+        # نسخة مجموعة من المشرفين للبحث O(1)؛ القائمة في data هي ما يُحفظ.
+        # مع SQLite تُحدّث من الصف المشترك كل ADMIN_REFRESH_INTERVAL (admin_refresh_job) لترى تعديلات العمليات الأخرى
+        self.admins = {int(admin_id) for admin_id in self.data["admins"]}
+        self.notifications = NotificationStore(self.data.setdefault("notifications", {}))
+        if self.notifications.migrated:
+            # إعادة كتابة كل شيء مرة واحدة لإخراج الإشعارات القديمة من المستند الرئيسي
+            self.mark_dirty("all")
+        self.analytics = Analytics(self.data["analytics"])
+        if self.analytics.migrated:
+            self.mark_dirty("meta", "analytics")
+
+        if write_behind:
+            self._flusher = threading.Thread(target=self._flush_loop, name="user-data-flusher", daemon=True)
+            self._flusher.start()
 
-    def setup_cleanup_job(self):
-        pass # Placeholder for cleanup job setup
+    def schedule(self, job_queue):
+        job_queue.run_repeating(self.eviction_job, interval=EVICTION_INTERVAL, first=300, name="user_eviction")
+        job_queue.run_repeating(self.leaderboard_job, interval=LEADERBOARD_ROLL_INTERVAL, first=60, name="leaderboard_roll")
+        if not self.shard or self.shard[0] == 0:
+            # نسخة SQLite تشمل كل العمليات، فتكفي عملية واحدة
+            job_queue.run_repeating(self.backup_job, interval=BACKUP_INTERVAL * 3600, first=600, name="user_backup")
+        if hasattr(self.storage, "load_admins"):
+            job_queue.run_repeating(
+                self.admin_refresh_job, interval=ADMIN_REFRESH_INTERVAL, first=ADMIN_REFRESH_INTERVAL, name="admin_refresh"
+            )
+
+    async def leaderboard_job(self, context):
+        await self.run(self.roll_leaderboard_windows)
+
+    async def admin_refresh_job(self, context):
+        await self.run(self.refresh_admins)
+
+    async def eviction_job(self, context):
+        removed = await self.run(self.cleanup_inactive_users)
+        if removed:
+            logger.info("Evicted %d inactive users", removed)
     
     def load_data(self):
-        try:
-            with open(DATA_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {
-                "users": {},
-                "admins": ADMIN_IDS,
-                "leaderboard": {
-                    "daily": {},
-                    "weekly": {},
-                    "monthly": {},
-                    "all_time": {}
-                },
-                "notifications": {},
-                "analytics": {
-                    "total_users": 0,
-                    "active_today": 0,
-                    "total_lessons": 0,
-                    "total_quizzes": 0,
-                    "user_growth": []
-                },
-                "system": {
-                    "last_backup": None,
-                    "last_cleanup": None,
-                    "total_earnings": 0
-                }
+        data = self.storage.load()
+        if data is not None:
+            # الأقسام الناقصة (مثل إحصائيات عملية جديدة في وضع التقسيم) تبدأ بقيمها الافتراضية
+            for key, value in self._new_data().items():
+                if key not in data:
+                    data[key] = value
+                    if key in ("admins", "analytics", "system"):
+                        self.mark_dirty("meta", key)
+            if self.shard:
+                # كتابة صفوف meta هذه العملية فوراً (قد تكون موروثة) لتراها العمليات الأخرى
+                self.mark_dirty("meta", "analytics")
+                self.mark_dirty("meta", "system")
+            data["users"] = self._load_users(data.get("users", {}))
+            return data
+        # بيانات جديدة: تُكتب كاملة عند أول حفظ
+        self.mark_dirty("all")
+        return self._new_data()
+
+    @staticmethod
+    def _new_data():
+        return {
+            "users": {},
+            "admins": list(ADMIN_IDS),
+            "leaderboard": {
+                "daily": {},
+                "weekly": {},
+                "monthly": {},
+                "all_time": {}
+            },
+            "notifications": {},
+            "decks": {},
+            "analytics": {
+                "total_users": 0,
+                "total_lessons": 0,
+                "total_quizzes": 0,
+                "daily": {},
+                "cohorts": {}
+            },
+            "system": {
+                "last_backup": None,
+                "last_cleanup": None,
+                "total_earnings": 0
             }
-    
-    def save_data(self):
+        }
+
+    def _load_users(self, users):
+        """تحويل السجلات المحفوظة إلى UserRecord؛ القديمة تُرقّى هنا مرة وتُعلّم للحفظ"""
+        records = {}
+        for user_id, user_data in users.items():
+            records[user_id], migrated = UserRecord.from_dict(user_data)
+            if migrated:
+                self.mark_dirty("users", user_id)
+        return records
+
+    def mark_dirty(self, *key):
+        """تسجيل صف معدل: ("users", id) أو ("leaderboard", إطار, id) أو ("notifications", id) أو ("decks", id) أو ("meta", قسم)"""
         with self.lock:
-            with open(DATA_FILE, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, ensure_ascii=False, indent=2)
+            self._dirty.add(key)
+            self._pending += 1
+            pending = self._pending
+        if self._flusher is not None and pending >= FLUSH_MAX_PENDING:
+            self._flush_event.set()
+
+    def save_data(self):
+        # في وضع الكتابة المؤجلة تبقى التعديلات معلّمة حتى تكتبها العملية الخلفية
+        if self._flusher is None and not getattr(self._local, "depth", 0):
+            self.flush()
+
+    @contextmanager
+    def batch(self):
+        """تجميع عدة تعديلات في عملية حفظ واحدة عند الخروج"""
+        self._local.depth = getattr(self._local, "depth", 0) + 1
+        try:
+            yield
+        finally:
+            self._local.depth -= 1
+        self.save_data()
+
+    @contextmanager
+    def locked(self, user_id):
+        """قفل سجل المستخدم لتعديل ذري؛ الحفظ يتم بعد ترك القفل"""
+        with self.batch():
+            with self.user_locks.for_key(str(user_id)):
+                yield
+
+    def apply(self, user_id, fn, *args):
+        """تنفيذ fn(record, *args) تحت قفل المستخدم وتعليم السجل للحفظ؛ يعيد نتيجة fn (أو None إن لم يوجد)"""
+        user_id = str(user_id)
+        with self.locked(user_id):
+            user_data = self.get_user(user_id)
+            if user_data is None:
+                return None
+            result = fn(user_data, *args)
+            self.mark_dirty("users", user_id)
+        return result
+
+    async def update(self, user_id, fn, *args):
+        """واجهة apply للمعالجات: القفل يؤخذ على خيوط التخزين فلا تتوقف حلقة الأحداث"""
+        return await self.run(self.apply, user_id, fn, *args)
+
+    def user_entries(self):
+        """لقطة (المعرف، نسخة السجل) للمرور على المستخدمين بينما تستمر الإضافة والحذف والتعديل.
+
+        كل سجل يُنسخ تحت قفل مستخدمه فحقوله متسقة فيما بينها، والتعديل يتم عبر apply/locked.
+        تأخذ أقفال المستخدمين واحداً بعد الآخر، فلا تُستدعى والمستدعي يحمل قفل مستخدم أو قفلاً
+        يُؤخذ تحت قفل مستخدم.
+        """
+        with self._shared:
+            users = list(self.data["users"].items())
+        entries = []
+        for user_id, user_data in users:
+            with self.user_locks.for_key(user_id):
+                entries.append((user_id, user_data.copy()))
+        return entries
+
+    def get_deck(self, user_id):
+        return self.data["decks"].get(str(user_id))
+
+    def save_deck(self, user_id, deck):
+        """بطاقات المستخدم المضغوطة في صف منفصل عن سجله؛ يُعاد كتابته عند إعادة الضغط فقط"""
+        user_id = str(user_id)
+        with self._shared:
+            self.data["decks"][user_id] = deck
+        self.mark_dirty("decks", user_id)
+
+    def flush(self):
+        """كتابة كل الصفوف المعدلة الآن في عملية واحدة"""
+        with self._io_lock:
+            # كل الأقفال أثناء نسخ الصفوف المعدلة فقط: لقطة متسقة لا يُعدّل فيها أي مستخدم،
+            # والتسلسل والكتابة بعد تركها
+            with self.user_locks.all(), self._shared, self.lock:
+                self._pending = 0
+                if not self._dirty:
+                    return
+                changes, self._dirty = self._dirty, set()
+                view = capture(self.data, changes)
+            try:
+                self.storage.commit(self.storage.snapshot(view, changes))
+            except Exception:
+                # إعادة الصفوف إلى قائمة المتسخة لتُكتب في المحاولة التالية
+                with self.lock:
+                    self._dirty |= changes
+                raise
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._flush_event.wait(FLUSH_INTERVAL)
+            self._flush_event.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to flush user data")
+
+    def close(self):
+        """إيقاف العملية الخلفية وكتابة ما تبقى؛ يُستدعى عند إيقاف البوت"""
+        self.shutdown_executor()
+        self._closed = True
+        self._flush_event.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+        self.storage.close()
+
+    def save_all(self):
+        self.mark_dirty("all")
+        self.save_data()
     
     def backup_data(self):
-        backup_data = {
-            "timestamp": datetime.now().isoformat(),
-            "data": self.data
-        }
-        with open(BACKUP_FILE, 'w', encoding='utf-8') as f:
-            json.dump(backup_data, f, ensure_ascii=False, indent=2)
-        self.data["system"]["last_backup"] = datetime.now().isoformat()
-        self.save_data()
+        """نسخة احتياطية من الملفات المحفوظة بعد كتابة التعديلات المعلقة، دون إعادة تسلسل كل البيانات"""
+        with self._shared:
+            self.data["system"]["last_backup"] = datetime.now().isoformat()
+        self.mark_dirty("meta", "system")
+        self.flush()
+        # _io_lock: لا تتزامن النسخة مع كتابة جارية
+        with self._io_lock:
+            return self.storage.backup(BACKUP_DIR)
+
+    async def backup_job(self, context):
+        path, copied = await self.run(self.backup_data)
+        logger.info("Backup %s: %d bytes copied", path, copied)
     
     def create_user(self, user_id, username="", first_name="", last_name=""):
         user_id = str(user_id)
         
-        if user_id in self.data["users"]:
-            return self.data["users"][user_id]
-        
-        if len(self.data["users"]) >= MAX_USERS:
-            self.cleanup_inactive_users()
-        
-        user_data = {
-            "info": {
-                "username": username,
-                "first_name": first_name,
-                "last_name": last_name,
-                "join_date": datetime.now().isoformat(),
-                "language": "ar",
-                "is_premium": False
-            },
-            "learning": {
-                "level": "مبتدئ",
-                "current_streak": 0,
-                "longest_streak": 0,
-                "total_xp": 0,
-                "daily_goal": 3,
-                "lessons_today": 0,
-                "last_activity": datetime.now().isoformat()
-            },
-            "progress": {
-                "completed_lessons": [],
-                "completed_quizzes": [],
-                "weak_areas": ["المفردات", "القواعد"],
-                "strong_areas": [],
-                "achievements": []
-            },
-            "stats": {
-                "total_days": 1,
-                "total_lessons": 0,
-                "total_quizzes": 0,
-                "total_correct": 0,
-                "total_wrong": 0,
-                "accuracy": 0
-            },
-            "notifications": {
-                "daily_reminder": True,
-                "streak_warning": True,
-                "goal_achievement": True,
-                "weekly_report": True,
-                "last_notification": None
-            },
-            "temporary": {
-                "current_lesson": None,
-                "current_quiz": None,
-                "quiz_answers": [],
-                "waiting_for": None
-            }
-        }
-        
-        self.data["users"][user_id] = user_data
-        self.data["analytics"]["total_users"] += 1
-        self.update_user_growth()
-        self.save_data()
+        with self.locked(user_id):
+            user_data = self.get_user(user_id)
+            if user_data is not None:
+                return user_data
+            
+            # MAX_USERS حد مرن: التسجيل لا ينتظر الحذف، والمهمة الخلفية تعيد العدد تحت الحد
+            user_data = UserRecord.new(username, first_name, last_name)
+            
+            with self._shared:
+                self.data["users"][user_id] = user_data
+                self.expiry.touch(user_id, datetime.now().date().toordinal())
+                self.data["analytics"]["total_users"] += 1
+                self.analytics.record_new_user(user_id)
+            self.mark_dirty("users", user_id)
+            self.mark_dirty("meta", "analytics")
         return user_data
     
+    def register_user(self, user_id, username="", first_name="", last_name=""):
+        with self.locked(user_id):
+            self.create_user(user_id, username, first_name, last_name)
+            self.update_user_activity(user_id)
+
+    # واجهة غير متزامنة للمعالجات: التعديل يتم على خيط التخزين ولا يوقف حلقة الأحداث
+    async def register(self, user_id, username="", first_name="", last_name=""):
+        await self.run(self.register_user, user_id, username, first_name, last_name)
+
+    async def touch(self, user_id):
+        await self.run(self.update_user_activity, user_id)
+
     def get_user(self, user_id):
         user_id = str(user_id)
         return self.data["users"].get(user_id)
     
     def update_user_activity(self, user_id):
-        user_data = self.get_user(user_id)
-        if not user_data:
-            return
-        
-        # التأكد من وجود الهياكل الأساسية
-        if 'learning' not in user_data:
-            user_data['learning'] = {}
-        if 'stats' not in user_data:
-            user_data['stats'] = {}
-        
-        # تهيئة الحقول المطلوبة إذا لم تكن موجودة
-        user_data['learning'].setdefault('last_activity', datetime.now().isoformat())
-        user_data['learning'].setdefault('current_streak', 0)
-        user_data['learning'].setdefault('longest_streak', 0)
-        user_data['learning'].setdefault('lessons_today', 0)
-        user_data['stats'].setdefault('total_days', 1)
-        
-        now = datetime.now()
-        today = now.date().isoformat()
-        last_activity = datetime.fromisoformat(user_data['learning']['last_activity']).date().isoformat()
-        
-        # تحديث السلسلة والأيام
-        if today != last_activity:
-            if (now - datetime.fromisoformat(user_data['learning']['last_activity'])).days == 1:
-                user_data['learning']['current_streak'] += 1
-                user_data['learning']['longest_streak'] = max(
-                    user_data['learning']['longest_streak'],
-                    user_data['learning']['current_streak']
-                )
-            else:
-                user_data['learning']['current_streak'] = 1
+        user_id = str(user_id)
+        with self.locked(user_id):
+            user_data = self.get_user(user_id)
+            if not user_data:
+                return
             
-            user_data['learning']['lessons_today'] = 0
-            user_data['stats']['total_days'] += 1
-        
-        user_data['learning']['last_activity'] = now.isoformat()
-        self.update_leaderboard(user_id)
-        self.save_data()
+            now = datetime.now()
+            last_activity = user_data.last_activity_datetime()
+            
+            # تحديث السلسلة والأيام
+            if now.date() != last_activity.date():
+                if (now - last_activity).days == 1:
+                    user_data.current_streak += 1
+                    user_data.longest_streak = max(user_data.longest_streak, user_data.current_streak)
+                else:
+                    user_data.current_streak = 1
+                
+                user_data.lessons_today = 0
+                user_data.total_days += 1
+                # أول نشاط اليوم: يُحسب مرة واحدة لكل مستخدم في اليوم
+                with self._shared:
+                    self.analytics.record_active(user_id, user_data.join_day(), now.date().isoformat())
+                    self.expiry.touch(user_id, now.date().toordinal())
+                self.mark_dirty("meta", "analytics")
+            
+            user_data.last_activity = now.timestamp()
+            self.mark_dirty("users", user_id)
+            self.update_leaderboard(user_id)
     
     def add_xp(self, user_id, xp_amount, reason=""):
-        user_data = self.get_user(user_id)
-        if not user_data:
-            return
-        
-        # التأكد من وجود الحقول المطلوبة
-        user_data['learning'].setdefault('total_xp', 0)
-        user_data['learning'].setdefault('lessons_today', 0)
-        user_data['learning'].setdefault('daily_goal', 3)
-        
-        user_data['learning']['total_xp'] += xp_amount
-        user_data['learning']['lessons_today'] += 1
-        
-        # إشعار تحقيق الهدف اليومي
-        if user_data['learning']['lessons_today'] >= user_data['learning']['daily_goal']:
-            self.send_notification(user_id, "goal_achieved", {
-                "goal": user_data['learning']['daily_goal'],
-                "completed": user_data['learning']['lessons_today']
-            })
-        
-        self.update_leaderboard(user_id)
-        self.save_data()
+        user_id = str(user_id)
+        with self.locked(user_id):
+            user_data = self.get_user(user_id)
+            if not user_data:
+                return
+            
+            user_data.total_xp += xp_amount
+            user_data.lessons_today += 1
+            self.mark_dirty("users", user_id)
+            
+            # إشعار تحقيق الهدف اليومي
+            if user_data.lessons_today >= user_data.daily_goal:
+                self.send_notification(user_id, "goal_achieved", {
+                    "goal": user_data.daily_goal,
+                    "completed": user_data.lessons_today
+                })
+            
+            self.update_leaderboard(user_id, xp_delta=xp_amount)
     
-    def update_leaderboard(self, user_id):
-        user_data = self.get_user(user_id)
-        if not user_data:
+    def _build_expiry_index(self):
+        """فهرس يوم آخر نشاط لكل مستخدم، يُبنى مرة عند التحميل"""
+        self.expiry = ExpiryIndex(
+            (user_id, activity_day(user_data.last_activity)) for user_id, user_data in self.data["users"].items()
+        )
+
+    def _build_leaderboard_index(self):
+        """بناء فهرس الترتيب مرة واحدة عند التحميل"""
+        self.leaderboard_index = {}
+        self._leaderboard_day = None
+        for timeframe in TIMEFRAMES:
+            rows = self.data["leaderboard"].setdefault(timeframe, {})
+            self.leaderboard_index[timeframe] = RankedIndex(
+                (user_id, row["xp"]) for user_id, row in rows.items() if user_id in self.data["users"]
+            )
+
+    def _roll_leaderboard_windows(self, now=None):
+        """تصفير الأطر اليومية/الأسبوعية/الشهرية عند بداية نافذة جديدة دون فحص المستخدمين"""
+        now = now or datetime.now()
+        today = now.date()
+        if today == self._leaderboard_day:
             return
-        
-        # التأكد من وجود الحقول المطلوبة
-        user_data['learning'].setdefault('total_xp', 0)
-        user_data['learning'].setdefault('current_streak', 0)
-        user_data['stats'].setdefault('total_lessons', 0)
-        user_data['stats'].setdefault('accuracy', 0)
-        
-        xp = user_data['learning']['total_xp']
-        streak = user_data['learning']['current_streak']
-        
-        # تحديث جميع لوحات المتصدرين
-        timeframes = ["daily", "weekly", "monthly", "all_time"]
-        for timeframe in timeframes:
-            if user_id not in self.data["leaderboard"][timeframe]:
-                self.data["leaderboard"][timeframe][user_id] = {
-                    "xp": 0,
-                    "streak": 0,
-                    "lessons": 0,
-                    "accuracy": 0
-                }
-            
-            self.data["leaderboard"][timeframe][user_id].update({
-                "xp": xp,
-                "streak": streak,
-                "lessons": user_data['stats']['total_lessons'],
-                "accuracy": user_data['stats']['accuracy']
-            })
-        
-        self.cleanup_leaderboard()
+        self._leaderboard_day = today
+
+        windows = self.data["system"].setdefault("leaderboard_windows", {})
+        for timeframe in WINDOWED_TIMEFRAMES:
+            key = window_key(timeframe, now)
+            if windows.get(timeframe) != key:
+                windows[timeframe] = key
+                self.data["leaderboard"][timeframe] = {}
+                self.leaderboard_index[timeframe] = RankedIndex()
+                self.mark_dirty("leaderboard", timeframe)
+                self.mark_dirty("meta", "system")
+
+    def roll_leaderboard_windows(self):
+        """بداية نافذة جديدة تُطبق في مسار الكتابة (update_leaderboard) ومن مهمة مجدولة، لا عند القراءة"""
+        with self._shared:
+            self._roll_leaderboard_windows()
         self.save_data()
-    
-    def cleanup_leaderboard(self):
-        """تنظيف لوحة المتصدرين من المستخدمين المحذوفين"""
-        for timeframe in self.data["leaderboard"]:
-            users_to_remove = []
-            for user_id in self.data["leaderboard"][timeframe]:
-                if user_id not in self.data["users"]:
-                    users_to_remove.append(user_id)
+
+    def _window_current(self, timeframe, now=None):
+        # صفوف إطار لم يُصفّر بعد بداية نافذته الجديدة تُعامل كإطار فارغ عند القراءة
+        if timeframe not in WINDOWED_TIMEFRAMES:
+            return True
+        return self.data["system"].get("leaderboard_windows", {}).get(timeframe) == window_key(timeframe, now)
+
+    def update_leaderboard(self, user_id, xp_delta=0):
+        user_id = str(user_id)
+        with self.locked(user_id):
+            user_data = self.get_user(user_id)
+            if not user_data:
+                return
             
-            for user_id in users_to_remove:
-                del self.data["leaderboard"][timeframe][user_id]
+            xp = user_data.total_xp
+            streak = user_data.current_streak
+            
+            with self._shared:
+                self._roll_leaderboard_windows()
+                
+                # تحديث جميع لوحات المتصدرين: الإطارات الزمنية تجمع نقاط النافذة الحالية فقط
+                for timeframe in TIMEFRAMES:
+                    rows = self.data["leaderboard"][timeframe]
+                    if user_id not in rows:
+                        rows[user_id] = {
+                            "xp": 0,
+                            "streak": 0,
+                            "lessons": 0,
+                            "accuracy": 0
+                        }
+                    
+                    row = rows[user_id]
+                    row.update({
+                        "xp": xp if timeframe == "all_time" else row["xp"] + xp_delta,
+                        "streak": streak,
+                        "lessons": user_data.total_lessons,
+                        "accuracy": user_data.accuracy
+                    })
+                    self.leaderboard_index[timeframe].update(user_id, row["xp"])
+                    self.mark_dirty("leaderboard", timeframe, user_id)
+
+    def remove_from_leaderboard(self, user_id):
+        user_id = str(user_id)
+        with self._shared:
+            for timeframe in TIMEFRAMES:
+                self.leaderboard_index[timeframe].remove(user_id)
+                if self.data["leaderboard"][timeframe].pop(user_id, None) is not None:
+                    self.mark_dirty("leaderboard", timeframe, user_id)
     
     def get_leaderboard(self, timeframe="all_time", limit=10):
-        if timeframe not in self.data["leaderboard"]:
+        if timeframe not in self.leaderboard_index:
             return []
         
         leaderboard_data = []
-        for user_id, data in self.data["leaderboard"][timeframe].items():
-            user_info = self.get_user(user_id)
-            if user_info:
-                leaderboard_data.append({
-                    "user_id": user_id,
-                    "username": user_info['info'].get('username', 'مستخدم'),
-                    "first_name": user_info['info'].get('first_name', ''),
-                    "xp": data['xp'],
-                    "streak": data['streak'],
-                    "lessons": data['lessons'],
-                    "accuracy": data['accuracy']
-                })
+        with self._shared:
+            rows = self.data["leaderboard"][timeframe]
+            top = self.leaderboard_index[timeframe].top(limit) if self._window_current(timeframe) else []
+            for user_id, _ in top:
+                data = rows[user_id]
+                user_info = self.get_user(user_id)
+                if user_info:
+                    leaderboard_data.append({
+                        "user_id": user_id,
+                        "username": user_info.username or 'مستخدم',
+                        "first_name": user_info.first_name,
+                        "xp": data['xp'],
+                        "streak": data['streak'],
+                        "lessons": data['lessons'],
+                        "accuracy": data['accuracy']
+                    })
         
-        # ترتيب حسب XP
-        leaderboard_data.sort(key=lambda x: x['xp'], reverse=True)
-        return leaderboard_data[:limit]
+        if self.shard:
+            leaderboard_data = self._merge_shard_leaderboards(timeframe, limit, leaderboard_data)
+        # الفهرس مرتب مسبقاً حسب XP
+        return leaderboard_data
+
+    def _current_shards(self, timeframe):
+        """العمليات الأخرى التي صفوف هذا الإطار عندها من النافذة الحالية (لم تصفّره بعد بداية يوم جديد)"""
+        current = window_key(timeframe) if timeframe in WINDOWED_TIMEFRAMES else None
+        return [
+            index for index, system in self.storage.shard_meta("system").items()
+            if current is None or system.get("leaderboard_windows", {}).get(timeframe) == current
+        ]
+
+    def _merge_shard_leaderboards(self, timeframe, limit, own):
+        # صفوف العمليات الأخرى كما حفظتها آخر مرة (متأخرة حتى FLUSH_INTERVAL ثانية)
+        others = [
+            {
+                "user_id": user_id,
+                "username": username or 'مستخدم',
+                "first_name": first_name,
+                "xp": row['xp'],
+                "streak": row['streak'],
+                "lessons": row['lessons'],
+                "accuracy": row['accuracy']
+            }
+            for user_id, row, username, first_name in self.storage.leaderboard_top(
+                timeframe, limit, self._current_shards(timeframe)
+            )
+        ]
+        return sorted(own + others, key=lambda entry: -entry["xp"])[:limit]
+
+    def get_user_rank(self, user_id, timeframe="all_time"):
+        if timeframe not in self.leaderboard_index:
+            return None
+        with self._shared:
+            if not self._window_current(timeframe):
+                return None
+            index = self.leaderboard_index[timeframe]
+            rank = index.rank(str(user_id))
+            xp = index.score(str(user_id)) if rank is not None and self.shard else None
+        if xp is not None:
+            rank += self.storage.leaderboard_count_above(timeframe, xp, self._current_shards(timeframe))
+        return rank
     
     def send_notification(self, user_id, notification_type, data=None):
+        if self.queue_notification(user_id, notification_type, data):
+            self.save_data()
+
+    def queue_notification(self, user_id, notification_type, data=None):
+        """تخزين الإشعار لإرساله لاحقاً دون حفظ (للإرسال الجماعي)"""
+        user_id = str(user_id)
         user_data = self.get_user(user_id)
-        if not user_data or not user_data['notifications'].get(notification_type, True):
-            return
-        
-        notifications = {
-            "daily_reminder": "⏰ تذكر مذاكرة الصينية اليوم! حافظ على سلسلتك 🔥",
-            "streak_warning": "⚠️ سلسلتك في خطر! واصل التعلم للحفاظ عليها",
-            "goal_achieved": f"🎉 لقد حققت هدفك اليومي! أكملت {data['completed']} نشاط",
-            "level_up": f"🚀 تهانينا! لقد تقدمت لمستوى {data['new_level']}",
-            "weekly_report": f"📊 تقريرك الأسبوعي: {data['lessons']} درس، {data['xp']} نقطة",
-            "new_achievement": f"🏆 فزت بإنجاز جديد: {data['achievement']}"
-        }
+        if not user_data or not user_data.wants(notification_type):
+            return False
         
-        if notification_type in notifications:
-            # تخزين الإشعار لإرساله لاحقاً
-            if user_id not in self.data["notifications"]:
-                self.data["notifications"][user_id] = []
-            
-            self.data["notifications"][user_id].append({
-                "type": notification_type,
-                "message": notifications[notification_type],
-                "timestamp": datetime.now().isoformat(),
-                "read": False
-            })
-            self.save_data()
+        if notification_type not in NOTIFICATION_TEMPLATES:
+            return False
+
+        message = NOTIFICATION_TEMPLATES[notification_type].format(**(data or {}))
+        with self._shared:
+            self.notifications.push(user_id, notification_type, message)
+        self.mark_dirty("notifications", user_id)
+        return True
+
+    def queue_daily_reminders(self):
+        """إضافة تذكير يومي لكل مستخدم لم يتعلم اليوم؛ يُستدعى مرة يومياً من مهمة مجدولة"""
+        today_start = datetime.combine(datetime.now().date(), datetime.min.time()).timestamp()
+        queued = 0
+        for user_id, user_data in self.user_entries():
+            if user_data.last_activity >= today_start:
+                continue
+            if self.queue_notification(user_id, "daily_reminder"):
+                queued += 1
+        self.save_data()
+        return queued
+
+    def get_pending_notifications(self, limit=None):
+        """الإشعارات غير المقروءة لكل مستخدم: {user_id: (رقم آخر إشعار، [الرسائل])}"""
+        pending = {}
+        with self._shared:
+            for user_id in list(self.notifications.unread_users):
+                unread = self.notifications.unread(user_id)
+                if unread:
+                    pending[user_id] = (unread[-1]["id"], [n["message"] for n in unread])
+                    if limit and len(pending) >= limit:
+                        break
+        return pending
+
+    def mark_notifications_delivered(self, delivered):
+        """تحريك مؤشر القراءة للإشعارات المرسلة دفعة واحدة: {user_id: رقم آخر إشعار مرسل}"""
+        with self._shared:
+            for user_id, last_id in delivered.items():
+                if self.notifications.mark_read(user_id, last_id):
+                    self.mark_dirty("notifications", user_id)
+        self.save_data()
+
+    def compact_notifications(self):
+        """حذف الإشعارات الأقدم من NOTIFICATION_TTL_DAYS؛ تُستدعى من مهمة يومية"""
+        with self._shared:
+            changed = self.notifications.compact()
+        for user_id in changed:
+            self.mark_dirty("notifications", user_id)
+        self.save_data()
+        return len(changed)
 
     def get_unread_notifications(self, user_id):
+        user_id = str(user_id)
         user_data = self.get_user(user_id)
-        if not user_data or user_id not in self.data["notifications"]:
+        if not user_data:
             return []
-        
-        unread_notifications = [n for n in self.data["notifications"][user_id] if not n["read"]]
-        return unread_notifications
+        with self._shared:
+            return self.notifications.unread(user_id)
 
     def mark_notifications_as_read(self, user_id):
-        if user_id in self.data["notifications"]:
-            for n in self.data["notifications"][user_id]:
-                n["read"] = True
+        user_id = str(user_id)
+        with self._shared:
+            changed = self.notifications.mark_read(user_id)
+        if changed:
+            self.mark_dirty("notifications", user_id)
             self.save_data()
 
+    def _set_admins(self, admins):
+        with self._shared:
+            self.data["admins"] = admins
+            self.admins = {int(admin_id) for admin_id in admins}
+
+    def refresh_admins(self):
+        """إعادة قراءة المشرفين من الصف المشترك (تعديلات العمليات الأخرى)؛ تعمل على منفذ التخزين"""
+        load = getattr(self.storage, "load_admins", None)
+        admins = load() if load is not None else None
+        if admins is not None:
+            self._set_admins(admins)
+
     def get_admin_ids(self):
         return self.data["admins"]
 
     def is_admin(self, user_id):
-        return user_id in self.data["admins"]
+        # من الذاكرة فقط: لا قراءة من التخزين على حلقة الأحداث
+        return int(user_id) in self.admins
 
     def add_admin(self, user_id):
-        if user_id not in self.data["admins"]:
+        user_id = int(user_id)
+        update = getattr(self.storage, "update_admins", None)
+        if update is not None:
+            # تعديل الصف المشترك نفسه، لا الكتابة من نسخة هذه العملية
+            before, after = update(add=(user_id,), default=self.data["admins"])
+            self._set_admins(after)
+            return user_id not in before
+        with self._shared:
+            if user_id in self.admins:
+                return False
+            self.admins.add(user_id)
             self.data["admins"].append(user_id)
-            self.save_data()
-            return True
-        return False
+        self.mark_dirty("meta", "admins")
+        self.save_data()
+        return True
 
     def remove_admin(self, user_id):
-        if user_id in self.data["admins"]:
+        user_id = int(user_id)
+        update = getattr(self.storage, "update_admins", None)
+        if update is not None:
+            before, after = update(remove=(user_id,), default=self.data["admins"])
+            self._set_admins(after)
+            return user_id in before
+        with self._shared:
+            if user_id not in self.admins:
+                return False
+            self.admins.discard(user_id)
             self.data["admins"].remove(user_id)
-            self.save_data()
-            return True
-        return False
+        self.mark_dirty("meta", "admins")
+        self.save_data()
+        return True
 
-    def update_user_setting(self, user_id, setting_key, setting_value):
-        user_data = self.get_user(user_id)
-        if not user_data:
-            return False
-        
-        keys = setting_key.split('.')
-        current_dict = user_data
-        for i, key in enumerate(keys):
-            if key not in current_dict:
+    def _set_field(self, user_id, section, field, value):
+        with self.locked(user_id):
+            user_data = self.get_user(user_id)
+            if not user_data or not user_data.set_field(section, field, value):
                 return False # Key path does not exist
-            if i == len(keys) - 1:
-                current_dict[key] = setting_value
-            else:
-                current_dict = current_dict[key]
-        self.save_data()
+            self.mark_dirty("users", str(user_id))
         return True
 
+    def update_user_setting(self, user_id, setting_key, setting_value):
+        # المفتاح بالشكل "القسم.الحقل"، مثلاً notifications.daily_reminder
+        section, _, field = setting_key.partition('.')
+        return self._set_field(user_id, section, field, setting_value)
+
     def get_total_users(self):
-        return self.data["analytics"]["total_users"]
+        return self._read_analytics(lambda analytics: analytics.data["total_users"])
 
+    def _read_analytics(self, query):
+        """query(Analytics) تحت _shared؛ في وضع التقسيم على دمج هذه العملية مع ما حفظته العمليات الأخرى"""
+        others = list(self.storage.shard_meta("analytics").values()) if self.shard else None
+        with self._shared:
+            if others is None:
+                return query(self.analytics)
+            return query(merge_shards([self.data["analytics"], *others]))
+
+    # استعلامات الإحصائيات تقرأ العدادات اليومية فقط (O(أيام)) ولا تكتب شيئاً
     def get_active_users_today(self):
-        today = datetime.now().date().isoformat()
-        active_today = 0
-        for user_id, user_data in self.data["users"].items():
-            last_activity_str = user_data['learning']['last_activity']
-            if last_activity_str:
-                last_activity_date = datetime.fromisoformat(last_activity_str).date().isoformat()
-                if last_activity_date == today:
-                    active_today += 1
-        self.data["analytics"]["active_today"] = active_today
-        self.save_data()
-        return active_today
+        return self._read_analytics(lambda analytics: analytics.active_users(1))
 
-    def update_user_growth(self):
-        today = datetime.now().date().isoformat()
-        growth_data = self.data["analytics"]["user_growth"]
-        
-        if not growth_data or growth_data[-1]["date"] != today:
-            growth_data.append({"date": today, "new_users": 0, "total_users": self.data["analytics"]["total_users"]})
-        
-        # Update new users for today (this logic might need refinement based on how new users are tracked)
-        # For now, let's assume new users are added only when create_user is called.
-        # This method is called after create_user, so we can increment new_users for today.
-        if len(growth_data) > 0 and growth_data[-1]["date"] == today:
-            growth_data[-1]["new_users"] = len(self.data["users"]) - (growth_data[-2]["total_users"] if len(growth_data) > 1 else 0)
-            growth_data[-1]["total_users"] = self.data["analytics"]["total_users"]
-        
-        self.save_data()
+    def get_active_users(self, days):
+        return self._read_analytics(lambda analytics: analytics.active_users(days))
 
     def get_user_growth_data(self, days=30):
-        return self.data["analytics"]["user_growth"][-days:]
-
-    def cleanup_inactive_users(self):
-        now = datetime.now()
-        inactive_threshold = now - timedelta(days=CLEANUP_INTERVAL)
-        users_to_remove = []
-        for user_id, user_data in self.data["users"].items():
-            last_activity = datetime.fromisoformat(user_data['learning']['last_activity'])
-            if last_activity < inactive_threshold:
-                users_to_remove.append(user_id)
-        
-        for user_id in users_to_remove:
-            del self.data["users"][user_id]
-            # Optionally, remove from leaderboard and notifications as well
-            if user_id in self.data["notifications"]:
-                del self.data["notifications"][user_id]
-            for timeframe in self.data["leaderboard"]:
-                if user_id in self.data["leaderboard"][timeframe]:
-                    del self.data["leaderboard"][timeframe][user_id]
-        
-        if users_to_remove:
-            self.data["analytics"]["total_users"] -= len(users_to_remove)
-            self.save_data()
-            self.update_user_growth()
+        return self._read_analytics(lambda analytics: analytics.growth(days))
+
+    def get_retention(self, offsets=(1, 7, 30), days=30):
+        return self._read_analytics(lambda analytics: analytics.retention(offsets, days))
+
+    def get_analytics_report(self, offsets=(1, 7, 30), days=14):
+        """(الملخص، الاحتفاظ) من قراءة واحدة، ودمج واحد لإحصائيات العمليات الأخرى في وضع التقسيم"""
+        return self._read_analytics(lambda analytics: (analytics.summary(), analytics.retention(offsets, days)))
+
+    async def analytics_summary(self, offsets=(1, 7, 30), days=14):
+        """واجهة get_analytics_report للمعالجات: القراءة (وقاعدة SQLite) على خيوط التخزين"""
+        return await self.run(self.get_analytics_report, offsets, days)
 
-    def setup_cleanup_job(self):
-        # This would typically be a scheduled task, not run directly in __init__
-        # For a simple bot, you might run it on startup or periodically.
-        # For demonstration, let's just call it once here.
-        # In a real bot, you'd use a library like APScheduler.
-        pass # self.cleanup_inactive_users() # Don't run on init, needs proper scheduling
+    def cleanup_inactive_users(self, now=None, limit=None):
+        """عند بلوغ MAX_USERS: حذف المستخدمين غير النشطين منذ CLEANUP_INTERVAL يوم، الأقدم أولاً
+        وبحد limit في كل مرة (دون بلوغ الحد لا يُحذف أحد، إلا مع EXPIRE_BELOW_CAPACITY).
+
+        إن بقي العدد فوق MAX_USERS يُحذف الأقل نشاطاً ممن مر على آخر نشاط لهم
+        EVICTION_MIN_IDLE_DAYS يوم على الأقل. يمر على المحذوفين فقط عبر فهرس الانتهاء.
+        """
+        today = (now or datetime.now()).date().toordinal()
+        limit = limit or EVICTION_BATCH
+        with self._shared:
+            # في وضع التقسيم لكل عملية نصيبها من MAX_USERS
+            capacity = MAX_USERS // self.shard[1] if self.shard else MAX_USERS
+            users_to_remove = []
+            if EXPIRE_BELOW_CAPACITY or len(self.data["users"]) >= capacity:
+                users_to_remove = self.expiry.pop_oldest(today - CLEANUP_INTERVAL, limit)
+            over_capacity = len(self.data["users"]) - len(users_to_remove) - capacity
+            if over_capacity > 0 and len(users_to_remove) < limit:
+                users_to_remove += self.expiry.pop_oldest(
+                    today - EVICTION_MIN_IDLE_DAYS, min(over_capacity, limit - len(users_to_remove))
+                )
+        if not users_to_remove:
+            return 0
+
+        removed = 0
+        with self.batch():
+            for user_id in users_to_remove:
+                with self.locked(user_id):
+                    user_data = self.get_user(user_id)
+                    if user_data is None:
+                        continue
+                    day = activity_day(user_data.last_activity)
+                    if day >= today - EVICTION_MIN_IDLE_DAYS:
+                        # نشط بعد إخراجه من الفهرس (تعديل متزامن): يعود إلى الفهرس ولا يُحذف
+                        with self._shared:
+                            self.expiry.touch(user_id, day)
+                        continue
+                    with self._shared:
+                        del self.data["users"][user_id]
+                        if self.notifications.remove(user_id):
+                            self.mark_dirty("notifications", user_id)
+                        if self.data["decks"].pop(user_id, None) is not None:
+                            self.mark_dirty("decks", user_id)
+                        self.remove_from_leaderboard(user_id)
+                    self.mark_dirty("users", user_id)
+                    for hook in self.on_remove:
+                        hook(user_id)
+                    removed += 1
+
+            with self._shared:
+                self.data["analytics"]["total_users"] -= removed
+                self.analytics.record_removed(removed)
+            self.mark_dirty("meta", "analytics")
+        return removed
+
+    def record_quiz_result(self, user_id, quiz_id, correct, wrong, xp=0):
+        """تسجيل نتيجة اختبار كامل (الإحصائيات والنقاط والاختبارات المكتملة) في حفظ واحد"""
+        user_id = str(user_id)
+        with self.locked(user_id):
+            user_data = self.get_user(user_id)
+            if not user_data:
+                return False
+
+            user_data.total_correct += correct
+            user_data.total_wrong += wrong
+            user_data.total_quizzes += 1
+            answered = user_data.total_correct + user_data.total_wrong
+            user_data.accuracy = round(100 * user_data.total_correct / answered) if answered else 0
+
+            if quiz_id not in user_data.completed_quizzes:
+                user_data.completed_quizzes += (quiz_id,)
+            self.mark_dirty("users", user_id)
+
+            with self._shared:
+                self.data["analytics"]["total_quizzes"] = self.data["analytics"].get("total_quizzes", 0) + 1
+            self.mark_dirty("meta", "analytics")
+
+            if xp:
+                self.add_xp(user_id, xp, reason="quiz")
+            else:
+                self.update_leaderboard(user_id)
+        return True
 
     def get_user_stats(self, user_id):
         user_data = self.get_user(user_id)
         if user_data:
-            return user_data["stats"]
+            return user_data.section("stats")
         return None
 
     def update_user_stats(self, user_id, stat_key, value):
-        user_data = self.get_user(user_id)
-        if user_data and stat_key in user_data["stats"]:
-            user_data["stats"][stat_key] = value
-            self.save_data()
-            return True
-        return False
+        return self._set_field(user_id, "stats", stat_key, value)
 
     def get_user_learning_progress(self, user_id):
         user_data = self.get_user(user_id)
         if user_data:
-            return user_data["learning"]
+            return user_data.section("learning")
         return None
 
     def update_user_learning_progress(self, user_id, progress_key, value):
-        user_data = self.get_user(user_id)
-        if user_data and progress_key in user_data["learning"]:
-            user_data["learning"][progress_key] = value
-            self.save_data()
-            return True
-        return False
+        return self._set_field(user_id, "learning", progress_key, value)
 
     def get_user_achievements(self, user_id):
         user_data = self.get_user(user_id)
         if user_data:
-            return user_data["progress"]["achievements"]
+            return list(user_data.achievements)
         return []
 
     def add_achievement(self, user_id, achievement_name):
-        user_data = self.get_user(user_id)
-        if user_data and achievement_name not in user_data["progress"]["achievements"]:
-            user_data["progress"]["achievements"].append(achievement_name)
+        with self.locked(user_id):
+            user_data = self.get_user(user_id)
+            if not user_data or achievement_name in user_data.achievements:
+                return False
+            user_data.achievements += (achievement_name,)
+            self.mark_dirty("users", str(user_id))
             self.send_notification(user_id, "new_achievement", {"achievement": achievement_name})
-            self.save_data()
-            return True
-        return False
+        return True
 
     def get_system_analytics(self):
-        return self.data["analytics"]
+        return self._read_analytics(Analytics.summary)
 
     def update_total_earnings(self, amount):
-        self.data["system"]["total_earnings"] += amount
+        with self._shared:
+            self.data["system"]["total_earnings"] += amount
+        self.mark_dirty("meta", "system")
         self.save_data()
 
     def get_total_earnings(self):
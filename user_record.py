@@ -0,0 +1,198 @@
+import copy
+import sys
+from datetime import datetime
+
+# يزداد عند تغيير شكل السجل؛ السجلات الأقدم تُرقّى مرة واحدة عند التحميل ثم تُكتب بالشكل الجديد
+SCHEMA_VERSION = 2
+
+DEFAULT_WEAK_AREAS = ("المفردات", "القواعد")
+
+# شكل السجل المحفوظ (JSON): الأقسام وحقولها وقيمها الافتراضية
+SECTIONS = {
+    "info": {
+        "username": "",
+        "first_name": "",
+        "last_name": "",
+        "join_date": None,
+        "language": "ar",
+        "is_premium": False
+    },
+    "learning": {
+        "level": "مبتدئ",
+        "current_streak": 0,
+        "longest_streak": 0,
+        "total_xp": 0,
+        "daily_goal": 3,
+        "lessons_today": 0,
+        "last_activity": None
+    },
+    "progress": {
+        "completed_lessons": (),
+        "completed_quizzes": (),
+        "weak_areas": DEFAULT_WEAK_AREAS,
+        "strong_areas": (),
+        "achievements": ()
+    },
+    "stats": {
+        "total_days": 1,
+        "total_lessons": 0,
+        "total_quizzes": 0,
+        "total_correct": 0,
+        "total_wrong": 0,
+        "accuracy": 0
+    },
+    "notifications": {
+        "daily_reminder": True,
+        "streak_warning": True,
+        "goal_achievement": True,
+        "weekly_report": True,
+        "last_notification": None
+    },
+    "temporary": {
+        "current_lesson": None,
+        "current_quiz": None,
+        "quiz_answers": (),
+        "waiting_for": None
+    }
+}
+FIELD_SECTION = {field: section for section, fields in SECTIONS.items() for field in fields}
+# في الذاكرة: التواريخ أرقام (timestamp) والقوائم tuples (الفارغة مشتركة بين كل السجلات)
+TIMESTAMP_FIELDS = frozenset(("join_date", "last_activity"))
+LIST_FIELDS = frozenset(field for field, section in FIELD_SECTION.items() if isinstance(SECTIONS[section][field], tuple))
+# نصوص تتكرر بين المستخدمين تُخزن نسخة واحدة منها
+INTERNED_FIELDS = frozenset(("language", "level"))
+PLAIN, TIMESTAMP, LIST = 0, 1, 2
+# ترتيب الحقول ونوع تحويل كل منها، محسوب مرة واحدة لتسريع to_dict
+LAYOUT = tuple(
+    (section, tuple(
+        (field, TIMESTAMP if field in TIMESTAMP_FIELDS else LIST if field in LIST_FIELDS else PLAIN) for field in fields
+    ))
+    for section, fields in SECTIONS.items()
+)
+
+
+def _timestamp(value):
+    if value is None or isinstance(value, (int, float)):
+        return value
+    return datetime.fromisoformat(value).timestamp()
+
+
+def _tuple(value):
+    if not value:
+        return ()
+    value = tuple(value)
+    return DEFAULT_WEAK_AREAS if value == DEFAULT_WEAK_AREAS else value
+
+
+class UserRecord:
+    """سجل مستخدم مسطح بـ __slots__ بدلاً من ستة قواميس متداخلة لكل مستخدم.
+
+    الحقول القديمة الناقصة تُملأ مرة واحدة في from_dict، فلا حاجة لـ setdefault عند كل وصول.
+    to_dict يعيد الشكل المحفوظ نفسه (مع رقم schema) فالتخزين لا يتغير.
+    """
+
+    __slots__ = tuple(FIELD_SECTION) + ("flashcards", "extra")
+
+    @classmethod
+    def new(cls, username="", first_name="", last_name="", now=None):
+        record = cls.__new__(cls)
+        for section in SECTIONS.values():
+            for field, default in section.items():
+                setattr(record, field, default)
+        now = (now or datetime.now()).timestamp()
+        record.username = username
+        record.first_name = first_name
+        record.last_name = last_name
+        record.join_date = now
+        record.last_activity = now
+        record.flashcards = None
+        record.extra = None
+        return record
+
+    @classmethod
+    def from_dict(cls, data):
+        """تحويل سجل محفوظ؛ يعيد (السجل، True إن احتاج ترقية ويجب حفظه من جديد)"""
+        record = cls.__new__(cls)
+        migrated = data.get("schema", 1) < SCHEMA_VERSION
+        extra = {}
+        for section, defaults in SECTIONS.items():
+            values = data.get(section) or {}
+            for field, default in defaults.items():
+                value = values.get(field, default)
+                if field in TIMESTAMP_FIELDS:
+                    value = _timestamp(value)
+                elif field in LIST_FIELDS:
+                    value = _tuple(value)
+                elif field in INTERNED_FIELDS and isinstance(value, str):
+                    value = sys.intern(value)
+                setattr(record, field, value)
+            unknown = {key: value for key, value in values.items() if key not in defaults}
+            if unknown:
+                extra[section] = unknown
+        for key, value in data.items():
+            if key not in SECTIONS and key not in ("schema", "flashcards"):
+                extra[key] = value
+        if record.last_activity is None:
+            record.last_activity = record.join_date or datetime.now().timestamp()
+            migrated = True
+        record.flashcards = data.get("flashcards")
+        record.extra = extra or None
+        return record, migrated
+
+    def to_dict(self):
+        data = {"schema": SCHEMA_VERSION}
+        extra = self.extra or {}
+        for section, fields in LAYOUT:
+            values = {}
+            for field, kind in fields:
+                value = getattr(self, field)
+                if kind == LIST:
+                    value = list(value)
+                elif kind == TIMESTAMP and value is not None:
+                    value = datetime.fromtimestamp(value).isoformat()
+                values[field] = value
+            if extra:
+                values.update(extra.get(section, ()))
+            data[section] = values
+        for key, value in extra.items():
+            if key not in SECTIONS:
+                data[key] = value
+        if self.flashcards is not None:
+            # نسخة: الحفظ يسلسل السجل بعد ترك قفل المستخدم
+            data["flashcards"] = dict(self.flashcards)
+        return data
+
+    def copy(self):
+        """نسخة منفصلة عن السجل الحي (القوائم tuples لا تتغير، وflashcards وextra تُنسخان)"""
+        record = UserRecord.__new__(UserRecord)
+        for field in self.__slots__:
+            setattr(record, field, getattr(self, field))
+        if self.flashcards is not None:
+            record.flashcards = dict(self.flashcards)
+        if self.extra is not None:
+            record.extra = copy.deepcopy(self.extra)
+        return record
+
+    def section(self, name):
+        """نسخة قاموس من قسم واحد (مثل stats) لمن يحتاج الشكل القديم"""
+        return self.to_dict()[name]
+
+    def set_field(self, section, field, value):
+        if FIELD_SECTION.get(field) != section:
+            return False
+        if field in LIST_FIELDS:
+            value = _tuple(value)
+        elif field in TIMESTAMP_FIELDS:
+            value = _timestamp(value)
+        setattr(self, field, value)
+        return True
+
+    def wants(self, notification_type):
+        """هل فعّل المستخدم هذا النوع من الإشعارات (الأنواع بلا إعداد مفعلة دائماً)"""
+        return FIELD_SECTION.get(notification_type) != "notifications" or bool(getattr(self, notification_type))
+
+    def last_activity_datetime(self):
+        return datetime.fromtimestamp(self.last_activity)
+
+    def join_day(self):
+        return datetime.fromtimestamp(self.join_date or self.last_activity).date().isoformat()
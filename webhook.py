@@ -0,0 +1,276 @@
+"""تشغيل البوت على عدة عمليات خلف موزع webhook محلي.
+
+    python webhook.py
+
+العملية الرئيسية تستقبل تحديثات تيليجرام عبر HTTP وتوجه كل تحديث إلى عملية حسب معرف المستخدم
+(user_id % WEBHOOK_WORKERS)، فكل تحديثات المستخدم تصل إلى العملية نفسها وبترتيب وصولها. كل عملية
+تُشغّل البوت كاملاً (bot.build_application) وتملك بيانات مستخدميها في قاعدة SQLite المشتركة.
+"""
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from telegram import Bot, Update
+from telegram.ext import BaseUpdateProcessor
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# أقصى عدد تحديثات تُسحب من الطابور دفعة واحدة في العملية
+DRAIN_BATCH = 100
+# حد BaseUpdateProcessor.process_update في ChatOrderedUpdateProcessor: لا يُبلغ، والحد الفعلي يُطبق بعده
+UNBOUNDED_UPDATES = 2 ** 31 - 1
+
+
+def route_key(update):
+    """معرف المستخدم صاحب التحديث (قاموس JSON كما يرسله تيليجرام)، أو المحادثة إن لم يوجد"""
+    for value in update.values():
+        if isinstance(value, dict):
+            sender = value.get("from")
+            if sender:
+                return sender["id"]
+            chat = value.get("chat") or (value.get("message") or {}).get("chat")
+            if chat:
+                return chat["id"]
+    return 0
+
+
+def _ordering_key(update):
+    user = getattr(update, "effective_user", None)
+    if user is not None:
+        return user.id
+    chat = getattr(update, "effective_chat", None)
+    return chat.id if chat is not None else None
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """تحديثات المستخدمين المختلفين تُعالج بالتوازي، وتحديثات المستخدم نفسه بترتيب وصولها.
+
+    process_update في الأساس يأخذ مكاناً من حده قبل do_process_update، فلو كان هو الحد لشغلت
+    دفعة تحديثات من مستخدم واحد كل الأماكن وهي تنتظر دورها على قفله. لذلك يُعطى حداً لا يُبلغ،
+    ويُؤخذ مكان من الحد الفعلي (limit) للتحديث الذي حان دوره فقط.
+    """
+
+    def __init__(self, max_concurrent_updates):
+        if max_concurrent_updates < 1:
+            raise ValueError("`max_concurrent_updates` must be a positive integer!")
+        super().__init__(UNBOUNDED_UPDATES)
+        self.limit = max_concurrent_updates
+        self._running = asyncio.Semaphore(max_concurrent_updates)
+        # المعرف -> [قفل، عدد التحديثات المنتظرة عليه]
+        self._keys = {}
+
+    async def do_process_update(self, update, coroutine):
+        key = _ordering_key(update)
+        if key is None:
+            async with self._running:
+                await coroutine
+            return
+        entry = self._keys.get(key)
+        if entry is None:
+            entry = self._keys[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0], self._running:
+                await coroutine
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._keys[key]
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+
+class ApplicationWorker:
+    """تشغيل Application داخل عملية دون polling أو خادم webhook: التحديثات تأتي من الموزع"""
+
+    def __init__(self, application, on_stop=None):
+        self.application = application
+        self.on_stop = on_stop
+
+    async def start(self):
+        await self.application.initialize()
+        # كما في run_polling/run_webhook
+        if self.application.post_init is not None:
+            await self.application.post_init(self.application)
+        await self.application.start()
+
+    async def process(self, data):
+        await self.application.update_queue.put(Update.de_json(data, self.application.bot))
+
+    async def stop(self):
+        # سحب كل ما وصل أثناء التشغيل: المهام المنشأة بعد stop لا ينتظرها Application فقد تضيع
+        await self.application.update_queue.join()
+        await self.application.stop()
+        await self.application.shutdown()
+        if self.on_stop is not None:
+            self.on_stop()
+
+
+def _load_factory(path):
+    module, _, name = path.partition(":")
+    return getattr(__import__(module, fromlist=[name]), name)
+
+
+def _drain(updates):
+    batch = [updates.get()]
+    while batch[-1] is not None and len(batch) < DRAIN_BATCH:
+        try:
+            batch.append(updates.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+
+async def _serve_worker(worker, updates, ready):
+    loop = asyncio.get_running_loop()
+    await worker.start()
+    ready.set()
+    try:
+        while True:
+            batch = await loop.run_in_executor(None, _drain, updates)
+            for body in batch:
+                if body is None:
+                    return
+                await worker.process(json.loads(body))
+    finally:
+        await worker.stop()
+
+
+def share_budgets(count):
+    """حدود الحساب المشتركة (تيليجرام وGroq) تُقسم على العمليات: كل عملية تطبق حدودها منفردة"""
+    config.GLOBAL_SEND_RATE = config.GLOBAL_SEND_RATE / count
+    config.GROQ_TOKENS_PER_MINUTE = max(1, config.GROQ_TOKENS_PER_MINUTE // count)
+    # طلب واحد على الأقل لكل عملية، فمع عمليات أكثر من GROQ_CONCURRENCY يتجاوز المجموع الحد
+    config.GROQ_CONCURRENCY = max(1, config.GROQ_CONCURRENCY // count)
+
+
+def worker_main(index, count, updates, ready, factory):
+    """نقطة دخول العملية: تُضبط قبل استيراد أي مدير حتى يحمّل التخزين جزء هذه العملية فقط"""
+    os.environ["STORAGE_SHARD"] = f"{index}/{count}"
+    share_budgets(count)
+    # الإيقاف ينسقه الموزع عبر الطابور، فلا تتوقف العملية بـ Ctrl+C قبل كتابة بياناتها
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    worker = _load_factory(factory)()
+    asyncio.run(_serve_worker(worker, updates, ready))
+
+
+class Dispatcher:
+    """توزيع التحديثات على عمليات العمل: طابور لكل عملية، والمستخدم نفسه دائماً على العملية نفسها"""
+
+    def __init__(self, workers=None, factory="bot:build_worker"):
+        self.count = workers or config.WEBHOOK_WORKERS
+        if self.count > 1 and config.STORAGE_BACKEND != "sqlite":
+            raise ValueError("WEBHOOK_WORKERS > 1 requires STORAGE_BACKEND=sqlite")
+        # spawn: كل عملية تستورد المديرين من جديد بعد ضبط STORAGE_SHARD (لا تُورث اتصال SQLite)
+        context = multiprocessing.get_context("spawn")
+        self.queues = [context.Queue(config.WEBHOOK_QUEUE_SIZE) for _ in range(self.count)]
+        ready = [context.Event() for _ in range(self.count)]
+        self.processes = [
+            context.Process(
+                target=worker_main, args=(index, self.count, self.queues[index], ready[index], factory),
+                name=f"bot-worker-{index}"
+            )
+            for index in range(self.count)
+        ]
+        for process in self.processes:
+            process.start()
+        for process, event in zip(self.processes, ready):
+            while not event.wait(1):
+                if not process.is_alive():
+                    self.close()
+                    raise RuntimeError(f"{process.name} exited during startup (exit code {process.exitcode})")
+
+    def route(self, body):
+        """إرسال تحديث (بايتات JSON) إلى عمليته؛ False إن كانت العملية متوقفة أو طابورها ممتلئ"""
+        index = route_key(json.loads(body)) % self.count
+        if not self.processes[index].is_alive():
+            return False
+        try:
+            self.queues[index].put_nowait(body)
+        except queue.Full:
+            return False
+        return True
+
+    def close(self):
+        """إيقاف العمليات بعد معالجة ما في طوابيرها (كل عملية تكتب بياناتها قبل الخروج)"""
+        for process, updates in zip(self.processes, self.queues):
+            if process.is_alive():
+                updates.put(None)
+        for process in self.processes:
+            process.join()
+
+
+def make_handler(dispatcher, path, secret):
+    class WebhookHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path.strip("/") != path.strip("/"):
+                self.send_error(404)
+                return
+            if secret and self.headers.get("X-Telegram-Bot-Api-Secret-Token") != secret:
+                self.send_error(403)
+                return
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            try:
+                routed = dispatcher.route(body)
+            except (ValueError, TypeError, AttributeError):
+                self.send_error(400)
+                return
+            # 503: تيليجرام يعيد إرسال التحديث لاحقاً
+            self.send_response(200 if routed else 503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            logger.debug(format, *args)
+
+    return WebhookHandler
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+async def _set_webhook():
+    kwargs = {"base_url": config.TELEGRAM_BASE_URL} if config.TELEGRAM_BASE_URL else {}
+    async with Bot(config.BOT_TOKEN, **kwargs) as bot:
+        await bot.set_webhook(
+            url=f"{config.WEBHOOK_URL.rstrip('/')}/{config.WEBHOOK_PATH}",
+            secret_token=config.WEBHOOK_SECRET,
+            allowed_updates=Update.ALL_TYPES
+        )
+
+
+def serve():
+    if not config.WEBHOOK_URL:
+        raise ValueError("WEBHOOK_URL is not set")
+    asyncio.run(_set_webhook())
+    dispatcher = Dispatcher()
+    server = ThreadingHTTPServer(
+        (config.WEBHOOK_LISTEN, config.WEBHOOK_PORT),
+        make_handler(dispatcher, config.WEBHOOK_PATH, config.WEBHOOK_SECRET)
+    )
+    signal.signal(signal.SIGTERM, _interrupt)
+    logger.info("Dispatching webhook updates to %d workers on port %d", dispatcher.count, config.WEBHOOK_PORT)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        dispatcher.close()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+    serve()